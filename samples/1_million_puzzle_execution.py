@@ -1,44 +1,46 @@
-import csv
 import os
 
 import multiprocessing
 
-from sudoku_solver import sudoku, cnpp_solver, cnpp
+from sudoku_solver import sudoku, cnpp_batch, cnpp_dataset, cnpp_verification
 
 # Downloaded 1-million sudokus as a CSV, where column 1 was titled "quizzes" and
-# was filled with 1D-formatted sudokus.
+# was filled with 1D-formatted sudokus, and column 2 was titled "solutions" and
+# was filled with their 1D-formatted solutions. The CSV is converted to a
+# dataset file the first time this script is run.
 DATA_FILE_NAME = os.path.expanduser('~/Downloads/sudoku_data.csv')
+DATASET_FILE_NAME = os.path.expanduser('~/Downloads/sudoku_data.cnpd')
+REPORT_FILE_NAME = os.path.expanduser('~/Downloads/sudoku_mismatches.csv')
 
-def iterate_through_puzzles():
-	with open(DATA_FILE_NAME, 'r') as data:
-		reader = csv.DictReader(data)
-		for index, row in enumerate(reader, 1):
-			puzzle, _ = row['quizzes'], row['solutions']
-			yield index, puzzle
-
-def solve_sudoku(input_data):
-	index, puzzle = input_data
-	sudoku_puzzle = sudoku.SudokuPuzzle.init_from_1d_list(puzzle)
-	completed_puzzle, state = cnpp_solver.solve(sudoku_puzzle)
-	return (index, puzzle, state, completed_puzzle)
+# Number of puzzles that are sent to a worker process at once, and that are
+# verified against their solutions at once.
+BATCH_SIZE = 10000
 
 def main():
-	try:
-		num_cores = multiprocessing.cpu_count()
-		pool = multiprocessing.Pool(num_cores - 2)
-		run_in_parallel = True
-	except:
-		run_in_parallel = False
-
-	if run_in_parallel:
-		for index, puzzle, result, completed_puzzle in pool.imap_unordered(solve_sudoku, iterate_through_puzzles()):
-			print(f'Result {result} Puzzle Index: {index} Initial configuration: {puzzle}')
-	else:
-		for data in iterate_through_puzzles():
-			index, puzzle, result, completed_puzzle = solve_sudoku(data)
-			print(f'Result {result} Puzzle Index: {index} Initial configuration: {puzzle}')
-
-	print('Done')
+	if not os.path.exists(DATASET_FILE_NAME):
+		cnpp_dataset.convert_csv(DATA_FILE_NAME, DATASET_FILE_NAME, sudoku.SUDOKU_TOPOLOGY)
+
+	dataset = cnpp_dataset.Dataset(DATASET_FILE_NAME)
+	processes = max(multiprocessing.cpu_count() - 2, 1)
+
+	# Workers write the solved grids into shared memory, in the same order as
+	# the dataset.
+	with cnpp_batch.solve_batch(dataset, processes=processes, chunk_size=BATCH_SIZE,
+			puzzle_type=sudoku.SudokuPuzzle) as results:
+		for index in range(len(results)):
+			print(f'Result {results.state(index)} Puzzle Index: {index}')
+
+		mismatches = cnpp_verification.verify(
+			sudoku.SUDOKU_TOPOLOGY,
+			results.rows(),
+			list(dataset.iter_solutions()),
+			batch_size=BATCH_SIZE,
+		)
+
+	with open(REPORT_FILE_NAME, 'w', newline='') as report:
+		cnpp_verification.write_report(mismatches, report)
+
+	print(f'Done. {len(mismatches)} mismatches were written to {REPORT_FILE_NAME}')
 
 if __name__ == '__main__':
 	main()
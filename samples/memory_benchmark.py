@@ -0,0 +1,45 @@
+import copy
+import gc
+import tracemalloc
+
+from sudoku_solver import sudoku
+
+# The "Hard" puzzle from example_sudokus_with_inline_data.py, formatted as a 1D
+# string.
+PUZZLE = "094008007006510000010004025700003008000091070040000906083400000400000001060000800"
+
+NUM_PUZZLES = 1000
+
+
+def measure(description, build_puzzles):
+	"""
+	Prints the average number of bytes that are allocated for each puzzle that
+	is created by `build_puzzles` and held in memory.
+	"""
+
+	gc.collect()
+	tracemalloc.start()
+	puzzles = build_puzzles()
+	current, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	print(f"{description}: {current // len(puzzles)} bytes per puzzle")
+	del puzzles
+
+
+def main():
+	template = sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE)
+
+	measure(
+		"Initialized from a 1D list",
+		lambda: [sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE) for _ in range(NUM_PUZZLES)],
+	)
+
+	measure(
+		"Copied with copy.deepcopy",
+		lambda: [copy.deepcopy(template) for _ in range(NUM_PUZZLES)],
+	)
+
+
+if __name__ == "__main__":
+	main()
@@ -14,6 +14,7 @@ setup(
 	keywords="sudoku solver",
 	packages=["sudoku_solver"],
 	install_requires=["HeapDict>=1,<2"],
+	extras_require={"numpy": ["numpy"]},
 	python_requires=">=3",
 	license="MIT"
 )
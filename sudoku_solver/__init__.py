@@ -8,12 +8,26 @@ follow the same rules.
 
 from sudoku_solver import (
 	cnpp,
+	cnpp_batch,
+	cnpp_branching,
+	cnpp_chains,
+	cnpp_dataset,
+	cnpp_parallel,
+	cnpp_session,
 	cnpp_solver,
+	cnpp_verification,
 	sudoku,
 )
 
 __all__ = [
 	'cnpp',
+	'cnpp_batch',
+	'cnpp_branching',
+	'cnpp_chains',
+	'cnpp_dataset',
+	'cnpp_parallel',
+	'cnpp_session',
 	'cnpp_solver',
+	'cnpp_verification',
 	'sudoku',
 ]
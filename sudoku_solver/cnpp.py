@@ -6,10 +6,14 @@ there are other variants of the game that follow the same rules.
 
 """
 
+from array import array
+import base64
 from collections import defaultdict
 import enum
 import os
-from typing import Optional, Collection, Hashable, Set, Iterable, DefaultDict
+import struct
+import sys
+from typing import Optional, Collection, Hashable, Set, FrozenSet, Iterable, DefaultDict, List, Tuple
 
 
 class Cell(object):
@@ -17,8 +21,14 @@ class Cell(object):
 	Models a cell in a number-placement puzzle, which is described by a single
 	cell that must contain a single value, but can be described by a list of
 	potential values if the exact value of the cell is uncertain.
+
+	Cells are slotted and store their potential values as a frozenset, which is
+	replaced rather than modified when values are removed. Cells with the same
+	potential values can share a single frozenset.
 	"""
 
+	__slots__ = ('_location', '_value', '_potential_values')
+
 	def __init__(self, location: tuple, value: Hashable = None, potential_values: Collection[Hashable] = None):
 		r"""
 		Initializes a cell, accepting a location and either a single value or a
@@ -38,7 +48,7 @@ class Cell(object):
 
 		self._location = location
 		self._value = value
-		self._potential_values = set(potential_values or ())  # type: Set[Hashable]
+		self._potential_values = frozenset(potential_values or ())  # type: FrozenSet[Hashable]
 
 	def value(self) -> Optional[Hashable]:
 		"""
@@ -65,7 +75,7 @@ class Cell(object):
 		markings.
 		"""
 		self._value = value
-		self._potential_values.clear()
+		self._potential_values = frozenset()
 
 	def potential_values(self) -> Set[Hashable]:
 		"""
@@ -76,6 +86,20 @@ class Cell(object):
 	def iter_potential_values(self) -> Iterable[Hashable]:
 		return iter(self._potential_values)
 
+	def snapshot(self) -> Tuple[Hashable, FrozenSet[Hashable]]:
+		"""
+		Returns a tuple containing the value of the cell and its frozenset of
+		potential values. Taking a snapshot does not copy the potential values.
+		"""
+		return (self._value, self._potential_values)
+
+	def restore(self, snapshot: Tuple[Hashable, FrozenSet[Hashable]]):
+		"""
+		Restores the value and potential values of the cell from a snapshot
+		returned by `snapshot`.
+		"""
+		self._value, self._potential_values = snapshot
+
 	def remove_value(self, value: Hashable) -> bool:
 		"""
 		Removes a value the set of potential values for this cell.
@@ -88,14 +112,33 @@ class Cell(object):
 		Removes a set of values from the set of potential values for this cell.
 		Returns true if any values were removed.
 		"""
-		any_values_removed = False
+		remaining_values = self._potential_values.difference(values)
+		if len(remaining_values) == len(self._potential_values):
+			return False
+
+		self._potential_values = remaining_values
+		return True
+
+	def peek_value(self) -> Optional[Hashable]:
+		"""
+		Returns the same value as `value`, without setting the value of a cell
+		that only has one potential value.
+		"""
+
+		if self._value:
+			return self._value
 
-		for value in values:
-			if value in self._potential_values:
-				self._potential_values.remove(value)
-				any_values_removed = True
+		if len(self._potential_values) == 1:
+			return next(iter(self._potential_values))
 
-		return any_values_removed
+		return None
+
+	def __reduce__(self):
+		return (
+			_restore_cell,
+			(self.__class__, self._location, self._value, tuple(self._potential_values)),
+			_extra_state(self, Cell),
+		)
 
 	def __eq__(self, other) -> bool:
 		return (
@@ -118,17 +161,49 @@ class Cell(object):
 	def __str__(self) -> str:
 		return repr(self)
 
-class Group(set):
+class Group(tuple):
 	"""
-	Models a set of cells in a number-placement puzzle.
+	Models a set of cells in a number-placement puzzle. Groups are immutable
+	tuples of distinct cells, which are considerably smaller than sets, and are
+	compared and hashed by identity.
 	"""
 
-	def __init__(self, cells: Collection[Cell]):
-		super().__init__(cells)
+	__slots__ = ()
+
+	def __new__(cls, cells: Collection[Cell]):
+		cells = tuple(cells)
+		assert len(cells) == len(set(map(id, cells))), (
+			"A Group cannot contain the same cell more than once."
+		)
+		return super().__new__(cls, cells)
 
 	def __hash__(self):
 		return id(self)
 
+	def __eq__(self, other) -> bool:
+		return self is other
+
+	def __ne__(self, other) -> bool:
+		return self is not other
+
+	def __contains__(self, cell) -> bool:
+		# Cells compare equal by value, so membership is tested by identity.
+		return id(cell) in map(id, self)
+
+	def issuperset(self, cells: Iterable[Cell]) -> bool:
+		"""
+		Returns true if the group contains all of the specified cells.
+		"""
+		return set(map(id, cells)).issubset(map(id, self))
+
+	def cell_set(self) -> FrozenSet[Cell]:
+		"""
+		Returns the cells of the group as a frozenset, for callers that need
+		constant time membership tests or set operations. Groups used to be
+		sets, and the frozenset supports the same read-only operations.
+		"""
+		return frozenset(self)
+
 	def solved_cells(self) -> Set[Cell]:
 		"""
 		Returns a set of the solved cells within the group.
@@ -175,7 +250,7 @@ class Group(set):
 
 		for cell in self:
 			if not cell.value():
-				for value in cell.potential_values():
+				for value in cell.iter_potential_values():
 					value_to_cell_map[value].add(cell)
 
 		return value_to_cell_map
@@ -193,26 +268,528 @@ class PuzzleState(enum.Enum):
 	Conflict = 3,
 
 
+class Topology(object):
+	"""
+	Describes the layout of a number-placement puzzle independently of the
+	contents of its cells. A topology lists the location of each cell, the
+	locations that make up each group, and the symbols that can be placed in
+	the cells. Puzzles that share a topology can be encoded as a packed array
+	of cell states, one fixed-width bit mask per cell.
+
+	Puzzles made of overlapping sub-puzzles, such as Samurai Sudoku, can also
+	describe each sub-puzzle as a region, which is a collection of cell
+	locations. The solver works through one region at a time, and only moves
+	to another region when a change reaches one of its groups.
+	"""
+
+	def __init__(
+		self,
+		groups: Collection[Collection[Hashable]],
+		symbols: Collection[Hashable],
+		name: str = None,
+		cell_type: type = Cell,
+		regions: Collection[Collection[Hashable]] = None,
+	):
+		r"""
+		Initializes a topology from a collection of groups of cell locations
+		and the collection of symbols used by the puzzle. Topologies that are
+		given a `name` can be registered with `register_topology`, so that
+		encoded puzzles refer to the topology by name instead of describing it.
+		`regions` optionally partitions the puzzle into collections of cell
+		locations, which may overlap.
+		"""
+
+		locations = []  # type: List[Hashable]
+		location_indexes = {}  # type: dict[Hashable, int]
+		group_indexes = []
+
+		for group in groups:
+			indexes = []
+			for location in group:
+				if location not in location_indexes:
+					location_indexes[location] = len(locations)
+					locations.append(location)
+				indexes.append(location_indexes[location])
+			group_indexes.append(tuple(indexes))
+
+		try:
+			symbols = tuple(sorted(set(symbols)))
+		except TypeError:
+			symbols = tuple(set(symbols))
+
+		self._name = name
+		self._cell_type = cell_type
+		self._locations = tuple(locations)
+		self._location_indexes = location_indexes
+		self._group_indexes = tuple(group_indexes)
+
+		# Each group is also described as a bit mask of its location indexes,
+		# and each location lists the indexes of the groups that contain it,
+		# so that strategies can combine groups with bitwise operations.
+		self._group_masks = tuple(
+			sum(1 << index for index in indexes)
+			for indexes in self._group_indexes
+		)  # type: Tuple[int, ...]
+		self._group_mask_indexes = {}  # type: dict[int, int]
+		location_groups = [[] for _ in self._locations]
+		for group_index, indexes in enumerate(self._group_indexes):
+			self._group_mask_indexes.setdefault(self._group_masks[group_index], group_index)
+			for index in indexes:
+				location_groups[index].append(group_index)
+		self._location_groups = tuple(map(tuple, location_groups))  # type: Tuple[Tuple[int, ...], ...]
+
+		# The peers of a location are the other locations that share a group
+		# with it.
+		peer_masks = []
+		for index, group_indexes_of_location in enumerate(self._location_groups):
+			mask = 0
+			for group_index in group_indexes_of_location:
+				mask |= self._group_masks[group_index]
+			peer_masks.append(mask & ~(1 << index))
+		self._peer_masks = tuple(peer_masks)  # type: Tuple[int, ...]
+		self._regions = tuple(
+			frozenset(region)
+			for region in regions or ()
+		)  # type: Tuple[FrozenSet[Hashable], ...]
+
+		# Maps each location to a bit mask of the regions that contain it.
+		self._region_masks = defaultdict(int)  # type: DefaultDict[Hashable, int]
+		for index, region in enumerate(self._regions):
+			for location in region:
+				self._region_masks[location] |= 1 << index
+
+		# The region of each group, which is used to partition the groups of
+		# the puzzles built by `build_puzzle`.
+		self._group_regions = tuple(
+			self.region_index(self._locations[index] for index in indexes)
+			for indexes in self._group_indexes
+		)  # type: Tuple[Optional[int], ...]
+		self._symbols = symbols
+		self._symbol_bits = {
+			symbol: 1 << index
+			for index, symbol in enumerate(symbols)
+		}
+
+		# Each cell is encoded as one bit per symbol, plus a bit which
+		# indicates that the cell is solved. The mask of a solved cell only
+		# contains the bit of its value.
+		self._solved_bit = 1 << len(symbols)
+		self._mask_width = (len(symbols) + 8) // 8
+		self._array_typecode = None  # type: Optional[str]
+		for typecode in ('B', 'H', 'I', 'Q'):
+			itemsize = array(typecode).itemsize
+			if itemsize >= self._mask_width:
+				self._mask_width = itemsize
+				self._array_typecode = typecode
+				break
+
+		# Decoded potential values are shared by every cell, in every puzzle,
+		# with the same mask.
+		self._decoded_masks = {}  # type: dict[int, Tuple[Hashable, FrozenSet[Hashable]]]
+
+	def name(self) -> Optional[str]:
+		return self._name
+
+	def locations(self) -> Tuple[Hashable, ...]:
+		"""
+		Returns the locations of the cells in the order that they are encoded.
+		"""
+		return self._locations
+
+	def symbols(self) -> Tuple[Hashable, ...]:
+		return self._symbols
+
+	def groups(self) -> Tuple[Tuple[Hashable, ...], ...]:
+		"""
+		Returns the locations of the cells in each group.
+		"""
+		return tuple(
+			tuple(self._locations[index] for index in indexes)
+			for indexes in self._group_indexes
+		)
+
+	def location_index(self, location: Hashable) -> int:
+		"""
+		Returns the index of the location in `locations`.
+		"""
+		return self._location_indexes[location]
+
+	def group_masks(self) -> Tuple[int, ...]:
+		"""
+		Returns a bit mask for each group, in the order of `groups`, where bit
+		`i` is set if the group contains `locations()[i]`.
+		"""
+		return self._group_masks
+
+	def location_groups(self) -> Tuple[Tuple[int, ...], ...]:
+		"""
+		Returns the indexes of the groups that contain each location, in the
+		order of `locations`.
+		"""
+		return self._location_groups
+
+	def peer_masks(self) -> Tuple[int, ...]:
+		"""
+		Returns a bit mask for each location, in the order of `locations`, of
+		the other locations that share a group with it.
+		"""
+		return self._peer_masks
+
+	def group_index(self, locations: Iterable[Hashable]) -> Optional[int]:
+		"""
+		Returns the index of the first group that contains exactly the
+		locations, or `None` if there is no such group.
+		"""
+
+		mask = 0
+		for location in locations:
+			index = self._location_indexes.get(location)
+			if index is None:
+				return None
+			mask |= 1 << index
+
+		return self._group_mask_indexes.get(mask)
+
+	def regions(self) -> Tuple[FrozenSet[Hashable], ...]:
+		"""
+		Returns the locations of the cells in each region. Returns an empty
+		tuple if the topology was not given any regions.
+		"""
+		return self._regions
+
+	def region_index(self, locations: Iterable[Hashable]) -> Optional[int]:
+		"""
+		Returns the index of the first region that contains all of the
+		locations, or `None` if no region contains all of them.
+		"""
+
+		mask = -1
+		for location in locations:
+			mask &= self._region_masks.get(location, 0)
+			if not mask:
+				return None
+
+		return (mask & -mask).bit_length() - 1 if mask > 0 else None
+
+	def pack(self, puzzle: 'Puzzle') -> bytes:
+		"""
+		Encodes the values and potential values of a puzzle's cells.
+		"""
+
+		symbol_bits = self._symbol_bits
+		masks = []
+
+		# Cells are read through their snapshots, so that packing a cell with
+		# a single potential value does not set its value. Both states are
+		# decoded the same way by `Cell.value`.
+		for location in self._locations:
+			value, potential_values = puzzle.get_cell(location).snapshot()
+			try:
+				if value:
+					masks.append(self._solved_bit | symbol_bits[value])
+				else:
+					mask = 0
+					for potential_value in potential_values:
+						mask |= symbol_bits[potential_value]
+					masks.append(mask)
+			except KeyError as ex:
+				raise ValueError(
+					f'The cell at {location!r} contains {ex.args[0]!r}, which is not '
+					f'one of the symbols of the topology: {self._symbols}.'
+				) from None
+
+		if self._array_typecode:
+			packed = array(self._array_typecode, masks)
+			if sys.byteorder == 'big':
+				packed.byteswap()
+			return packed.tobytes()
+
+		return b''.join(
+			mask.to_bytes(self._mask_width, 'little')
+			for mask in masks
+		)
+
+	def unpack(self, data: bytes) -> List[Cell]:
+		"""
+		Decodes a list of cells, ordered the same as `locations`, from data
+		encoded by `pack`.
+		"""
+
+		if len(data) != len(self._locations) * self._mask_width:
+			raise ValueError(
+				f'Expected {len(self._locations) * self._mask_width} bytes of '
+				f'cell data, received {len(data)}.'
+			)
+
+		if self._array_typecode:
+			masks = array(self._array_typecode)
+			masks.frombytes(data)
+			if sys.byteorder == 'big':
+				masks.byteswap()
+		else:
+			width = self._mask_width
+			masks = [
+				int.from_bytes(data[offset:offset + width], 'little')
+				for offset in range(0, len(data), width)
+			]
+
+		cells = []
+		for location, mask in zip(self._locations, masks):
+			decoded = self._decoded_masks.get(mask)
+			if decoded is None:
+				decoded = self._decode_mask(mask)
+			value, potential_values = decoded
+			cells.append(_restore_cell(self._cell_type, location, value, potential_values))
+
+		return cells
+
+	def _decode_mask(self, mask: int) -> Tuple[Hashable, FrozenSet[Hashable]]:
+		symbols = tuple(
+			symbol
+			for symbol, bit in self._symbol_bits.items()
+			if mask & bit
+		)
+
+		if mask & self._solved_bit:
+			if len(symbols) != 1:
+				raise ValueError(f'Invalid mask for a solved cell: {mask:#x}')
+			decoded = (symbols[0], frozenset())
+		else:
+			decoded = (None, frozenset(symbols))
+
+		self._decoded_masks[mask] = decoded
+		return decoded
+
+	def build_puzzle(self, puzzle_type: type, data: bytes) -> 'Puzzle':
+		"""
+		Creates a puzzle of the specified type from data encoded by `pack`.
+		"""
+
+		return self._build_puzzle(puzzle_type, self.unpack(data))
+
+	def build_puzzle_from_values(self, puzzle_type: type,
+			values: Iterable[Optional[Hashable]]) -> 'Puzzle':
+		"""
+		Creates a puzzle of the specified type from the value of each cell,
+		ordered the same as `locations`. Cells whose value is `None` can
+		contain any of the topology's symbols.
+		"""
+
+		all_symbols = frozenset(self._symbols)
+		cells = [
+			_restore_cell(self._cell_type, location, value, () if value is not None else all_symbols)
+			for location, value in zip(self._locations, values)
+		]
+
+		if len(cells) != len(self._locations):
+			raise ValueError(f'Expected {len(self._locations)} values, received {len(cells)}.')
+
+		return self._build_puzzle(puzzle_type, cells)
+
+	def _build_puzzle(self, puzzle_type: type, cells: List[Cell]) -> 'Puzzle':
+		groups = [
+			Group(cells[index] for index in indexes)
+			for indexes in self._group_indexes
+		]
+
+		puzzle = puzzle_type.__new__(puzzle_type)
+		Puzzle.__init__(puzzle, groups, self)
+		puzzle._regions = _partition_groups(groups, self._group_regions)
+		return puzzle
+
+	def __reduce__(self):
+		if self._name and _TOPOLOGIES.get(self._name) is self:
+			return (get_topology, (self._name,))
+
+		return (
+			Topology,
+			(
+				self.groups(),
+				self._symbols,
+				self._name,
+				self._cell_type,
+				self._regions,
+			),
+		)
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __repr__(self) -> str:
+		ctor_name = self.__class__.__name__
+		return (
+			f'{ctor_name}(name={self._name!r}, cells={len(self._locations)}, '
+			f'groups={len(self._group_indexes)}, symbols={self._symbols})'
+		)
+
+
+_TOPOLOGIES = {}  # type: dict[str, Topology]
+
+# Encoded puzzles start with this version number, followed by the length of
+# the name of the puzzle's topology and the name itself.
+_ENCODING_VERSION = 1
+_ENCODING_HEADER = struct.Struct('<BB')
+
+
+def register_topology(topology: Topology) -> Topology:
+	"""
+	Registers a named topology, allowing encoded puzzles to refer to the
+	topology by name. Returns the topology.
+	"""
+
+	name = topology.name()
+	assert name, 'Only named topologies can be registered.'
+	assert _TOPOLOGIES.get(name, topology) is topology, (
+		f'A different topology is already registered as "{name}".'
+	)
+
+	_TOPOLOGIES[name] = topology
+	return topology
+
+
+def get_topology(name: str) -> Topology:
+	"""
+	Retrieves a topology that was registered with `register_topology`.
+	"""
+	return _TOPOLOGIES[name]
+
+
+def _partition_groups(groups: Iterable[Group],
+		group_regions: Iterable[Optional[int]]) -> Tuple[Tuple[Group, ...], ...]:
+	"""
+	Partitions groups by the index of their region, which is `None` for groups
+	that do not fit in any region. Those groups are partitioned into a region
+	of their own, after the others. Empty regions are omitted.
+	"""
+
+	regions = defaultdict(list)
+	for group, index in zip(groups, group_regions):
+		regions[index].append(group)
+
+	return tuple(
+		tuple(regions[index])
+		for index in sorted(regions, key=lambda index: (index is None, index or 0))
+	)
+
+
+def _restore_cell(cell_type: type, location: tuple, value: Hashable,
+				potential_values: Collection[Hashable]) -> Cell:
+	"""
+	Creates a cell without going through its initializer, which allows cells
+	that have neither a value nor any potential values to be restored.
+	"""
+
+	cell = cell_type.__new__(cell_type)
+	cell._location = location
+	cell._value = value
+	cell._potential_values = frozenset(potential_values)
+	return cell
+
+
+def _restore_puzzle(puzzle_type: type, groups: Iterable[Iterable[Cell]],
+		topology: Optional['Topology']) -> 'Puzzle':
+	"""
+	Creates a puzzle from the cells of each of its groups, without going
+	through the initializer of the puzzle's type.
+	"""
+
+	puzzle = puzzle_type.__new__(puzzle_type)
+	Puzzle.__init__(puzzle, [Group(cells) for cells in groups], topology)
+	return puzzle
+
+
+def _extra_slots(cls: type, base: type) -> Tuple[str, ...]:
+	"""
+	Returns the names of the slots that were added by the subclasses of
+	`base`, up to and including `cls`.
+	"""
+
+	slots = []
+	for subclass in cls.__mro__:
+		if subclass is base:
+			break
+		subclass_slots = subclass.__dict__.get('__slots__', ())
+		if isinstance(subclass_slots, str):
+			subclass_slots = (subclass_slots,)
+		slots.extend(
+			name
+			for name in subclass_slots
+			if name not in ('__dict__', '__weakref__')
+		)
+
+	return tuple(slots)
+
+
+def _extra_state(obj: object, base: type) -> Optional[tuple]:
+	"""
+	Returns the state that subclasses of `base` added to an object, in the
+	`(dict, slots)` format that pickle and copy restore, or `None` if there
+	is no such state.
+	"""
+
+	dict_state = getattr(obj, '__dict__', None) or None
+	slot_state = {
+		name: getattr(obj, name)
+		for name in _extra_slots(type(obj), base)
+		if hasattr(obj, name)
+	} or None
+
+	if dict_state is None and slot_state is None:
+		return None
+
+	return (dict(dict_state) if dict_state else None, slot_state)
+
+
+
 class Puzzle(object):
 	"""
 	Models a number-placement puzzle as a collection of groups of cells.
 	"""
 
-	def __init__(self, groups: Collection[Group]):
-		self._groups = set()  # type: Set[Group]
-		self._cells = set()  # type: Set[Cell]
-		self._cells_to_group_map = defaultdict(set)
-		self._location_to_cell_map = {}
+	__slots__ = (
+		'_topology',
+		'_groups',
+		'_cells_to_group_map',
+		'_location_to_cell_map',
+		'_regions',
+		'_group_region_indexes',
+		'_region_cells',
+		'__weakref__',
+	)
 
-		for group in groups:
-			assert group not in self._groups
-			self._groups.add(group)
+	def __init__(self, groups: Collection[Group], topology: 'Topology' = None):
+		r"""
+		Initializes a puzzle from a collection of groups of cells. Puzzles that
+		share a layout can specify a registered `Topology`, which allows them to
+		be encoded compactly by `to_bytes` and by pickle. The topology of other
+		puzzles is derived from their groups when it is needed.
+		"""
+
+		self._topology = topology
+		self._groups = tuple(groups)  # type: Tuple[Group, ...]
+		assert len(set(self._groups)) == len(self._groups)
+
+		cells_to_group_map = defaultdict(list)
+		for group in self._groups:
 			for cell in group:
-				self._cells.add(cell)
-				self._cells_to_group_map[cell].add(group)
+				cells_to_group_map[cell].append(group)
+
+		self._cells_to_group_map = {
+			cell: tuple(cell_groups)
+			for cell, cell_groups in cells_to_group_map.items()
+		}  # type: dict[Cell, Tuple[Group, ...]]
 
-		for cell in self._cells:
-			self._location_to_cell_map[cell.location()] = cell
+		self._location_to_cell_map = {
+			cell.location(): cell
+			for cell in self._cells_to_group_map
+		}  # type: dict[Hashable, Cell]
+
+		self._regions = None  # type: Optional[Tuple[Tuple[Group, ...], ...]]
+		self._group_region_indexes = None  # type: Optional[dict[Group, int]]
+		self._region_cells = None  # type: Optional[Tuple[Tuple[Cell, ...], ...]]
 
 	def state(self) -> PuzzleState:
 		"""
@@ -222,8 +799,8 @@ class Puzzle(object):
 		a duplicate value or if there are any cells that have
 		- Returns `PuzzleState.Unsolved` otherwise.
 		"""
-		for cell in self._cells:
-			if not (cell.value() or any(cell.potential_values())):
+		for cell in self._location_to_cell_map.values():
+			if not (cell.value() or any(cell.iter_potential_values())):
 				return PuzzleState.Conflict
 
 		for group in self._groups:
@@ -251,11 +828,11 @@ class Puzzle(object):
 		"""
 		return set(self.iter_unsolved_cells())
 
-	def get_groups(self, cell: Cell) -> Set[Group]:
+	def get_groups(self, cell: Cell) -> Tuple[Group, ...]:
 		"""
 		Returns all of the groups that contain the cell.
 		"""
-		assert cell in self._cells
+		assert cell in self._cells_to_group_map
 		return self._cells_to_group_map[cell]
 
 	def iter_groups(self):
@@ -268,7 +845,7 @@ class Puzzle(object):
 		"""
 		Returns an iterator over the cells in the puzzle.
 		"""
-		return iter(self._cells)
+		return iter(self._location_to_cell_map.values())
 
 	def iter_unsolved_cells(self):
 		"""
@@ -276,7 +853,7 @@ class Puzzle(object):
 		"""
 		return (
 			cell for cell in
-			self._cells
+			self._location_to_cell_map.values()
 			if not cell.value()
 		)
 
@@ -286,7 +863,7 @@ class Puzzle(object):
 		"""
 		return (
 			cell for cell in
-			self._cells
+			self._location_to_cell_map.values()
 			if cell.value()
 		)
 
@@ -296,11 +873,165 @@ class Puzzle(object):
 		"""
 		return self._location_to_cell_map.get(location, None)
 
+	def topology(self) -> Topology:
+		"""
+		Returns the topology of the puzzle. If the puzzle was not initialized
+		with a topology, an unnamed topology is derived from its groups.
+		"""
+
+		if not self._topology:
+			self._topology = Topology(
+				[
+					[cell.location() for cell in group]
+					for group in self._groups
+				],
+				{
+					symbol
+					for cell in self._location_to_cell_map.values()
+					for symbol in (
+						[cell.value()] if cell.value() else
+						cell.iter_potential_values()
+					)
+				},
+			)
+
+		return self._topology
+
+	def regions(self) -> Tuple[Tuple[Group, ...], ...]:
+		"""
+		Returns the groups in each of the regions described by the puzzle's
+		topology. Each group belongs to the first region that contains all of
+		its cells, and the groups that do not fit in any region are returned
+		as a region of their own. A puzzle without regions has a single
+		region, which contains every group.
+		"""
+
+		if self._regions is None:
+			if self._topology and self._topology.regions():
+				group_regions = [
+					self._topology.region_index(cell.location() for cell in group)
+					for group in self._groups
+				]
+			else:
+				group_regions = [None] * len(self._groups)
+
+			self._regions = _partition_groups(self._groups, group_regions)
+
+		return self._regions
+
+	def region_of(self, group: Group) -> int:
+		"""
+		Returns the index of the region in `regions` that contains the group.
+		"""
+
+		if self._group_region_indexes is None:
+			self._group_region_indexes = {
+				region_group: index
+				for index, region in enumerate(self.regions())
+				for region_group in region
+			}
+
+		return self._group_region_indexes[group]
+
+	def region_cells(self, index: int) -> Tuple[Cell, ...]:
+		"""
+		Returns the cells of the groups in the region at the index in
+		`regions`. Cells that are shared with other regions are included in
+		each of them.
+		"""
+
+		if self._region_cells is None:
+			self._region_cells = tuple(
+				tuple({
+					id(cell): cell
+					for group in region
+					for cell in group
+				}.values())
+				for region in self.regions()
+			)
+
+		return self._region_cells[index]
+
+	def to_bytes(self) -> bytes:
+		"""
+		Encodes the state of the puzzle. The puzzle's topology must be
+		registered with `register_topology`.
+		"""
+
+		topology = self.topology()
+		name = topology.name()
+		if not name or _TOPOLOGIES.get(name) is not topology:
+			raise ValueError(
+				'Only puzzles with a registered topology can be encoded.'
+			)
+
+		encoded_name = name.encode('utf-8')
+		return (
+			_ENCODING_HEADER.pack(_ENCODING_VERSION, len(encoded_name)) +
+			encoded_name +
+			topology.pack(self)
+		)
+
+	@classmethod
+	def from_bytes(cls, data: bytes) -> 'Puzzle':
+		"""
+		Decodes a puzzle that was encoded by `to_bytes`.
+		"""
+
+		data = bytes(data)
+		version, name_length = _ENCODING_HEADER.unpack_from(data)
+		if version != _ENCODING_VERSION:
+			raise ValueError(f'Unsupported puzzle encoding version: {version}')
+
+		offset = _ENCODING_HEADER.size
+		name = data[offset:offset + name_length].decode('utf-8')
+		return get_topology(name).build_puzzle(cls, data[offset + name_length:])
+
+	def to_string(self) -> str:
+		"""
+		Encodes the state of the puzzle as a URL-safe string.
+		"""
+		return base64.urlsafe_b64encode(self.to_bytes()).decode('ascii')
+
+	@classmethod
+	def from_string(cls, data: str) -> 'Puzzle':
+		"""
+		Decodes a puzzle that was encoded by `to_string`.
+		"""
+		return cls.from_bytes(base64.urlsafe_b64decode(data))
+
+	def __reduce__(self):
+		# Puzzles are usually encoded as packed cell masks, which are rebuilt
+		# by their topology. That encoding only describes cells of the
+		# topology's cell type, so puzzles without a topology, and puzzles
+		# whose cells have other types or extra attributes, pickle their
+		# cells instead.
+		topology = self._topology
+		cells = self._location_to_cell_map.values()
+		cell_types = {type(cell) for cell in cells}
+
+		if (
+			topology is not None and
+			cell_types.issubset({topology._cell_type}) and
+			not any(_extra_slots(cell_type, Cell) for cell_type in cell_types) and
+			not any(getattr(cell, '__dict__', None) for cell in cells)
+		):
+			return (
+				topology.build_puzzle,
+				(self.__class__, topology.pack(self)),
+				_extra_state(self, Puzzle),
+			)
+
+		return (
+			_restore_puzzle,
+			(self.__class__, [tuple(group) for group in self._groups], topology),
+			_extra_state(self, Puzzle),
+		)
+
 	def __str__(self) -> str:
 		max_row = 0
 		max_col = 0
-		for cell in self._cells:
-			location = cell.location()
+		for location in self._location_to_cell_map:
 			if location[0] > max_row:
 				max_row = location[0]
 			if location[1] > max_col:
@@ -0,0 +1,312 @@
+r"""
+
+Contains functions that solve large batches of puzzles that share a topology
+across worker processes. Instead of sending each solved puzzle back to the
+parent process, workers write their results straight into a shared memory
+buffer at the index of the input puzzle, and only notify the parent when a
+chunk of puzzles is done. The results are therefore in the same order as the
+input, and are read from the buffer by `BatchResults`.
+
+Each result contains the solved grid, packed the same way as
+`cnpp_verification.pack_values`, the code of the puzzle's resulting state,
+and optionally statistics about how it was solved.
+
+"""
+
+import multiprocessing
+import multiprocessing.util
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, Sequence, Union
+
+from . import cnpp, cnpp_dataset, cnpp_solver, cnpp_verification
+
+
+class BatchStats(NamedTuple):
+	"""
+	Statistics about how a puzzle was solved. `guesses` counts the guesses that
+	the solver made, `backtracks` counts the guesses that were undone, either
+	by backtracking or by backjumping, and `microseconds` is the time that
+	was spent solving the puzzle.
+	"""
+
+	guesses: int
+	backtracks: int
+	microseconds: int
+
+
+# Each state is stored as a single byte. 0 is used for puzzles that have not
+# been solved yet.
+_STATE_CODES = {
+	state: code
+	for code, state in enumerate(cnpp.PuzzleState, 1)
+}
+_STATES = (None,) + tuple(cnpp.PuzzleState)
+
+_STATS_FIELDS = len(BatchStats._fields)
+
+
+class BatchResults(object):
+	"""
+	Reads the results of `solve_batch` from shared memory. The buffer is
+	released when the results are closed.
+	"""
+
+	def __init__(self, topology: cnpp.Topology, length: int, collect_stats: bool,
+			name: Optional[str] = None):
+		r"""
+		Creates the shared memory buffer for `length` results, or attaches to
+		an existing buffer if its `name` is specified.
+		"""
+
+		self._topology = topology
+		self._length = length
+		self._collect_stats = collect_stats
+		self._num_cells = len(topology.locations())
+
+		# The buffer contains the grids, then the states, then the statistics,
+		# which are aligned to their item size.
+		self._states_offset = length * self._num_cells
+		self._stats_offset = -(-(self._states_offset + length) // 8) * 8
+		size = self._stats_offset + (length * _STATS_FIELDS * 4 if collect_stats else 0)
+
+		self._owner = name is None
+		self._memory = shared_memory.SharedMemory(name=name, create=self._owner, size=max(size, 1))
+
+		buffer = self._memory.buf
+		self._grids = buffer[:self._states_offset]
+		self._states = buffer[self._states_offset:self._states_offset + length]
+		self._stats = buffer[self._stats_offset:size].cast('I') if collect_stats else None
+
+	def name(self) -> str:
+		return self._memory.name
+
+	def topology(self) -> cnpp.Topology:
+		return self._topology
+
+	def values(self, index: int) -> bytes:
+		"""
+		Returns the packed grid of a puzzle, with one byte per cell.
+		"""
+		self._check_index(index)
+		start = index * self._num_cells
+		return bytes(self._grids[start:start + self._num_cells])
+
+	def rows(self) -> Sequence[bytes]:
+		"""
+		Returns the packed grid of every puzzle, which can be passed to
+		`cnpp_verification.verify`.
+		"""
+		grids = bytes(self._grids)
+		return [
+			grids[start:start + self._num_cells]
+			for start in range(0, len(grids), self._num_cells)
+		]
+
+	def state(self, index: int) -> Optional[cnpp.PuzzleState]:
+		"""
+		Returns the resulting state of a puzzle, or `None` if the puzzle has not
+		been solved.
+		"""
+		self._check_index(index)
+		return _STATES[self._states[index]]
+
+	def stats(self, index: int) -> Optional[BatchStats]:
+		"""
+		Returns the statistics of a puzzle, or `None` if statistics were not
+		collected.
+		"""
+		self._check_index(index)
+		if self._stats is None:
+			return None
+		start = index * _STATS_FIELDS
+		return BatchStats(*self._stats[start:start + _STATS_FIELDS])
+
+	def puzzle(self, index: int, puzzle_type: type = cnpp.Puzzle) -> cnpp.Puzzle:
+		"""
+		Creates a puzzle of the specified type from the packed grid of a puzzle.
+		The potential values of unsolved cells are not stored, so unsolved cells
+		can contain any of the topology's symbols.
+		"""
+
+		symbols = (None,) + self._topology.symbols()
+		return self._topology.build_puzzle_from_values(
+			puzzle_type,
+			(symbols[value] for value in self.values(index)),
+		)
+
+	def close(self):
+		"""
+		Releases the buffer. The buffer is destroyed if it was created by these
+		results.
+		"""
+
+		self._grids.release()
+		self._states.release()
+		if self._stats is not None:
+			self._stats.release()
+		self._memory.close()
+		if self._owner:
+			self._memory.unlink()
+
+	def _set(self, index: int, puzzle: cnpp.Puzzle, state: cnpp.PuzzleState,
+			stats: Optional[BatchStats]):
+		start = index * self._num_cells
+		self._grids[start:start + self._num_cells] = cnpp_verification.pack_values(puzzle)
+		self._states[index] = _STATE_CODES[state]
+		if stats is not None and self._stats is not None:
+			start = index * _STATS_FIELDS
+			for offset, value in enumerate(stats):
+				self._stats[start + offset] = min(value, 0xFFFFFFFF)
+
+	def _check_index(self, index: int):
+		if not 0 <= index < self._length:
+			raise IndexError(f'Puzzle index {index} is out of range.')
+
+	def __len__(self) -> int:
+		return self._length
+
+	def __enter__(self) -> 'BatchResults':
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def __repr__(self) -> str:
+		ctor_name = self.__class__.__name__
+		return f'{ctor_name}(name={self.name()!r}, length={self._length})'
+
+
+def solve_batch(puzzles: Union[cnpp_dataset.Dataset, Sequence[cnpp.Puzzle]],
+		processes: Optional[int] = None, chunk_size: int = 1000,
+		collect_stats: bool = False,
+		puzzle_type: type = cnpp.Puzzle) -> BatchResults:
+	"""
+	Solves every puzzle in a dataset or a sequence of puzzles with
+	`cnpp_solver.solve`, using `processes` worker processes, which defaults to
+	the number of CPUs. Every puzzle must share a topology. Returns the
+	results, which must be closed to release their shared memory.
+
+	Workers receive `chunk_size` puzzles at a time. Workers read puzzles from
+	a dataset themselves, so only the bounds of each chunk are sent to them.
+	Puzzles from a dataset are created as `puzzle_type`.
+
+	If `collect_stats` is true, the statistics of each puzzle are also stored.
+	Counting guesses requires tracing the solver, which slows it down.
+	"""
+
+	processes = processes or multiprocessing.cpu_count()
+
+	if isinstance(puzzles, cnpp_dataset.Dataset):
+		topology = puzzles.topology()
+	elif puzzles:
+		topology = puzzles[0].topology()
+		assert topology is not None, 'Only puzzles with a topology can be solved in a batch.'
+	else:
+		topology = cnpp.Topology([], ())
+
+	results = BatchResults(topology, len(puzzles), collect_stats)
+	chunks = [
+		(start, min(start + chunk_size, len(puzzles)))
+		for start in range(0, len(puzzles), chunk_size)
+	]
+
+	try:
+		if processes == 1:
+			_initialize_worker(results, puzzles, puzzle_type)
+			for chunk in chunks:
+				_solve_chunk(chunk)
+
+		else:
+			# The dataset is pickled as its file name, and the results are
+			# pickled as the name of their buffer, so each worker opens its own
+			# view of both. Sequences of puzzles are sent with each chunk.
+			initargs = (
+				(results.name(), topology, len(puzzles), collect_stats),
+				puzzles if isinstance(puzzles, cnpp_dataset.Dataset) else None,
+				puzzle_type,
+			)
+			with multiprocessing.Pool(processes, initializer=_initialize_worker, initargs=initargs) as pool:
+				if isinstance(puzzles, cnpp_dataset.Dataset):
+					tasks = chunks
+				else:
+					tasks = [(start, stop, puzzles[start:stop]) for start, stop in chunks]
+
+				for _ in pool.imap_unordered(_solve_chunk, tasks):
+					pass
+
+				# Leaving the pool terminates the workers, so they are stopped
+				# first to let them close their view of the results.
+				pool.close()
+				pool.join()
+
+	except BaseException:
+		results.close()
+		raise
+
+	finally:
+		_worker_state.clear()
+
+	return results
+
+
+# Holds the results, the puzzles, and the puzzle type of the current worker
+# process.
+_worker_state = {}
+
+
+def _initialize_worker(results, puzzles, puzzle_type: type):
+	if not isinstance(results, BatchResults):
+		name, topology, length, collect_stats = results
+		results = BatchResults(topology, length, collect_stats, name=name)
+
+		# Closes the worker's view of the buffer when the worker exits.
+		multiprocessing.util.Finalize(None, results.close, exitpriority=10)
+
+	_worker_state['results'] = results
+	_worker_state['puzzles'] = puzzles
+	_worker_state['puzzle_type'] = puzzle_type
+
+
+def _solve_chunk(chunk: tuple) -> tuple:
+	"""
+	Solves a chunk of puzzles, writing each result into the shared memory
+	buffer. Returns the bounds of the chunk, which is the only data that is
+	sent back to the parent process.
+	"""
+
+	results = _worker_state['results']
+	puzzles = _worker_state['puzzles']
+	puzzle_type = _worker_state['puzzle_type']
+
+	if len(chunk) == 3:
+		start, stop, puzzles = chunk
+		offset = start
+	else:
+		start, stop = chunk
+		offset = 0
+
+	collect_stats = results._collect_stats
+
+	for index in range(start, stop):
+		if isinstance(puzzles, cnpp_dataset.Dataset):
+			puzzle = puzzles.puzzle(index, puzzle_type)
+		else:
+			puzzle = puzzles[index - offset]
+
+		if collect_stats:
+			counts = {'guess': 0, 'backtrack': 0, 'backjump': 0, 'deduction': 0}
+			started = time.perf_counter()
+			solved_puzzle, state = cnpp_solver.solve(puzzle, trace=lambda event: counts.__setitem__(event.kind, counts[event.kind] + 1))
+			stats = BatchStats(
+				counts['guess'],
+				counts['backtrack'] + counts['backjump'],
+				int((time.perf_counter() - started) * 1000000),
+			)
+		else:
+			solved_puzzle, state = cnpp_solver.solve(puzzle)
+			stats = None
+
+		results._set(index, solved_puzzle, state, stats)
+
+	return start, stop
@@ -0,0 +1,183 @@
+r"""
+
+Contains the branching heuristics that the solver uses when the deterministic
+strategies are exhausted. A heuristic chooses the cell that the solver guesses
+the value of, and the order in which the cell's potential values are guessed.
+
+Heuristics that override different methods can be combined by inheritance,
+for example:
+
+	class DomWdegLeastConstrainingValue(DomWdeg, LeastConstrainingValue):
+		pass
+
+"""
+
+from collections import defaultdict
+from typing import Hashable, Iterable, List
+
+from . import cnpp
+
+
+class Branching(object):
+	"""
+	Chooses the unsolved cell with the fewest potential values, and guesses
+	its potential values in ascending order. Ties between cells are broken by
+	the order that the puzzle iterates over its cells. This is the solver's
+	default heuristic.
+	"""
+
+	def select_cell(self, puzzle: cnpp.Puzzle, cells: Iterable[cnpp.Cell] = None) -> cnpp.Cell:
+		"""
+		Returns the unsolved cell whose value should be guessed next. If
+		`cells` is specified, only those cells are considered, and they must
+		include an unsolved cell.
+		"""
+
+		cell_with_a_guess = None
+		fewest_potential_values = None
+
+		for cell in _iter_unsolved_cells(puzzle, cells):
+			num_potential_values = len(cell.potential_values())
+			if cell_with_a_guess is None or num_potential_values < fewest_potential_values:
+				cell_with_a_guess = cell
+				fewest_potential_values = num_potential_values
+
+		return cell_with_a_guess
+
+	def order_values(self, puzzle: cnpp.Puzzle, cell: cnpp.Cell) -> List[Hashable]:
+		"""
+		Returns the potential values of the cell in the order that they should
+		be guessed.
+		"""
+
+		# Potential values are stored in a frozenset, whose order depends on
+		# the hashes of the values, which change between runs for strings.
+		return sorted(cell.iter_potential_values())
+
+	def conflict(self, puzzle: cnpp.Puzzle):
+		"""
+		Called with the puzzle whenever a guess leads to a conflict.
+		"""
+		pass
+
+
+class LeastConstrainingValue(Branching):
+	"""
+	Guesses first the potential values that appear in the fewest potential
+	values of the cell's peers, which are the other cells in the cell's
+	groups. Those guesses rule out the fewest options elsewhere in the puzzle,
+	so they are the most likely to be correct.
+	"""
+
+	def order_values(self, puzzle: cnpp.Puzzle, cell: cnpp.Cell) -> List[Hashable]:
+		peers = {
+			id(peer): peer
+			for group in puzzle.get_groups(cell)
+			for peer in group.iter_unsolved_cells()
+			if peer is not cell
+		}
+
+		times_constrained = defaultdict(int)
+		for peer in peers.values():
+			for value in peer.iter_potential_values():
+				times_constrained[value] += 1
+
+		# The sort is stable, so ties keep the order of the potential values.
+		return sorted(
+			super().order_values(puzzle, cell),
+			key=lambda value: times_constrained[value],
+		)
+
+
+class DomWdeg(Branching):
+	"""
+	Chooses the unsolved cell with the lowest ratio of its number of potential
+	values to the total weight of its groups. Every group starts with a
+	weight of 1, and the weight of a group is increased each time that the
+	group is found to be in conflict after a guess. The search is drawn
+	towards the parts of the puzzle that have caused it the most trouble.
+
+	The weights are learned over the lifetime of the heuristic, so a new
+	instance should be used for each puzzle, unless the puzzles share a
+	topology and are expected to be difficult in the same places.
+	"""
+
+	def __init__(self):
+		# Groups are identified by their position in the puzzle, which is the
+		# same in every copy of a puzzle.
+		self._weights = defaultdict(lambda: 1)  # type: defaultdict[int, int]
+
+		# Maps the location of each cell to the positions of its groups. It is
+		# built from the first puzzle, and reused for its copies.
+		self._location_groups = None  # type: dict[Hashable, tuple[int, ...]] | None
+
+	def select_cell(self, puzzle: cnpp.Puzzle, cells: Iterable[cnpp.Cell] = None) -> cnpp.Cell:
+		if self._location_groups is None:
+			group_indexes = {
+				group: index
+				for index, group in enumerate(puzzle.iter_groups())
+			}
+			self._location_groups = {
+				cell.location(): tuple(group_indexes[group] for group in puzzle.get_groups(cell))
+				for cell in puzzle.iter_cells()
+			}
+
+		cell_with_a_guess = None
+		lowest_ratio = None
+
+		for cell in _iter_unsolved_cells(puzzle, cells):
+			weighted_degree = sum(
+				self._weights[index]
+				for index in self._location_groups[cell.location()]
+			)
+			ratio = len(cell.potential_values()) / weighted_degree
+
+			if cell_with_a_guess is None or ratio < lowest_ratio:
+				cell_with_a_guess = cell
+				lowest_ratio = ratio
+
+		return cell_with_a_guess
+
+	def conflict(self, puzzle: cnpp.Puzzle):
+		for index, group in enumerate(puzzle.iter_groups()):
+			if _group_in_conflict(group):
+				self._weights[index] += 1
+
+	def weights(self) -> List[int]:
+		"""
+		Returns the weight of each group, in the order that puzzles iterate
+		over their groups.
+		"""
+		return [
+			self._weights[index]
+			for index in range(max(self._weights, default=-1) + 1)
+		]
+
+
+def _group_in_conflict(group: cnpp.Group) -> bool:
+	"""
+	Returns true if the group contains the same value more than once, or
+	contains a cell that has neither a value nor any potential values.
+	"""
+
+	values = []
+	for cell in group:
+		value = cell.value()
+		if value:
+			values.append(value)
+		elif not any(cell.iter_potential_values()):
+			return True
+
+	return len(values) != len(set(values))
+
+
+def _iter_unsolved_cells(puzzle: cnpp.Puzzle, cells: Iterable[cnpp.Cell] = None) -> Iterable[cnpp.Cell]:
+	"""
+	Returns an iterator over the unsolved cells, or over the unsolved cells
+	in the puzzle if `cells` is not specified.
+	"""
+
+	if cells is None:
+		return puzzle.iter_unsolved_cells()
+
+	return (cell for cell in cells if not cell.value())
@@ -0,0 +1,506 @@
+r"""
+
+Contains strategies that combine the candidates of many groups into chains of
+inferences: simple coloring, XY-Wings, XYZ-Wings, and alternating inference
+chains. The strategies are opt-in: `register_strategies` registers them with
+`cnpp_solver.register_strategy`, so that `cnpp_solver.process_cell_group`
+applies them after the built-in strategies.
+
+The strategies share a graph of the links between candidates, where a
+candidate is a value that a cell can hold. Two candidates are strongly
+linked if at least one of them must be true: the same value in the only two
+cells of a group that can hold it, or the only two values of a cell. Two
+candidates are weakly linked if at most one of them can be true: the same
+value in two cells that share a group, or two values of the same cell.
+
+Cells are described by the index of their location in the puzzle's topology,
+and sets of cells by bit masks of those indexes.
+
+"""
+
+import functools
+import itertools
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from . import cnpp, cnpp_solver
+
+
+class LinkGraph(object):
+	"""
+	Describes the strong and weak links between the candidates of a puzzle.
+
+	The graph reads the candidates from the index that `cnpp_solver._solve`
+	keeps up to date for the puzzle, so the strategies share one graph per
+	puzzle while it is being solved, instead of indexing the puzzle for each
+	group. The strong links of a value only depend on which cells can hold the
+	value, so they are cached by the value's mask, and are only found again
+	for the values whose cells have changed since they were last used.
+	"""
+
+	__slots__ = ('_puzzle', '_topology', '_index', '_strong_links')
+
+	def __init__(self, puzzle: cnpp.Puzzle):
+		self._puzzle = puzzle
+		self._topology = puzzle.topology()
+		self._index = cnpp_solver._candidate_index(puzzle)
+		self._strong_links = {}  # type: Dict[int, Dict[int, Tuple[Tuple[int, int], ...]]]
+
+	def value_mask(self, value: Hashable) -> int:
+		"""
+		Returns a mask of the cells that hold the value or can hold it.
+		Solved cells are included, because their values may not have been
+		erased from the rest of their groups yet.
+		"""
+		return self._index.value_masks().get(value, 0)
+
+	def values(self, index: int) -> frozenset:
+		"""
+		Returns the potential values of an unsolved cell, or an empty set if
+		the cell is solved.
+		"""
+		return self._index.potential_values(index)
+
+	def bivalue_mask(self) -> int:
+		"""
+		Returns a mask of the cells that have exactly two potential values.
+		"""
+		return self._index.bivalue_mask()
+
+	def strong_links(self, value: Hashable) -> Dict[int, Tuple[Tuple[int, int], ...]]:
+		"""
+		Returns a dict that maps each cell with a strong link for the value to
+		the cells that it is linked to, along with the index of the group that
+		links them.
+		"""
+
+		value_mask = self.value_mask(value)
+		links = self._strong_links.get(value_mask)
+		if links is None:
+			links = self._strong_links[value_mask] = _strong_links(self._topology, value_mask)
+		return links
+
+	def cell(self, index: int) -> cnpp.Cell:
+		return self._puzzle.get_cell(self._topology.locations()[index])
+
+	def cells(self, mask: int) -> Iterable[cnpp.Cell]:
+		"""
+		Returns an iterator over the cells in the mask.
+		"""
+		return (self.cell(index) for index in _iter_bits(mask))
+
+	def premises(self, links: Set[Tuple[int, Hashable]],
+			cells: Iterable[int] = ()) -> List[cnpp_solver.Premise]:
+		"""
+		Returns the premises of a deduction that used the strong links of the
+		values in the groups of `links`, which are pairs of group indexes and
+		values, and the potential values of `cells`.
+		"""
+
+		group_masks = self._topology.group_masks()
+
+		premises = [
+			(cell, [value])
+			for group_index, value in links
+			for cell in self.cells(group_masks[group_index] & ~self.value_mask(value))
+		]  # type: List[cnpp_solver.Premise]
+
+		premises.extend(
+			(self.cell(index), None)
+			for index in cells
+		)
+
+		return premises
+
+
+def _link_graph(puzzle: cnpp.Puzzle) -> LinkGraph:
+	"""
+	Returns the graph that the strategies share for the puzzle while it is
+	being solved, or a new graph if the puzzle is not being solved.
+	"""
+
+	index = cnpp_solver._CANDIDATE_INDEXES.get(puzzle)
+	if index is None:
+		return LinkGraph(puzzle)
+
+	return index.derived(LinkGraph, lambda: LinkGraph(puzzle))
+
+
+def _strong_links(topology: cnpp.Topology, value_mask: int) -> Dict[int, Tuple[Tuple[int, int], ...]]:
+	"""
+	Finds the groups that contain exactly two of the cells in the mask, and
+	links those cells to each other. Only groups with a cell for each of the
+	puzzle's symbols must contain the value, so other groups are skipped.
+	"""
+
+	links = {}  # type: Dict[int, Tuple[Tuple[int, int], ...]]
+	num_symbols = len(topology.symbols())
+
+	for group_index, group_mask in enumerate(topology.group_masks()):
+		if _count_bits(group_mask) != num_symbols:
+			continue
+
+		cells = group_mask & value_mask
+		first = cells & -cells
+		second = cells ^ first
+		if first and second and not second & (second - 1):
+			first_index = first.bit_length() - 1
+			second_index = second.bit_length() - 1
+			links[first_index] = links.get(first_index, ()) + ((second_index, group_index),)
+			links[second_index] = links.get(second_index, ()) + ((first_index, group_index),)
+
+	return links
+
+
+def check_simple_coloring(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		explanations: 'cnpp_solver.Explanations' = None) -> set:
+	"""
+	Checks for simple coloring eliminations, starting from the values that can
+	only be placed in two cells of the specified group.
+
+	The cells that are connected to those two cells by strong links of the
+	value are colored alternately, so the value must be in every cell of one
+	of the colors. If two cells of the same color share a group, the value is
+	removed from every cell of that color. Otherwise, the value is removed
+	from every other cell that shares a group with a cell of each color.
+	"""
+
+	values = [
+		value
+		for value, cells in group.potential_value_map().items()
+		if len(cells) == 2
+	]
+	if not values:
+		return set()
+
+	graph = _link_graph(puzzle)
+	topology = puzzle.topology()
+	peer_masks = topology.peer_masks()
+	group_mask = _group_mask(topology, group)
+	if group_mask is None:
+		return set()
+
+	for value in values:
+		value_mask = graph.value_mask(value)
+		pair = group_mask & value_mask
+		if _count_bits(pair) != 2:
+			# The group also contains a solved cell with the value.
+			continue
+
+		strong_links = graph.strong_links(value)
+		first = pair & -pair
+		colors = [first, 0]
+		links = set()  # type: Set[Tuple[int, Hashable]]
+		pending = [(first.bit_length() - 1, 0)]
+
+		while pending:
+			index, color = pending.pop()
+			for linked_index, group_index in strong_links.get(index, ()):
+				links.add((group_index, value))
+				bit = 1 << linked_index
+				if not (colors[0] | colors[1]) & bit:
+					colors[1 - color] |= bit
+					pending.append((linked_index, 1 - color))
+
+		seen = [
+			functools.reduce(int.__or__, (peer_masks[index] for index in _iter_bits(mask)), 0)
+			for mask in colors
+		]
+
+		cells_to_prune = 0
+		for color in (0, 1):
+			if colors[color] & seen[color]:
+				cells_to_prune |= colors[color]
+		if not cells_to_prune:
+			cells_to_prune = value_mask & ~(colors[0] | colors[1]) & seen[0] & seen[1]
+
+		changed_cells = _remove_value(graph, value, cells_to_prune, links, (), explanations)
+		if any(changed_cells):
+			return changed_cells
+
+	return set()
+
+
+def check_xy_wing(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		explanations: 'cnpp_solver.Explanations' = None) -> set:
+	"""
+	Checks for XY-Wings whose pivot is in the specified group. The pivot is a
+	cell with two potential values, X and Y, which shares groups with two
+	pincer cells whose potential values are X and Z, and Y and Z. Whichever
+	value the pivot has, one of the pincers must be Z, so Z is removed from the
+	cells that share a group with both pincers.
+	"""
+	return _check_wings(puzzle, group, 2, explanations)
+
+
+def check_xyz_wing(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		explanations: 'cnpp_solver.Explanations' = None) -> set:
+	"""
+	Checks for XYZ-Wings whose pivot is in the specified group. The pivot is a
+	cell with three potential values, X, Y, and Z, which shares groups with
+	two pincer cells whose potential values are X and Z, and Y and Z. One of
+	the three cells must be Z, so Z is removed from the cells that share a
+	group with all three of them.
+	"""
+	return _check_wings(puzzle, group, 3, explanations)
+
+
+def _check_wings(puzzle: cnpp.Puzzle, group: cnpp.Group, pivot_size: int,
+		explanations: 'cnpp_solver.Explanations' = None) -> set:
+	"""
+	Checks for XY-Wings if `pivot_size` is 2, or XYZ-Wings if it is 3.
+	"""
+
+	pivots = [
+		cell
+		for cell in group.iter_unsolved_cells()
+		if len(cell.snapshot()[1]) == pivot_size
+	]
+	if not pivots:
+		return set()
+
+	graph = _link_graph(puzzle)
+	topology = puzzle.topology()
+	peer_masks = topology.peer_masks()
+
+	for pivot in pivots:
+		pivot_index = topology.location_index(pivot.location())
+		pivot_values = graph.values(pivot_index)
+
+		pincers = [
+			(index, graph.values(index))
+			for index in _iter_bits(peer_masks[pivot_index] & graph.bivalue_mask())
+			if len(graph.values(index) & pivot_values) == pivot_size - 1
+		]
+
+		for (first_index, first_values), (second_index, second_values) in itertools.combinations(pincers, 2):
+			common_values = first_values & second_values
+			if len(common_values) != 1 or len(first_values | second_values | pivot_values) != 3:
+				continue
+
+			value = next(iter(common_values))
+
+			cells_to_prune = (
+				graph.value_mask(value) &
+				peer_masks[first_index] &
+				peer_masks[second_index] &
+				(peer_masks[pivot_index] if pivot_size == 3 else -1) &
+				~(1 << pivot_index)
+			)
+
+			changed_cells = _remove_value(
+				graph, value, cells_to_prune,
+				set(), (pivot_index, first_index, second_index), explanations,
+			)
+			if any(changed_cells):
+				return changed_cells
+
+	return set()
+
+
+def check_chains(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		explanations: 'cnpp_solver.Explanations' = None) -> set:
+	"""
+	Checks for alternating inference chains that start from a candidate in
+	the specified group.
+
+	A chain alternates between strong and weak links, and starts and ends with
+	a strong link, so if its first candidate is false, its last candidate is
+	true. The chains from a candidate are all followed at once: assuming that
+	the candidate is false, strong links make candidates true, and weak links
+	from those make other candidates false. For every candidate that is
+	reached as true, one of it and the first candidate must be true, so any
+	candidate that is weakly linked to both of them is removed.
+	"""
+
+	graph = _link_graph(puzzle)
+	topology = puzzle.topology()
+	peer_masks = topology.peer_masks()
+
+	for cell in group.iter_unsolved_cells():
+		index = topology.location_index(cell.location())
+		bit = 1 << index
+
+		for value in graph.values(index):
+			links = set()  # type: Set[Tuple[int, Hashable]]
+			bivalue_cells = set()  # type: Set[int]
+			true_masks = _follow_chains(graph, peer_masks, index, value, links, bivalue_cells)
+			if not true_masks:
+				continue
+
+			changed_cells = set()
+
+			if true_masks.get(value, 0) & bit:
+				# The candidate can't be false.
+				if explanations is not None:
+					explanations.placed(cell, graph.premises(links, bivalue_cells))
+				cell.set_value(value)
+				changed_cells.add(cell)
+				return changed_cells
+
+			for other_value, true_mask in true_masks.items():
+				if other_value == value:
+					seen = functools.reduce(
+						int.__or__,
+						(peer_masks[other_index] for other_index in _iter_bits(true_mask)),
+						0,
+					)
+					changed_cells |= _remove_value(
+						graph, value, graph.value_mask(value) & peer_masks[index] & seen,
+						links, bivalue_cells, explanations,
+					)
+					continue
+
+				if true_mask & bit:
+					# Either value must be in the cell, which rules out its
+					# other values.
+					for removed_value in graph.values(index) - {value, other_value}:
+						changed_cells |= _remove_value(
+							graph, removed_value, bit, links, bivalue_cells, explanations,
+						)
+
+				seen_true_mask = true_mask & peer_masks[index]
+				if seen_true_mask:
+					changed_cells |= _remove_value(
+						graph, other_value, bit, links, bivalue_cells, explanations,
+					)
+					changed_cells |= _remove_value(
+						graph, value, seen_true_mask, links, bivalue_cells, explanations,
+					)
+
+			if any(changed_cells):
+				return changed_cells
+
+	return set()
+
+
+def _follow_chains(graph: LinkGraph, peer_masks: Tuple[int, ...], index: int,
+		value: Hashable, links: Set[Tuple[int, Hashable]],
+		bivalue_cells: Set[int]) -> Dict[Hashable, int]:
+	"""
+	Assumes that the value is not in the cell, and follows every alternating
+	inference chain from there. Returns a dict that maps values to masks of
+	the cells that must then hold them. The strong links that are followed
+	are added to `links` and `bivalue_cells`.
+	"""
+
+	false_masks = {value: 1 << index}
+	true_masks = {}  # type: Dict[Hashable, int]
+	pending_false = [(index, value)]
+	bivalue_mask = graph.bivalue_mask()
+
+	while pending_false:
+		false_index, false_value = pending_false.pop()
+		implied = []
+
+		for linked_index, group_index in graph.strong_links(false_value).get(false_index, ()):
+			implied.append((linked_index, false_value))
+			links.add((group_index, false_value))
+
+		if bivalue_mask >> false_index & 1:
+			bivalue_cells.add(false_index)
+			implied.extend(
+				(false_index, other_value)
+				for other_value in graph.values(false_index)
+				if other_value != false_value
+			)
+
+		for true_index, true_value in implied:
+			bit = 1 << true_index
+			if true_masks.get(true_value, 0) & bit:
+				continue
+			true_masks[true_value] = true_masks.get(true_value, 0) | bit
+
+			# The candidates that are weakly linked to a true candidate are
+			# false. Only those with strong links lead any further.
+			newly_false = peer_masks[true_index] & graph.value_mask(true_value) & ~false_masks.get(true_value, 0)
+			false_masks[true_value] = false_masks.get(true_value, 0) | newly_false
+
+			strong_links = graph.strong_links(true_value)
+			pending_false.extend(
+				(false_index, true_value)
+				for false_index in _iter_bits(newly_false)
+				if false_index in strong_links or bivalue_mask >> false_index & 1
+			)
+
+			for other_value in graph.values(true_index):
+				if other_value != true_value and not false_masks.get(other_value, 0) & bit:
+					false_masks[other_value] = false_masks.get(other_value, 0) | bit
+					pending_false.append((true_index, other_value))
+
+	return true_masks
+
+
+def _remove_value(graph: LinkGraph, value: Hashable, mask: int,
+		links: Set[Tuple[int, Hashable]], cells: Iterable[int],
+		explanations: Optional['cnpp_solver.Explanations']) -> set:
+	"""
+	Removes the value from the potential values of the cells in the mask,
+	recording the links and cells that the removal was deduced from. Returns
+	the set of cells that were changed.
+	"""
+
+	changed_cells = set()
+	premises = None
+
+	for cell in graph.cells(mask):
+		if cell.remove_value(value):
+			changed_cells.add(cell)
+			if explanations is not None:
+				if premises is None:
+					premises = graph.premises(links, cells)
+				explanations.removed(cell, [value], premises)
+
+	return changed_cells
+
+
+def _group_mask(topology: cnpp.Topology, group: cnpp.Group) -> Optional[int]:
+	group_index = topology.group_index(cell.location() for cell in group)
+	if group_index is None:
+		return None
+	return topology.group_masks()[group_index]
+
+
+def _iter_bits(mask: int) -> Iterable[int]:
+	"""
+	Returns an iterator over the indexes of the bits set in the mask.
+	"""
+
+	while mask:
+		bit = mask & -mask
+		yield bit.bit_length() - 1
+		mask ^= bit
+
+
+def _count_bits(mask: int) -> int:
+	return bin(mask).count('1')
+
+
+# The strategies in the order that `register_strategies` registers them.
+STRATEGIES = (
+	('Simple Coloring', check_simple_coloring),
+	('XY-Wing', check_xy_wing),
+	('XYZ-Wing', check_xyz_wing),
+	('Alternating Inference Chains', check_chains),
+)  # type: Tuple[Tuple[str, cnpp_solver.Strategy], ...]
+
+
+def register_strategies():
+	"""
+	Registers the strategies with `cnpp_solver.register_strategy`, so that
+	the solver applies them after the built-in strategies. They are not
+	registered by importing this module, because they slow down the solver
+	on puzzles that the built-in strategies and guessing already handle.
+	"""
+
+	for name, strategy in STRATEGIES:
+		cnpp_solver.register_strategy(name, strategy)
+
+
+def unregister_strategies():
+	"""
+	Stops applying the strategies that `register_strategies` registered.
+	"""
+
+	for name, _ in STRATEGIES:
+		if name in cnpp_solver.strategy_names():
+			cnpp_solver.unregister_strategy(name)
@@ -0,0 +1,283 @@
+r"""
+
+Contains a binary file format for large collections of puzzles that share a
+topology, and a converter from CSV. A dataset file starts with a header that
+names the puzzles' topology, followed by a fixed-width record with the givens
+of each puzzle and, optionally, by a fixed-width record with the solution of
+each puzzle. Each record lists the cells in the order of the topology's
+locations, using the same values as `cnpp_verification.pack_values`: the
+position of the cell's value in the topology's symbols plus one, or 0 if the
+cell is empty.
+
+Records either use one byte per cell, which is 81 bytes for a Sudoku, or one
+nibble per cell, which is 41 bytes for a Sudoku. Nibble records store the
+first cell of each pair in the high nibble, and can only be used if the
+topology has fewer than 16 symbols.
+
+Datasets are read through a memory map, so opening a dataset does not read
+or parse the file, and every process that opens the same file shares its
+pages. Datasets are pickled as their file name, which lets worker processes
+open their own map and read a slice of the records by index.
+
+"""
+
+import csv
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from . import cnpp, cnpp_verification
+
+_MAGIC = b'CNPD'
+_VERSION = 1
+
+# The header contains the magic bytes, the version of the format, flags, the
+# length of the topology's name, and the number of puzzles. It is followed by
+# the name of the topology.
+_HEADER = struct.Struct('<4sBBHQ')
+
+_HAS_SOLUTIONS = 0x1
+_NIBBLES = 0x2
+
+# Tables for `bytes.translate`, which split each byte of a nibble record into
+# the values of the two cells it stores, and which shift the value of a cell
+# into the high nibble.
+_HIGH_NIBBLES = bytes(byte >> 4 for byte in range(256))
+_LOW_NIBBLES = bytes(byte & 0xF for byte in range(256))
+_TO_HIGH_NIBBLE = bytes((byte << 4) & 0xFF for byte in range(256))
+
+
+class Dataset(object):
+	"""
+	Reads puzzles from a dataset file that was written by `write_dataset` or
+	`convert_csv`. The topology that is named by the file must be registered
+	with `cnpp.register_topology`.
+	"""
+
+	def __init__(self, file_name: str):
+		self._file_name = file_name
+
+		with open(file_name, 'rb') as file:
+			self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, version, flags, name_length, length = _HEADER.unpack_from(self._map)
+		if magic != _MAGIC or version != _VERSION:
+			self._map.close()
+			raise ValueError(f'{file_name} is not a version {_VERSION} puzzle dataset.')
+
+		name_offset = _HEADER.size
+		self._topology = cnpp.get_topology(
+			self._map[name_offset:name_offset + name_length].decode('utf-8')
+		)
+		self._length = length
+		self._has_solutions = bool(flags & _HAS_SOLUTIONS)
+		self._nibbles = bool(flags & _NIBBLES)
+
+		num_cells = len(self._topology.locations())
+		self._record_size = (num_cells + 1) // 2 if self._nibbles else num_cells
+		self._givens_offset = name_offset + name_length
+		self._solutions_offset = self._givens_offset + length * self._record_size
+
+		expected_size = self._solutions_offset + (length * self._record_size if self._has_solutions else 0)
+		if len(self._map) != expected_size:
+			self._map.close()
+			raise ValueError(f'Expected {file_name} to contain {expected_size} bytes, found {len(self._map)}.')
+
+	def topology(self) -> cnpp.Topology:
+		return self._topology
+
+	def has_solutions(self) -> bool:
+		return self._has_solutions
+
+	def givens(self, index: int) -> bytes:
+		"""
+		Returns the givens of a puzzle, with one byte per cell.
+		"""
+		return self._read(self._givens_offset, index)
+
+	def solution(self, index: int) -> bytes:
+		"""
+		Returns the solution of a puzzle, with one byte per cell.
+		"""
+		if not self._has_solutions:
+			raise ValueError(f'{self._file_name} does not contain solutions.')
+		return self._read(self._solutions_offset, index)
+
+	def iter_givens(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+		"""
+		Iterates through the givens of the puzzles from `start` up to, but not
+		including, `stop`.
+		"""
+		for index in range(*slice(start, stop).indices(self._length)):
+			yield self.givens(index)
+
+	def iter_solutions(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+		"""
+		Iterates through the solutions of the puzzles from `start` up to, but
+		not including, `stop`.
+		"""
+		for index in range(*slice(start, stop).indices(self._length)):
+			yield self.solution(index)
+
+	def puzzle(self, index: int, puzzle_type: type = cnpp.Puzzle) -> cnpp.Puzzle:
+		"""
+		Creates a puzzle of the specified type from the givens of a puzzle.
+		"""
+
+		symbols = (None,) + self._topology.symbols()
+		return self._topology.build_puzzle_from_values(
+			puzzle_type,
+			(symbols[value] for value in self.givens(index)),
+		)
+
+	def close(self):
+		self._map.close()
+
+	def _read(self, offset: int, index: int) -> bytes:
+		if not 0 <= index < self._length:
+			raise IndexError(f'Puzzle index {index} is out of range.')
+
+		start = offset + index * self._record_size
+		record = self._map[start:start + self._record_size]
+
+		if not self._nibbles:
+			return record
+
+		values = bytearray(2 * len(record))
+		values[0::2] = record.translate(_HIGH_NIBBLES)
+		values[1::2] = record.translate(_LOW_NIBBLES)
+		return bytes(values[:len(self._topology.locations())])
+
+	def __len__(self) -> int:
+		return self._length
+
+	def __enter__(self) -> 'Dataset':
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def __reduce__(self):
+		return (Dataset, (self._file_name,))
+
+	def __repr__(self) -> str:
+		ctor_name = self.__class__.__name__
+		return f'{ctor_name}({self._file_name!r})'
+
+
+def write_dataset(file_name: str, topology: cnpp.Topology, givens: Iterable[bytes],
+		solutions: Optional[Iterable[bytes]] = None, nibbles: bool = False) -> int:
+	"""
+	Writes a dataset file from the givens of each puzzle and, optionally, the
+	solution of each puzzle, with one byte per cell. The topology must be
+	registered with `cnpp.register_topology`. Returns the number of puzzles
+	that were written.
+
+	The dataset is written to a temporary file in the same directory, which
+	only replaces `file_name` once every record has been written, so a failed
+	write never leaves a truncated dataset behind.
+	"""
+
+	name = topology.name()
+	assert name and cnpp.get_topology(name) is topology, 'Only registered topologies can be written to datasets.'
+	if nibbles and len(topology.symbols()) > 15:
+		raise ValueError('Nibble records can only be used with fewer than 16 symbols.')
+
+	num_cells = len(topology.locations())
+	encoded_name = name.encode('utf-8')
+	flags = (_HAS_SOLUTIONS if solutions is not None else 0) | (_NIBBLES if nibbles else 0)
+
+	def _encode(record: bytes) -> bytes:
+		if len(record) != num_cells:
+			raise ValueError(f'Every record must contain {num_cells} cells.')
+		if nibbles:
+			# The nibbles are combined by OR-ing the high and low nibbles of
+			# the whole record as integers.
+			high = record[0::2].translate(_TO_HIGH_NIBBLE)
+			low = record[1::2] + bytes(num_cells % 2)
+			combined = int.from_bytes(high, 'big') | int.from_bytes(low, 'big')
+			return combined.to_bytes(len(high), 'big')
+		return bytes(record)
+
+	length = 0
+
+	# Unlike `tempfile.mkstemp`, `open` creates the file with the same
+	# permissions as any other file that the process writes.
+	temporary_file_name = f'{file_name}.{os.getpid()}.tmp'
+
+	try:
+		with open(temporary_file_name, 'xb') as file, tempfile.TemporaryFile() as solutions_file:
+			# The number of puzzles is written after all of the records.
+			file.write(_HEADER.pack(_MAGIC, _VERSION, flags, len(encoded_name), 0))
+			file.write(encoded_name)
+
+			if solutions is None:
+				for record in givens:
+					file.write(_encode(record))
+					length += 1
+
+			else:
+				# The solutions follow all of the givens, so they are written
+				# to a temporary file until the givens have been written.
+				solutions = iter(solutions)
+				for record in givens:
+					solution = next(solutions, None)
+					if solution is None:
+						raise ValueError('Every puzzle must have a solution.')
+					file.write(_encode(record))
+					solutions_file.write(_encode(solution))
+					length += 1
+
+				if next(solutions, None) is not None:
+					raise ValueError('Every solution must have a puzzle.')
+
+				solutions_file.seek(0)
+				shutil.copyfileobj(solutions_file, file)
+
+			file.seek(0)
+			file.write(_HEADER.pack(_MAGIC, _VERSION, flags, len(encoded_name), length))
+
+		os.replace(temporary_file_name, file_name)
+
+	except BaseException:
+		os.remove(temporary_file_name)
+		raise
+
+	return length
+
+
+def convert_csv(csv_file_name: str, file_name: str, topology: cnpp.Topology,
+		givens_column: str = 'quizzes', solutions_column: Optional[str] = 'solutions',
+		nibbles: bool = False) -> int:
+	"""
+	Converts a CSV file into a dataset file. Each row of the CSV lists the
+	givens of a puzzle and, if `solutions_column` is not `None`, its solution,
+	as strings in the format that `cnpp_verification.pack_strings` accepts.
+	Returns the number of puzzles that were converted.
+	"""
+
+	def _column(name: str) -> Iterator[str]:
+		with open(csv_file_name, 'r', newline='') as data:
+			for row in csv.DictReader(data):
+				yield row[name]
+
+	def _records(name: str) -> Iterator[bytes]:
+		# Rows are packed in batches, to share the overhead of packing.
+		batch = []  # type: list[str]
+		for value in _column(name):
+			batch.append(value)
+			if len(batch) == 10000:
+				yield from cnpp_verification.pack_strings(topology, batch)
+				batch = []
+		yield from cnpp_verification.pack_strings(topology, batch)
+
+	return write_dataset(
+		file_name,
+		topology,
+		_records(givens_column),
+		_records(solutions_column) if solutions_column is not None else None,
+		nibbles=nibbles,
+	)
@@ -0,0 +1,248 @@
+r"""
+
+Contains a variant of the solver that splits the search tree of a single
+puzzle across worker processes. This is useful for large, hard puzzles, where
+the sequential solver spends most of its time guessing on a single core.
+
+"""
+
+import copy
+import multiprocessing
+import queue
+from typing import List, Optional, Tuple
+
+from . import cnpp, cnpp_solver
+
+# The number of seconds that the parent process waits for a result before
+# checking whether the workers are still alive.
+_POLL_INTERVAL = 0.5
+
+
+def solve(puzzle: cnpp.Puzzle, processes: Optional[int] = None,
+		tasks_per_process: int = 4) -> (cnpp.Puzzle, cnpp.PuzzleState):
+	"""
+	Solves the input number-placement puzzle using multiple processes. Returns
+	a tuple containing a copy of the puzzle and its resulting state. Does not
+	modify the input puzzle.
+
+	The search tree is split at the cell that `cnpp_solver.solve` would guess
+	the value of by default, until there are about
+	`tasks_per_process` subtrees per process. Each worker searches its subtrees
+	depth first. Whenever a worker is idle, busy workers give away the
+	shallowest unexplored branches of their own subtrees. The first solution
+	found by any worker stops the others, so if a puzzle has more than one
+	solution, the solution that is returned may vary between runs.
+
+	If the puzzle has no solution, the returned puzzle is the last one that
+	was found to conflict, as with `cnpp_solver.solve`. If a worker process
+	dies before the search is done, the puzzle is solved again by
+	`cnpp_solver.solve` in this process.
+	"""
+
+	processes = processes or multiprocessing.cpu_count()
+
+	_puzzle, _puzzle_state = cnpp_solver._solve(copy.deepcopy(puzzle))
+	if _puzzle_state != cnpp.PuzzleState.Unsolved:
+		return _puzzle, _puzzle_state
+
+	frontier = [_puzzle]
+	conflicted = _puzzle
+	while 0 < len(frontier) < processes * tasks_per_process:
+		next_frontier = []
+		for node in frontier:
+			for branch in _branches(node):
+				child, child_state = _explore(branch)
+				if child_state == cnpp.PuzzleState.Solved:
+					return child, child_state
+				if child_state == cnpp.PuzzleState.Unsolved:
+					next_frontier.append(child)
+				else:
+					conflicted = child
+
+		frontier = next_frontier
+
+	if not frontier:
+		return conflicted, cnpp.PuzzleState.Conflict
+
+	result = _search_in_parallel(frontier, processes)
+	if result is None:
+		return cnpp_solver.solve(puzzle)
+
+	return result
+
+
+def _branches(puzzle: cnpp.Puzzle) -> list:
+	"""
+	Splits the search tree the same way that `cnpp_solver.solve` does by
+	default: one branch guesses the first potential value of the chosen cell,
+	and the other branch removes that value from the cell. The branches are
+	described as tuples, which are explored by `_explore`.
+	"""
+
+	branching = cnpp_solver.DEFAULT_BRANCHING()
+	cell = branching.select_cell(puzzle)
+	guess = branching.order_values(puzzle, cell)[0]
+	return [
+		(puzzle, cell.location(), guess, True),
+		(puzzle, cell.location(), guess, False),
+	]
+
+
+def _explore(branch: tuple) -> (cnpp.Puzzle, cnpp.PuzzleState):
+	"""
+	Creates the puzzle described by a branch and runs the deterministic
+	strategies on it. Returns a tuple containing the puzzle and its state.
+	"""
+
+	puzzle, location, guess, is_guess = branch
+
+	if is_guess:
+		puzzle = copy.deepcopy(puzzle)
+		cell = puzzle.get_cell(location)
+		cell.set_value(guess)
+	else:
+		# The branch that removes the guess is always explored after the
+		# branch that makes the guess, so it can reuse its parent puzzle.
+		cell = puzzle.get_cell(location)
+		cell.remove_value(guess)
+
+	# The parent puzzle has already been processed, so only the groups of
+	# the changed cell need to be processed again.
+	return cnpp_solver._solve(puzzle, groups=puzzle.get_groups(cell))
+
+
+def _search_in_parallel(frontier: List[cnpp.Puzzle],
+		processes: int) -> Optional[Tuple[cnpp.Puzzle, cnpp.PuzzleState]]:
+	"""
+	Distributes the branches of the nodes in the frontier across worker
+	processes and waits for either the first solution or for every branch to be
+	exhausted. Returns `None` if a worker died before the search was done.
+	"""
+
+	branches = [
+		branch
+		for node in frontier
+		for branch in _branches(node)
+	]
+
+	context = multiprocessing.get_context()
+	tasks = context.Queue()
+	results = context.Queue()
+	stop = context.Event()
+
+	# `pending` counts the branches that have been queued or are being
+	# searched. `idle` counts the workers that are waiting for a branch.
+	pending = context.Value('i', len(branches))
+	idle = context.Value('i', 0)
+
+	for branch in branches:
+		tasks.put(branch)
+
+	workers = [
+		context.Process(
+			target=_worker,
+			args=(tasks, results, stop, pending, idle),
+			daemon=True,
+		)
+		for _ in range(processes)
+	]
+
+	for worker in workers:
+		worker.start()
+
+	try:
+		result = None
+		while result is None:
+			try:
+				result = results.get(timeout=_POLL_INTERVAL)
+			except queue.Empty:
+				# A worker that dies takes its branches with it, so the others
+				# would wait for them forever.
+				if any(worker.exitcode for worker in workers) or not any(worker.is_alive() for worker in workers):
+					break
+	finally:
+		stop.set()
+		for worker in workers:
+			worker.join(timeout=1)
+			if worker.is_alive():
+				worker.terminate()
+		tasks.cancel_join_thread()
+
+	return result
+
+
+def _worker(tasks, results, stop, pending, idle):
+	"""
+	Searches branches from the task queue until a solution is found or the
+	search is stopped. Puts the first solution it finds on the result queue or,
+	if it searched the last pending branch without finding one, the last
+	puzzle that it found to conflict.
+	"""
+
+	# Branches that are given away after the search is stopped are never
+	# read, which must not stop this process from exiting.
+	tasks.cancel_join_thread()
+
+	while not stop.is_set():
+		with idle.get_lock():
+			idle.value += 1
+
+		try:
+			branch = tasks.get(timeout=0.05)
+		except queue.Empty:
+			continue
+		finally:
+			with idle.get_lock():
+				idle.value -= 1
+
+		puzzle, puzzle_state = _search(branch, tasks, stop, pending, idle)
+		if puzzle_state == cnpp.PuzzleState.Solved:
+			results.put((puzzle, puzzle_state))
+			stop.set()
+			return
+
+		with pending.get_lock():
+			pending.value -= 1
+			if pending.value == 0:
+				results.put((puzzle, cnpp.PuzzleState.Conflict))
+				return
+
+
+def _search(branch: tuple, tasks, stop, pending, idle) -> (Optional[cnpp.Puzzle], cnpp.PuzzleState):
+	"""
+	Searches the subtree below a branch depth first. Returns a tuple containing
+	the first solution that it finds and the Solved state or, if the subtree
+	does not contain a solution or if the search was stopped, the last puzzle
+	that conflicted and the Conflict state. Gives away the shallowest
+	unexplored branch when other workers are idle.
+	"""
+
+	# The stack holds unexplored branches. Pushing a node's branches in
+	# reverse order makes the search explore the guess first.
+	stack = [branch]
+	conflicted = None
+
+	while stack and not stop.is_set():
+		child, child_state = _explore(stack.pop())
+
+		if child_state == cnpp.PuzzleState.Solved:
+			return child, child_state
+
+		if child_state == cnpp.PuzzleState.Unsolved:
+			stack.extend(reversed(_branches(child)))
+		else:
+			conflicted = child
+
+		if idle.value > 0 and len(stack) > 1:
+			branch = stack.pop(0)
+			puzzle, location, guess, is_guess = branch
+			if is_guess:
+				# The other branch of the same node is still on this
+				# worker's stack, so the recipient works on its own copy.
+				branch = (copy.deepcopy(puzzle), location, guess, is_guess)
+
+			with pending.get_lock():
+				pending.value += 1
+			tasks.put(branch)
+
+	return conflicted, cnpp.PuzzleState.Conflict
@@ -0,0 +1,297 @@
+r"""
+
+Contains a solver session for interactive use, where values are placed into
+and erased from a puzzle one at a time. The session keeps the result of running
+the deterministic strategies on the puzzle and updates it incrementally after
+each edit, instead of solving the puzzle from scratch.
+
+"""
+
+from collections import defaultdict
+import copy
+from typing import FrozenSet, Hashable, Iterable, List, NamedTuple, Set, Tuple, Union
+
+from . import cnpp, cnpp_solver
+
+
+class _Edit(NamedTuple):
+	"""
+	Records a value that was placed during a session, along with the level
+	that identifies the edit in the session's `_Dependencies`.
+	"""
+
+	location: Hashable
+	value: Hashable
+	level: int
+
+
+class _Dependencies(cnpp_solver.Explanations):
+	"""
+	Records which edits the state of each cell depends on, the same way that
+	the solver records which guesses it depends on. Each edit is identified by
+	its level. The facts that depend on an edit are also indexed by its level,
+	so erasing an edit only visits the facts that depend on it.
+	"""
+
+	__slots__ = ('_facts',)
+
+	def __init__(self):
+		super().__init__()
+
+		# Maps levels to the (location, value) pairs of the exclusions that
+		# depend on them, and to the (location, None) pairs of the placements
+		# that depend on them. Facts that were changed since they were indexed
+		# are skipped when their edit is erased.
+		self._facts = defaultdict(list)  # type: defaultdict[int, List[Tuple[Hashable, Hashable | None]]]
+
+	def removed(self, cell: cnpp.Cell, values: Iterable[Hashable],
+			premises: Union[int, Iterable[cnpp_solver.Premise]]):
+		values = tuple(values)
+		edits = premises if isinstance(premises, int) else self.premises(premises)
+		super().removed(cell, values, edits)
+
+		location = cell.location()
+		for level in _iter_levels(edits):
+			self._facts[level].extend((location, value) for value in values)
+
+	def placed(self, cell: cnpp.Cell, premises: Union[int, Iterable[cnpp_solver.Premise]]):
+		edits = premises if isinstance(premises, int) else self.premises(premises)
+		super().placed(cell, edits)
+
+		location = cell.location()
+		for level in _iter_levels(edits):
+			self._facts[level].append((location, None))
+
+	def is_placed(self, location: Hashable) -> bool:
+		return location in self._placements
+
+	def forget(self, level: int) -> Set[Hashable]:
+		"""
+		Deletes the facts that depend on the edit at the level. Returns the
+		locations of the cells whose facts were deleted.
+		"""
+
+		bit = 1 << level
+		locations = set()
+
+		for location, value in self._facts.pop(level, ()):
+			facts = self._placements if value is None else self._exclusions
+			key = location if value is None else (location, value)
+			if facts.get(key, 0) & bit:
+				del facts[key]
+				locations.add(location)
+
+		return locations
+
+	def excluded_values(self, location: Hashable, values: Iterable[Hashable]) -> Set[Hashable]:
+		"""
+		Returns the values that are still ruled out for the cell at the
+		location, and updates the edits that the cell's state depends on to
+		match them.
+		"""
+
+		excluded_values = set()
+		edits = 0
+
+		for value in values:
+			exclusion = self._exclusions.get((location, value))
+			if exclusion is not None:
+				excluded_values.add(value)
+				edits |= exclusion
+
+		self._states[location] = edits
+		return excluded_values
+
+
+class SolverSession(object):
+	"""
+	Keeps the state of a puzzle after its deterministic strategies have been
+	applied, and updates that state as values are placed and erased.
+
+	Placing a value only processes the groups that contain the cell, and the
+	groups that are changed as a result. Each change that the strategies make
+	is recorded along with the edits that it was deduced from, so erasing an
+	edit, in any order, only undoes the changes that depend on it, and then
+	processes the groups of the cells that were restored.
+	"""
+
+	def __init__(self, puzzle: cnpp.Puzzle):
+		"""
+		Starts a session with a copy of the puzzle. Does not modify the input
+		puzzle.
+		"""
+
+		self._puzzle = copy.deepcopy(puzzle)
+
+		# Cells are restored from their starting state, without the values
+		# that are still ruled out.
+		self._initial_cells = {
+			cell.location(): cell.snapshot()
+			for cell in self._puzzle.iter_cells()
+		}  # type: dict[Hashable, Tuple[Hashable, FrozenSet[Hashable]]]
+
+		self._dependencies = _Dependencies()
+		self._puzzle, self._state = cnpp_solver._solve(self._puzzle, explanations=self._dependencies)
+		self._edits = []  # type: List[_Edit]
+		self._next_level = 1
+
+	def puzzle(self) -> cnpp.Puzzle:
+		"""
+		Returns the session's puzzle, which should not be modified directly.
+		"""
+		return self._puzzle
+
+	def state(self) -> cnpp.PuzzleState:
+		"""
+		Returns the state of the puzzle after the most recent edit.
+		"""
+		return self._state
+
+	def edits(self) -> List[Tuple[Hashable, Hashable]]:
+		"""
+		Returns a list of the locations and values that have been placed, in
+		the order that they were placed.
+		"""
+		return [(edit.location, edit.value) for edit in self._edits]
+
+	def potential_values(self, location: Hashable) -> FrozenSet[Hashable]:
+		"""
+		Returns the potential values of the cell at the location.
+		"""
+		return self._get_cell(location).snapshot()[1]
+
+	def place(self, location: Hashable, value: Hashable) -> cnpp.PuzzleState:
+		"""
+		Places a value into the cell at the location, replacing any value that
+		was previously placed there during this session. Returns the resulting
+		state of the puzzle.
+		"""
+
+		if any(edit.location == location for edit in self._edits):
+			self.erase(location)
+
+		self._place(location, value)
+		return self.state()
+
+	def erase(self, location: Hashable) -> cnpp.PuzzleState:
+		"""
+		Erases the value that was placed into the cell at the location during
+		this session. Returns the resulting state of the puzzle.
+		"""
+
+		index = next(
+			(
+				index
+				for index, edit in enumerate(self._edits)
+				if edit.location == location
+			),
+			None,
+		)
+
+		if index is None:
+			raise ValueError(f'No value was placed at {location} during this session.')
+
+		edit = self._edits.pop(index)
+
+		restored_cells = [
+			self._restore(restored_location)
+			for restored_location in self._dependencies.forget(edit.level)
+		]
+
+		if self._state == cnpp.PuzzleState.Conflict:
+			# The strategies stop at a conflict, and are not applied to the
+			# edits that are made while the puzzle has one, so every group is
+			# processed again, unless the remaining edits still conflict.
+			if cnpp_solver._contains_conflict(self._puzzle.iter_cells(), self._puzzle.iter_groups()):
+				return self.state()
+			_, self._state = cnpp_solver._solve(self._puzzle, explanations=self._dependencies)
+		else:
+			# Groups hash by identity, so they are kept in the order of the
+			# restored cells, which keeps the order they are processed in the
+			# same between runs.
+			_, self._state = cnpp_solver._solve(
+				self._puzzle,
+				groups=list(dict.fromkeys(
+					group
+					for cell in restored_cells
+					for group in self._puzzle.get_groups(cell)
+				)),
+				explanations=self._dependencies,
+			)
+
+		return self.state()
+
+	def solve(self) -> (cnpp.Puzzle, cnpp.PuzzleState):
+		"""
+		Solves a copy of the session's puzzle, guessing if necessary.
+		"""
+		return cnpp_solver.solve(self._puzzle)
+
+	def _get_cell(self, location: Hashable) -> cnpp.Cell:
+		cell = self._puzzle.get_cell(location)
+		if cell is None:
+			raise KeyError(location)
+		return cell
+
+	def _place(self, location: Hashable, value: Hashable):
+		"""
+		Places a value and applies the deterministic strategies to the groups
+		that are affected, recording the edit that the changes depend on.
+		"""
+
+		cell = self._get_cell(location)
+		current_value, potential_values = cell.snapshot()
+
+		level = self._next_level
+		self._next_level += 1
+		self._edits.append(_Edit(location, value, level))
+
+		# The placement is recorded even if the value was already deduced, so
+		# that the cell keeps the value if the deduction is undone.
+		self._dependencies.placed(cell, 1 << level)
+
+		if (current_value or cell.value()) == value:
+			# The value was already deduced, so the puzzle does not change.
+			pass
+
+		elif self._state == cnpp.PuzzleState.Conflict or value not in potential_values:
+			# A value that was ruled out by the strategies conflicts with the
+			# starting values or with earlier edits.
+			cell.set_value(value)
+			self._state = cnpp.PuzzleState.Conflict
+
+		else:
+			cell.set_value(value)
+			_, self._state = cnpp_solver._solve(
+				self._puzzle, groups=self._puzzle.get_groups(cell),
+				explanations=self._dependencies,
+			)
+
+	def _restore(self, location: Hashable) -> cnpp.Cell:
+		"""
+		Restores the cell at the location to its starting state, without the
+		values that are still ruled out. Cells whose value is still placed
+		keep it.
+		"""
+
+		cell = self._puzzle.get_cell(location)
+		if self._dependencies.is_placed(location):
+			return cell
+
+		value, potential_values = self._initial_cells[location]
+		if not value:
+			potential_values = potential_values - self._dependencies.excluded_values(location, potential_values)
+
+		cell.restore((value, potential_values))
+		return cell
+
+
+def _iter_levels(edits: int) -> Iterable[int]:
+	"""
+	Returns an iterator over the levels of the edits in a bit mask.
+	"""
+
+	while edits:
+		bit = edits & -edits
+		yield bit.bit_length() - 1
+		edits ^= bit
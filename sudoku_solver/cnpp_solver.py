@@ -8,48 +8,563 @@ module.
 
 from collections import defaultdict
 import copy
+import functools
 import itertools
+from typing import Callable, Collection, Dict, FrozenSet, Hashable, Iterable, List, NamedTuple, Optional, Tuple, Union
+import weakref
 
 import heapdict
 
-from . import cnpp
+from . import cnpp, cnpp_branching
 
 
-def solve(puzzle: cnpp.Puzzle) -> (cnpp.Puzzle, cnpp.PuzzleState):
+class TraceEvent(NamedTuple):
 	"""
-	Solves the input number-placement puzzle. Returns a tuple containing a copy
-	of the puzzle and its resulting state. Does not modify the input puzzle.
+	Describes a single step taken by the solver. `kind` is one of:
+
+	- "deduction": a strategy, named by `strategy`, changed the puzzle while
+	processing `group`. `group` is `None` if the strategy was applied to the
+	whole puzzle.
+	- "guess": the solver guessed the value of a cell.
+	- "backtrack": a guess caused a conflict, so the guessed value was removed
+	from the cell's potential values.
+	- "backjump": a guess, described by `placed`, was abandoned because a
+	conflict below it did not depend on it. The search returns to the most
+	recent guess that the conflict did depend on.
+
+	Cells and groups are described by their locations, because the solver
+	works on copies of the input puzzle. `removed` maps the location of each
+	changed cell to the potential values that were removed from it, and `placed`
+	maps the location of each newly solved cell to its value.
+	"""
+
+	kind: str
+	strategy: Optional[str]
+	group: Optional[Tuple[Hashable, ...]]
+	removed: Dict[Hashable, FrozenSet[Hashable]]
+	placed: Dict[Hashable, Hashable]
+
+
+class Propagation(NamedTuple):
+	"""
+	The result of `propagate`. `puzzle` is the puzzle after the deterministic
+	strategies were applied, and its potential values are the remaining
+	candidates of each cell. `needs_guess` is true if the strategies could not
+	solve the puzzle and did not find a conflict. If every strategy was
+	applied, this means that `solve` would have had to guess. If only some of
+	the strategies were applied, the others might still solve the puzzle, so
+	it only means that the applied strategies were not enough.
+	"""
+
+	puzzle: cnpp.Puzzle
+	state: cnpp.PuzzleState
+	needs_guess: bool
+
+
+TraceCallback = Callable[[TraceEvent], None]
+
+# The branching heuristic that is used when `solve` is not given one.
+DEFAULT_BRANCHING = cnpp_branching.Branching
+
+# A cell and either a collection of values that the cell cannot have, or
+# `None` to refer to the cell's whole state.
+Premise = Tuple[cnpp.Cell, Optional[Collection[Hashable]]]
+
+# A strategy that can be registered with `register_strategy`. It is called
+# with the puzzle, the group to process, and the `Explanations` to record its
+# changes in, which may be `None`, and returns the set of cells it changed.
+# Traces are built from the recorded changes, so a strategy must record every
+# change when it is given an `Explanations`.
+Strategy = Callable[[cnpp.Puzzle, cnpp.Group, Optional['Explanations']], set]
+
+
+class Explanations(object):
+	"""
+	Records which guesses the state of each cell in a puzzle depends on. Each
+	guess is identified by its level, which is the number of guesses that it
+	is nested within, plus one. The guesses are described by bit masks, where
+	bit `level` is set if a fact depends on the guess made at that level.
+
+	The strategies record each change along with its premises, which are the
+	facts about other cells that the change was deduced from. A change
+	depends on every guess that its premises depend on.
+	"""
+
+	__slots__ = ('_exclusions', '_states', '_placements')
+
+	def __init__(self):
+		# Maps (location, value) pairs to the guesses that ruled the value out.
+		self._exclusions = {}  # type: Dict[Tuple[Hashable, Hashable], int]
+
+		# Maps locations to the guesses that any of the cell's changes depend
+		# on.
+		self._states = {}  # type: Dict[Hashable, int]
+
+		# Maps the locations of cells whose value was placed directly, rather
+		# than by ruling out their other values, to the guesses that the
+		# placement depends on.
+		self._placements = {}  # type: Dict[Hashable, int]
+
+	def copy(self) -> 'Explanations':
+		explanations = Explanations()
+		explanations._exclusions = dict(self._exclusions)
+		explanations._states = dict(self._states)
+		explanations._placements = dict(self._placements)
+		return explanations
+
+	def state(self, cell: cnpp.Cell) -> int:
+		"""
+		Returns the guesses that the cell's value and potential values depend
+		on.
+		"""
+
+		location = cell.location()
+		placement = self._placements.get(location)
+		if placement is not None:
+			return placement
+
+		return self._states.get(location, 0)
+
+	def exclusion(self, cell: cnpp.Cell, value: Hashable) -> int:
+		"""
+		Returns the guesses that ruled out the value for the cell.
+		"""
+
+		if cell.value():
+			return self.state(cell)
+
+		return self._exclusions.get((cell.location(), value), 0)
+
+	def premises(self, premises: Iterable[Premise]) -> int:
+		"""
+		Returns the guesses that any of the premises depend on.
+		"""
+
+		guesses = 0
+		for cell, values in premises:
+			if values is None:
+				guesses |= self.state(cell)
+			else:
+				for value in values:
+					guesses |= self.exclusion(cell, value)
+
+		return guesses
+
+	def removed(self, cell: cnpp.Cell, values: Iterable[Hashable],
+			premises: Union[int, Iterable[Premise]]):
+		"""
+		Records that the values were removed from the cell's potential values
+		because of the premises, or because of a bit mask of guesses.
+		"""
+
+		guesses = premises if isinstance(premises, int) else self.premises(premises)
+		location = cell.location()
+
+		for value in values:
+			self._exclusions[(location, value)] = guesses
+
+		self._states[location] = self._states.get(location, 0) | guesses
+
+	def placed(self, cell: cnpp.Cell, premises: Union[int, Iterable[Premise]]):
+		"""
+		Records that the cell's value is placed because of the premises, or
+		because of a bit mask of guesses. This is recorded before the value is
+		set, while the cell's potential values still describe the cell from
+		before the change.
+		"""
+
+		guesses = premises if isinstance(premises, int) else self.premises(premises)
+		self._placements[cell.location()] = guesses
+
+
+class _TraceRecorder(object):
+	"""
+	Collects the changes that a strategy records, so that they can be traced
+	without comparing snapshots of the puzzle. Each change is also recorded
+	in `explanations`, if it is specified.
 	"""
 
-	def _solve(_puzzle: cnpp.Puzzle) -> (cnpp.Puzzle, cnpp.PuzzleState):
+	__slots__ = ('_explanations', '_removed', '_placed')
+
+	def __init__(self, explanations: Optional[Explanations]):
+		self._explanations = explanations
+
+		# Maps cells to the potential values that were removed from them.
+		self._removed = {}  # type: Dict[cnpp.Cell, set]
+
+		# Maps the cells whose value was placed directly to their potential
+		# values from before the placement.
+		self._placed = {}  # type: Dict[cnpp.Cell, FrozenSet[Hashable]]
+
+	def state(self, cell: cnpp.Cell) -> int:
+		return self._explanations.state(cell) if self._explanations is not None else 0
+
+	def exclusion(self, cell: cnpp.Cell, value: Hashable) -> int:
+		return self._explanations.exclusion(cell, value) if self._explanations is not None else 0
+
+	def premises(self, premises: Iterable[Premise]) -> int:
+		return self._explanations.premises(premises) if self._explanations is not None else 0
+
+	def removed(self, cell: cnpp.Cell, values: Iterable[Hashable],
+			premises: Union[int, Iterable[Premise]]):
+		values = set(values)
+		if self._explanations is not None:
+			self._explanations.removed(cell, values, premises)
+		self._removed.setdefault(cell, set()).update(values)
+
+	def placed(self, cell: cnpp.Cell, premises: Union[int, Iterable[Premise]]):
+		if self._explanations is not None:
+			self._explanations.placed(cell, premises)
+		self._placed.setdefault(cell, cell.snapshot()[1])
+
+	def cells(self) -> List[cnpp.Cell]:
+		"""
+		Returns the cells that changes were recorded for, in the order that
+		they were first changed.
+		"""
+		return list(dict.fromkeys(itertools.chain(self._removed, self._placed)))
+
+	def event(self, strategy: str, group: Optional[cnpp.Group],
+			cells: Iterable[cnpp.Cell] = None) -> TraceEvent:
 		"""
-		Solves the input number-placement puzzle. Modifies the input puzzle.
-		Returns a tuple containing the puzzle's resulting state as well as the
-		a reference to the input puzzle.
+		Describes the recorded changes as a "deduction" `TraceEvent`. If
+		`cells` is specified, only the changes to those cells are described.
 		"""
 
-		# Uses a priority queue to help select the next cell group to process.
-		group_priority_queue = heapdict.heapdict()
-		for group in _puzzle.iter_groups():
-			group_priority_queue[group] = 0
+		removed = {}
+		placed = {}
+
+		for cell in cells if cells is not None else self.cells():
+			location = cell.location()
+			removed_values = set(self._removed.get(cell, ()))
+			removed_values.update(self._placed.get(cell, ()))
+
+			# Cells that are left with a single potential value are solved.
+			value = cell.peek_value()
+			if value:
+				placed[location] = value
+				removed_values.discard(value)
+
+			if removed_values:
+				removed[location] = frozenset(removed_values)
+
+		return TraceEvent(
+			'deduction',
+			strategy,
+			tuple(cell.location() for cell in group) if group else None,
+			removed,
+			placed,
+		)
+
+	def undo(self):
+		"""
+		Restores the cells that the recorded changes were made to, and clears
+		the recorded changes.
+		"""
+
+		for cell in self.cells():
+			# Cells that were solved by the changes get back their empty
+			# value, and unchanged empty values are kept.
+			value, potential_values = cell.snapshot()
+			cell.restore((None if value else value, potential_values.union(
+				self._removed.get(cell, ()),
+				self._placed.get(cell, ()),
+				(value,) if value else (),
+			)))
+
+		self._removed.clear()
+		self._placed.clear()
+
+
+def solve(puzzle: cnpp.Puzzle, trace: TraceCallback = None,
+		branching: cnpp_branching.Branching = None) -> (cnpp.Puzzle, cnpp.PuzzleState):
+	"""
+	Solves the input number-placement puzzle. Returns a tuple containing a copy
+	of the puzzle and its resulting state. Does not modify the input puzzle.
+
+	If a `trace` callback is specified, it is called with a `TraceEvent` for
+	each deduction, guess, backtrack, and backjump, in the order that they
+	happen.
+
+	`branching` chooses the cell to guess and the order of the values to
+	guess, from the heuristics in `cnpp_branching`. By default, a new
+	instance of `DEFAULT_BRANCHING` is used, which guesses the values of the
+	cell with the fewest potential values. `LeastConstrainingValue` and
+	`DomWdeg` can be passed to search hard puzzles differently.
+
+	When a guess leads to a conflict, the search works out which of the open
+	guesses the conflict depends on, and jumps back past the guesses that it
+	does not depend on. Refuted guesses are not remembered as nogoods, so the
+	same combination of guesses can be refuted again in another branch.
+	"""
+
+	_puzzle, _puzzle_state, _ = _search(
+		copy.deepcopy(puzzle), trace, branching or DEFAULT_BRANCHING(),
+		Explanations(), 0,
+	)
+
+	return _puzzle, _puzzle_state
+
+
+def propagate(puzzle: cnpp.Puzzle, strategies: Collection[str] = None,
+		in_place: bool = False, trace: TraceCallback = None) -> Propagation:
+	"""
+	Applies the deterministic strategies to the puzzle without guessing, and
+	returns the resulting puzzle, its state, and whether solving it would
+	require a guess. By default, the input puzzle is copied. If `in_place` is
+	true, the input puzzle is modified instead, which avoids the copy.
+
+	`strategies` limits the strategies that are applied to the ones with the
+	given names, as listed by `strategy_names`. The values of solved cells are
+	always erased from the pencil markings of the whole puzzle first. If a
+	`trace` callback is specified, it is called with a `TraceEvent` for each
+	deduction.
+	"""
+
+	strategies = _check_strategy_names(strategies)
+	_puzzle = puzzle if in_place else copy.deepcopy(puzzle)
+	_puzzle, _puzzle_state = _solve(_puzzle, trace, strategies=strategies)
+
+	return Propagation(_puzzle, _puzzle_state, _puzzle_state == cnpp.PuzzleState.Unsolved)
+
+
+def _check_strategy_names(strategies: Optional[Collection[str]]) -> Optional[FrozenSet[str]]:
+	"""
+	Returns the strategy names as a set, or `None` if every strategy should be
+	applied. Raises a `KeyError` for names that are not listed by
+	`strategy_names`.
+	"""
+
+	if strategies is None:
+		return None
+
+	strategies = frozenset(strategies)
+	unknown_strategies = strategies.difference(strategy_names())
+	if unknown_strategies:
+		raise KeyError(', '.join(sorted(unknown_strategies)))
+
+	return strategies
+
+
+def _search(_puzzle: cnpp.Puzzle, trace: TraceCallback,
+		branching: cnpp_branching.Branching, explanations: Explanations,
+		level: int, groups: Iterable[cnpp.Group] = None) -> (cnpp.Puzzle, cnpp.PuzzleState, int):
+	"""
+	Solves the input number-placement puzzle, guessing if necessary. Modifies
+	the input puzzle and its `explanations`. `groups` is passed on to
+	`_solve`, so that after a guess, only the groups of the guessed cell are
+	processed again.
+
+	`level` is the number of guesses that the puzzle is nested within, and
+	`explanations` records which of those guesses the state of each cell
+	depends on. Returns a tuple containing the puzzle, its resulting state,
+	and, if the state is a conflict, a bit mask of the guesses that caused
+	the conflict.
+	"""
+
+	# Before the first guess, every change depends on no guesses, which is
+	# what the explanations assume for the changes they have not recorded.
+	_puzzle, _puzzle_state = _solve(_puzzle, trace, groups, explanations if level else None)
+
+	if _puzzle_state == cnpp.PuzzleState.Conflict:
+		branching.conflict(_puzzle)
+		return _puzzle, _puzzle_state, _explain_conflict(_puzzle, explanations)
+
+	if _puzzle_state != cnpp.PuzzleState.Unsolved:
+		return _puzzle, _puzzle_state, 0
+
+	# If the deterministic puzzle-solving functions were not able to fully
+	# solve the puzzle or determine if it has a conflict, then the solver
+	# needs to make a guess. Make a copy of the puzzle in case the guess turns
+	# out to cause a conflict.
+
+	_modified_puzzle = copy.deepcopy(_puzzle)
+	_modified_explanations = explanations.copy()
+	guess_level = 1 << (level + 1)
+
+	# Choose a cell and make a guess by choosing the first of its potential
+	# values, in the order preferred by the branching heuristic. After a
+	# guess, the cell is chosen from the regions of the guessed cell, until
+	# they are solved, so that the rest of the puzzle is not scanned.
+	region_indexes = None if groups is None else {_puzzle.region_of(group) for group in groups}
+	cell_with_a_guess = branching.select_cell(
+		_modified_puzzle, _unsolved_region_cells(_modified_puzzle, region_indexes),
+	)
+	guess = branching.order_values(_modified_puzzle, cell_with_a_guess)[0]
+	cell_with_a_guess.set_value(guess)
+	_modified_explanations.placed(cell_with_a_guess, guess_level)
+
+	if trace:
+		trace(TraceEvent('guess', None, None, {}, {cell_with_a_guess.location(): guess}))
+
+	# Attempt to solve using the recursive variant of solve. The rest of the
+	# puzzle has already been processed, so only the groups of the guessed
+	# cell need to be processed again.
+	_modified_puzzle, _puzzle_state, conflict = _search(
+		_modified_puzzle, trace, branching, _modified_explanations, level + 1,
+		_modified_puzzle.get_groups(cell_with_a_guess),
+	)
+
+	if _puzzle_state == cnpp.PuzzleState.Conflict:
+		del _modified_puzzle
+
+		if not conflict & guess_level:
+			# The conflict would have happened without the guess, so trying
+			# the cell's other values cannot resolve it. Jump back to the
+			# most recent guess that the conflict depends on.
+			if trace:
+				trace(TraceEvent(
+					'backjump', None, None,
+					{}, {cell_with_a_guess.location(): guess},
+				))
+
+			return _puzzle, _puzzle_state, conflict
+
+		# The modified puzzle could not be solved, which means the guess cannot
+		# be a possible value for the cell. Remove guess from the cell's
+		# potential values in the original copy. The removal depends on the
+		# other guesses that caused the conflict.
+
+		original_cell = _puzzle.get_cell(cell_with_a_guess.location())
+		original_cell.remove_value(guess)
+		explanations.removed(original_cell, [guess], conflict & ~guess_level)
+
+		if trace:
+			trace(TraceEvent(
+				'backtrack', None, None,
+				{original_cell.location(): frozenset([guess])}, {},
+			))
+
+		return _search(
+			_puzzle, trace, branching, explanations, level,
+			_puzzle.get_groups(original_cell),
+		)
+
+	return _modified_puzzle, _puzzle_state, 0
+
+
+def _explain_conflict(puzzle: cnpp.Puzzle, explanations: Explanations) -> int:
+	"""
+	Returns a bit mask of the guesses that a conflict in the puzzle depends
+	on. If the puzzle has more than one conflict, the explanation whose most
+	recent guess is the oldest is returned, which allows the search to jump
+	back the furthest.
+	"""
+
+	best_explanation = None
+
+	def _consider(explanation: int):
+		nonlocal best_explanation
+		if best_explanation is None or explanation.bit_length() < best_explanation.bit_length():
+			best_explanation = explanation
+
+	for group in puzzle.iter_groups():
+		cells_by_value = {}
+		for cell in group:
+			value = cell.value()
+			explanation = explanations.state(cell)
+
+			if not (value or any(cell.iter_potential_values())):
+				_consider(explanation)
+			elif value in cells_by_value:
+				_consider(explanation | cells_by_value[value])
+			elif value:
+				cells_by_value[value] = explanation
+
+	return best_explanation or 0
+
+
+def _solve(_puzzle: cnpp.Puzzle, trace: TraceCallback = None,
+		groups: Iterable[cnpp.Group] = None,
+		explanations: Explanations = None,
+		strategies: FrozenSet[str] = None) -> (cnpp.Puzzle, cnpp.PuzzleState):
+	"""
+	Solves the input number-placement puzzle using only the deterministic
+	strategies. Modifies the input puzzle. Returns a tuple containing the
+	a reference to the input puzzle as well as the puzzle's resulting state.
+
+	By default, every group in the puzzle is processed. If `groups` is
+	specified, only those groups, and the groups that are changed as a
+	result, are processed. This is only correct if the rest of the puzzle
+	has already been processed.
+
+	Groups are queued by region, as described by `cnpp.Puzzle.regions`. The
+	solver keeps processing the groups of one region until the region's
+	queue is empty, and only then moves on to another region whose groups
+	were changed.
+
+	If `explanations` is specified, each change is recorded in it. If
+	`strategies` is specified, only the strategies with those names are
+	applied to each group.
+	"""
+
+	if groups is None:
+		groups = _puzzle.iter_groups()
+
+		# `state` stops at the first group with unsolved cells, and later
+		# conflicts are only looked for in the cells and groups that change,
+		# so the givens are checked for conflicts once up front.
+		if _contains_conflict(_puzzle.iter_cells(), _puzzle.iter_groups()):
+			return _puzzle, cnpp.PuzzleState.Conflict
 
 		current_puzzle_state = _puzzle.state()
+		if current_puzzle_state != cnpp.PuzzleState.Unsolved:
+			return _puzzle, current_puzzle_state
+
+		# Erasing the values of all of the solved cells up front means that
+		# groups only need to erase the values of cells as they are solved.
+		_apply_strategy(
+			None, 'Erase Pencil Markings',
+			lambda _explanations: erase_pencil_markings(_puzzle, explanations=_explanations),
+			explanations, trace,
+		)
 
-		def _should_loop() -> bool:
-			"""
-			Satisfies the condition of the while loop below.
-			"""
-			return (
-				current_puzzle_state == cnpp.PuzzleState.Unsolved
-				and len(group_priority_queue) > 0
-			)
+	# Uses a priority queue per region to help select the next cell group to
+	# process.
+	regions = _puzzle.regions()
+	region_queues = [heapdict.heapdict() for _ in regions]
+
+	for group in groups:
+		region_queues[_puzzle.region_of(group)][group] = 0
+
+	# The unsolved cells of a region are counted when the solver first moves
+	# to the region, and a region's queue is dropped once all of its cells are
+	# solved. The strategies only change unsolved cells, so each cell is
+	# counted as solved in the iteration where it was solved.
+	num_unsolved_cells = [None] * len(regions)  # type: List[Optional[int]]
+
+	region_index = 0
+
+	# The strategies only see the index while this call is processing the
+	# puzzle, because the puzzle can be changed without it afterwards.
+	candidate_index = _CandidateIndex(_puzzle)
+	previous_index = _CANDIDATE_INDEXES.get(_puzzle)
+	_CANDIDATE_INDEXES[_puzzle] = candidate_index
+
+	try:
+		while True:
+			group_priority_queue = region_queues[region_index]
+			if group_priority_queue and num_unsolved_cells[region_index] is None:
+				num_unsolved_cells[region_index] = sum(
+					1 for cell in _puzzle.region_cells(region_index) if not cell.value()
+				)
+
+			if not group_priority_queue or not num_unsolved_cells[region_index]:
+				group_priority_queue.clear()
+				region_index = next(
+					(index for index, region_queue in enumerate(region_queues) if region_queue),
+					None,
+				)
+				if region_index is None:
+					break
+				continue
 
-		while _should_loop():
 			# Pull the next group from the priority
 			(group, _) = group_priority_queue.popitem()
 
 			# Process the current group
-			changed_cells = process_cell_group(_puzzle, group)
+			changed_cells = process_cell_group(_puzzle, group, trace, explanations, strategies)
+			candidate_index.update(changed_cells)
 
 			# Calculate the number of times each group was changed
 			groups_changed = defaultdict(int)
@@ -59,88 +574,314 @@ def solve(puzzle: cnpp.Puzzle) -> (cnpp.Puzzle, cnpp.PuzzleState):
 
 			# Update priorities for groups using the calculations above
 			for changed_group, times_changed in groups_changed.items():
-				if changed_group not in group_priority_queue:
-					group_priority_queue[changed_group] = 0
-				group_priority_queue[changed_group] -= times_changed
+				region_queue = region_queues[_puzzle.region_of(changed_group)]
+				if changed_group not in region_queue:
+					region_queue[changed_group] = 0
+				region_queue[changed_group] -= times_changed
 
-			# Recalculate the puzzle's current state
-			current_puzzle_state = _puzzle.state()
+			# Only the changed cells and groups can have introduced a conflict,
+			# so the rest of the puzzle does not need to be checked.
+			if _contains_conflict(changed_cells, groups_changed):
+				return _puzzle, cnpp.PuzzleState.Conflict
 
-		return _puzzle, current_puzzle_state
+			for cell in changed_cells:
+				if cell.value():
+					for index in {_puzzle.region_of(cell_group) for cell_group in _puzzle.get_groups(cell)}:
+						if num_unsolved_cells[index]:
+							num_unsolved_cells[index] -= 1
+	finally:
+		if previous_index is None:
+			del _CANDIDATE_INDEXES[_puzzle]
+		else:
+			_CANDIDATE_INDEXES[_puzzle] = previous_index
 
-	_puzzle = copy.deepcopy(puzzle)
-	_puzzle, _puzzle_state = _solve(_puzzle)
+	# Conflicts were checked as the cells changed, so the whole puzzle is
+	# only checked once every cell is solved.
+	if any(num_unsolved_cells) or next(_puzzle.iter_unsolved_cells(), None) is not None:
+		return _puzzle, cnpp.PuzzleState.Unsolved
 
-	if _puzzle_state != cnpp.PuzzleState.Unsolved:
-		return _puzzle, _puzzle_state
+	return _puzzle, _puzzle.state()
 
-	# If the deterministic puzzle-solving functions were not able to fully
-	# solve the puzzle or determine if it has a conflict, then the solver
-	# needs to make a guess. Make a copy of the puzzle in case the guess turns
-	# out to cause a conflict.
 
-	_modified_puzzle = copy.deepcopy(_puzzle)
+def next_hint(puzzle: cnpp.Puzzle) -> Optional[TraceEvent]:
+	"""
+	Finds the easiest deduction that can currently be made in the puzzle,
+	without guessing. Returns a "deduction" `TraceEvent` describing the
+	strategy, the group, and the changes to the affected cells, or `None` if
+	the puzzle is solved, has a conflict, or has no deduction that the
+	strategies can find. Does not modify the input puzzle.
+
+	The values of the solved cells are first erased from the pencil markings
+	of their groups, which is not a deduction a player needs to be told
+	about, so it is only returned as a hint if it leaves a cell with a single
+	potential value. Otherwise, the strategies are tried from cheapest to
+	most expensive, and each strategy is tried on every group before moving
+	on to the next one. Conjugates, hidden conjugates, and fish are tried one
+	size at a time, so that a pair anywhere in the puzzle is found before a
+	triple. The search stops at the first strategy that changes the puzzle.
+
+	The strategies are applied to the input puzzle itself, and the changes
+	that they record are undone before returning, which avoids copying the
+	puzzle for each hint.
+	"""
 
-	# Choose a cell that has the fewest number of potential values and make a
-	# guess by choosing the first available potential value within that cell.
-	cell_with_a_guess = None
-	for cell in _modified_puzzle.iter_unsolved_cells():
-		should_swap_cell = (
-			not cell_with_a_guess or
-			len(cell.potential_values()) < len(cell_with_a_guess.potential_values())
-		)
+	# `state` stops at the first group with unsolved cells, so it can miss
+	# conflicting givens.
+	if _contains_conflict(puzzle.iter_cells(), puzzle.iter_groups()) or puzzle.state() != cnpp.PuzzleState.Unsolved:
+		return None
 
-		if should_swap_cell:
-			cell_with_a_guess = cell
+	erased = _TraceRecorder(None)
 
-	guess = next(cell_with_a_guess.iter_potential_values())
-	cell_with_a_guess.set_value(guess)
+	# Strategies that do not change the puzzle do not record anything, so a
+	# single recorder describes the first deduction.
+	recorder = _TraceRecorder(None)
 
-	# Attempt to solve using the recursive variant of solve.
-	_modified_puzzle, _puzzle_state = solve(_modified_puzzle)
+	try:
+		# Only the values of the cells that are already solved are erased,
+		# not the values of cells that are solved as a result.
+		for solved_cell in list(puzzle.iter_solved_cells()):
+			value = solved_cell.value()
+			for group in puzzle.get_groups(solved_cell):
+				for cell in group:
+					if not cell.snapshot()[0] and cell.remove_value(value):
+						erased.removed(cell, [value], ())
 
-	if _puzzle_state == cnpp.PuzzleState.Conflict:
-		# The modified puzzle could not be solved, which means the guess cannot
-		# be a possible value for the cell. Remove guess from the cell's
-		# potential values in the original copy.
+		for cell in erased.cells():
+			if cell.peek_value():
+				return erased.event('Erase Pencil Markings', None, [cell])
 
-		del _modified_puzzle
+		return _find_hint(puzzle, recorder)
+	finally:
+		recorder.undo()
+		erased.undo()
 
-		original_cell = _puzzle.get_cell(cell_with_a_guess.location())
-		original_cell.remove_value(guess)
 
-		return solve(_puzzle)
+def _find_hint(_puzzle: cnpp.Puzzle, recorder: '_TraceRecorder') -> Optional[TraceEvent]:
+	"""
+	Applies the strategies for `next_hint` until one of them changes the
+	puzzle, recording the changes in `recorder`, and returns a `TraceEvent`
+	describing them.
+	"""
+
+	groups = [
+		group
+		for group in _puzzle.iter_groups()
+		if any(group.unsolved_cells())
+	]
+	if not groups:
+		return None
+
+	max_size = max(len(group) for group in groups) // 2
 
-	return _modified_puzzle, _puzzle_state
+	strategies = [
+		('Last Remaining Cell', functools.partial(last_remaining_cell, explanations=recorder)),
+	] + [
+		('Conjugates', functools.partial(check_conjugate, number, explanations=recorder))
+		for number in range(2, max_size + 1)
+	] + [
+		('Hidden conjugates', functools.partial(check_hidden_conjugate, number, explanations=recorder))
+		for number in range(2, max_size + 1)
+	] + [
+		('Intersections', functools.partial(check_intersections, _puzzle, explanations=recorder)),
+	] + [
+		('Fish', functools.partial(check_fish, number, _puzzle, explanations=recorder))
+		for number in range(2, max_size + 1)
+	] + [
+		(name, functools.partial(_call_strategy, strategy, _puzzle, recorder))
+		for name, strategy in _STRATEGIES
+	]
+
+	for name, strategy in strategies:
+		for group in groups:
+			cells_changed = strategy(group)
+			if any(cells_changed):
+				return recorder.event(name, group)
+
+	return None
+
+
+def _call_strategy(strategy: Strategy, puzzle: cnpp.Puzzle,
+		explanations: Optional[Explanations], group: cnpp.Group) -> set:
+	return strategy(puzzle, group, explanations)
+
+
+def _contains_conflict(cells: Iterable[cnpp.Cell], groups: Iterable[cnpp.Group]) -> bool:
+	"""
+	Returns true if any of the cells has neither a value nor any potential
+	values, or if any of the groups contains the same value more than once.
+	"""
+
+	for cell in cells:
+		if not (cell.value() or any(cell.iter_potential_values())):
+			return True
+
+	for group in groups:
+		values = [cell.value() for cell in group.iter_solved_cells()]
+		if len(values) != len(set(values)):
+			return True
+
+	return False
+
+
+def _unsolved_region_cells(puzzle: cnpp.Puzzle,
+		region_indexes: Optional[Iterable[int]]) -> Optional[List[cnpp.Cell]]:
+	"""
+	Returns the unsolved cells of the regions at the indexes, or `None` if
+	`region_indexes` is not specified or those regions are solved.
+	"""
+
+	if region_indexes is None:
+		return None
+
+	cells = [
+		cell
+		for index in sorted(region_indexes)
+		for cell in puzzle.region_cells(index)
+		if not cell.value()
+	]
+
+	return cells or None
+
+
+def most_constrained_cell(puzzle: cnpp.Puzzle) -> cnpp.Cell:
+	"""
+	Returns the unsolved cell that has the fewest potential values, which is
+	the cell that the solver guesses the value of by default when the
+	deterministic strategies are exhausted.
+	"""
+	return cnpp_branching.Branching().select_cell(puzzle)
+
+_STRATEGIES = []  # type: List[Tuple[str, Strategy]]
+
+
+def register_strategy(name: str, strategy: Strategy) -> Strategy:
+	"""
+	Registers a strategy, which `process_cell_group` applies to each group
+	after the built-in strategies, and after the strategies that were
+	registered before it. `next_hint` also tries the registered strategies,
+	after the built-in ones. Returns the strategy.
+
+	Registering a name again replaces its strategy, without changing the
+	order that the strategies are applied in, so a module that registers
+	strategies can be reloaded.
+	"""
+
+	for index, (registered_name, _) in enumerate(_STRATEGIES):
+		if registered_name == name:
+			_STRATEGIES[index] = (name, strategy)
+			return strategy
+
+	_STRATEGIES.append((name, strategy))
+	return strategy
+
+
+def unregister_strategy(name: str) -> Strategy:
+	"""
+	Stops applying a strategy that was registered with `register_strategy`.
+	Returns the strategy.
+	"""
+
+	for index, (registered_name, strategy) in enumerate(_STRATEGIES):
+		if registered_name == name:
+			del _STRATEGIES[index]
+			return strategy
+
+	raise KeyError(name)
+
+
+def strategy_names() -> List[str]:
+	"""
+	Returns the names of the strategies that `process_cell_group` applies, in
+	the order that they are applied.
+	"""
+	return list(_BUILT_IN_STRATEGY_NAMES) + [name for name, _ in _STRATEGIES]
+
+
+# The names of the strategies that `process_cell_group` applies before the
+# registered strategies.
+_BUILT_IN_STRATEGY_NAMES = (
+	'Erase Pencil Markings',
+	'Last Remaining Cell',
+	'Conjugates',
+	'Hidden conjugates',
+	'Intersections',
+	'Fish',
+)
+
+
+def process_cell_group(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		trace: TraceCallback = None, explanations: Explanations = None,
+		strategies: Collection[str] = None) -> set:
+	"""
+	Applies the strategies to the group, in order, until one of them changes
+	the puzzle. Returns the set of cells that were changed. If a `trace`
+	callback is specified, it is called with a `TraceEvent` describing the
+	change. If `explanations` is specified, the change is recorded in it. If
+	`strategies` is specified, only the strategies with those names are
+	applied.
+	"""
 
-def process_cell_group(puzzle: cnpp.Puzzle, group: cnpp.Group) -> set:
 	if not any(group.unsolved_cells()):
 		return set()
 
-	strategies = [
-		('Erase Pencil Markings', lambda: erase_pencil_markings(puzzle)),
-		('Last Remaining Cell', lambda: last_remaining_cell(group)),
-		('Conjugates', lambda: check_conjugates(group)),
-		('Hidden conjugates', lambda: check_hidden_conjugates(group)),
-		('Intersections', lambda: check_intersections(puzzle, group)),
+	group_strategies = [
+		('Erase Pencil Markings', lambda _explanations: erase_pencil_markings(puzzle, group.iter_solved_cells(), _explanations)),
+		('Last Remaining Cell', lambda _explanations: last_remaining_cell(group, _explanations)),
+		('Conjugates', lambda _explanations: check_conjugates(group, _explanations)),
+		('Hidden conjugates', lambda _explanations: check_hidden_conjugates(group, _explanations)),
+		('Intersections', lambda _explanations: check_intersections(puzzle, group, _explanations)),
+		('Fish', lambda _explanations: check_fishes(puzzle, group, _explanations)),
+	] + [
+		(name, functools.partial(strategy, puzzle, group))
+		for name, strategy in _STRATEGIES
 	]
 
-	for name, _callable in strategies:
-		cells_changed = _callable()
+	for name, _callable in group_strategies:
+		if strategies is not None and name not in strategies:
+			continue
+
+		cells_changed = _apply_strategy(group, name, _callable, explanations, trace)
 		if any(cells_changed):
 			return cells_changed
 
 	return set()
 
-def erase_pencil_markings(puzzle: cnpp.Puzzle) -> set:
+
+def _apply_strategy(group: Optional[cnpp.Group], name: str,
+		_callable: Callable[[Optional[Explanations]], set],
+		explanations: Explanations = None, trace: TraceCallback = None) -> set:
+	"""
+	Calls a strategy with the explanations to record its changes in, and
+	returns the set of cells that it changed. If a `trace` callback is
+	specified and the strategy changed any cells, the callback is called with
+	a `TraceEvent` describing the changes that the strategy recorded.
+	"""
+
+	if not trace:
+		return _callable(explanations)
+
+	recorder = _TraceRecorder(explanations)
+	cells_changed = _callable(recorder)
+	if any(cells_changed):
+		trace(recorder.event(name, group))
+
+	return cells_changed
+
+def erase_pencil_markings(puzzle: cnpp.Puzzle, solved_cells: Iterable[cnpp.Cell] = None,
+		explanations: Explanations = None) -> set:
 	"""
 	This function models the obvious strategy, where pencil markings
 	are erased from all of the cells in a puzzle depending on whether
-	any cells .
+	any cells in the same groups are solved.
+
+	By default, the values of all of the solved cells in the puzzle are
+	erased. If `solved_cells` is specified, only the values of those cells,
+	and of the cells that are solved as a result, are erased.
 	"""
 
 	cells_changed = set()
-	solved_cells = puzzle.iter_solved_cells()
+	if solved_cells is None:
+		solved_cells = puzzle.iter_solved_cells()
 
 	any_solved_cells = True
 	while any_solved_cells:
@@ -152,6 +893,10 @@ def erase_pencil_markings(puzzle: cnpp.Puzzle) -> set:
 				for unsolved_cell in group.iter_unsolved_cells():
 					if unsolved_cell.remove_value(solved_cell.value()):
 						cells_changed.add(unsolved_cell)
+						if explanations is not None:
+							explanations.removed(
+								unsolved_cell, [solved_cell.value()], [(solved_cell, None)],
+							)
 						if unsolved_cell.value():
 							any_solved_cells = True
 							newly_solved_cells.append(unsolved_cell)
@@ -161,7 +906,7 @@ def erase_pencil_markings(puzzle: cnpp.Puzzle) -> set:
 	return cells_changed
 
 
-def last_remaining_cell(group: cnpp.Group) -> set:
+def last_remaining_cell(group: cnpp.Group, explanations: Explanations = None) -> set:
 	"""
 	Looks through all of the pencil markings in the group to check for
 	symbols that only occur once in the pencil markings for that group.
@@ -171,7 +916,7 @@ def last_remaining_cell(group: cnpp.Group) -> set:
 	cells_changed = set()
 
 	solved_values = {
-		cell.value()
+		cell.value(): cell
 		for cell in
 		group.iter_solved_cells()
 	}
@@ -186,15 +931,23 @@ def last_remaining_cell(group: cnpp.Group) -> set:
 			for cell in cells:  # type: cnpp.Cell
 				cell.remove_value(value)
 				cells_changed.add(cell)
+				if explanations is not None:
+					explanations.removed(cell, [value], [(solved_values[value], None)])
 		elif len(cells) == 1:
 			cell = next(iter(cells))
+			if explanations is not None:
+				explanations.placed(cell, [
+					(other_cell, [value])
+					for other_cell in group
+					if other_cell is not cell
+				])
 			cell.set_value(value)
 			cells_changed.add(cell)
 
 	return cells_changed
 
 
-def check_conjugates(group: cnpp.Group) -> set:
+def check_conjugates(group: cnpp.Group, explanations: Explanations = None) -> set:
 	"""
 	Checks for conjugate (a.k.a. naked) pairs, triples, quads, etc in the
 	specified group. Checks for all sizes of conjugate groups between "2"
@@ -204,13 +957,13 @@ def check_conjugates(group: cnpp.Group) -> set:
 	changed_cells = set()
 
 	for number in range(2, int(len(group) / 2) + 1):
-		for cell_changed in check_conjugate(number, group):
+		for cell_changed in check_conjugate(number, group, explanations):
 			changed_cells.add(cell_changed)
 
 	return changed_cells
 
 
-def check_conjugate(number: int, group: cnpp.Group) -> set:
+def check_conjugate(number: int, group: cnpp.Group, explanations: Explanations = None) -> set:
 	"""
 	Checks for conjugate (a.k.a. naked) pairs, triples, quads, etc in the
 	specified group. The `number` argument specifies how many distinct
@@ -251,8 +1004,14 @@ def check_conjugate(number: int, group: cnpp.Group) -> set:
 
 			for cell in group.iter_unsolved_cells():
 				if cell not in combination:
+					removed_values = cell.potential_values() & pencil_markings
 					if cell.remove_values(pencil_markings):
 						changed_cells.add(cell)
+						if explanations is not None:
+							explanations.removed(cell, removed_values, [
+								(conjugate_cell, None)
+								for conjugate_cell in combination
+							])
 
 			# Returning early, because the state of "applicable_cells" may no
 			# longer accurately reflect the state of the group.
@@ -262,7 +1021,7 @@ def check_conjugate(number: int, group: cnpp.Group) -> set:
 	return changed_cells
 
 
-def check_hidden_conjugates(group: cnpp.Group) -> set:
+def check_hidden_conjugates(group: cnpp.Group, explanations: Explanations = None) -> set:
 	"""
 	Checks for hidden conjugate pairs, triples, quads, etc in the specified
 	group. Checks for all sizes of conjugate groups between "2" and "one more
@@ -270,22 +1029,30 @@ def check_hidden_conjugates(group: cnpp.Group) -> set:
 	"""
 	changed_cells = set()
 
+	# The map is shared between sizes until one of them changes the group.
+	value_to_cell_map = group.potential_value_map()
+
 	for number in range(2, int(len(group) / 2) + 1):
-		for cell_changed in check_hidden_conjugate(number, group):
-			changed_cells.add(cell_changed)
+		cells_changed = check_hidden_conjugate(number, group, value_to_cell_map, explanations)
+		if cells_changed:
+			changed_cells.update(cells_changed)
+			value_to_cell_map = group.potential_value_map()
 
 	return changed_cells
 
 
-def check_hidden_conjugate(number: int, group: cnpp.Group) -> set:
+def check_hidden_conjugate(number: int, group: cnpp.Group,
+		value_to_cell_map: dict = None, explanations: Explanations = None) -> set:
 	"""
 	Checks for hidden conjugate pairs, triples, quads, etc in the
 	specified group. The `number` argument specifies how many distinct
 	cells and distinct symbols it should consider when checking for
-	conjugates.
+	conjugates. `value_to_cell_map` can be the group's current
+	`potential_value_map`, if the caller already has it.
 	"""
 
-	value_to_cell_map = group.potential_value_map()
+	if value_to_cell_map is None:
+		value_to_cell_map = group.potential_value_map()
 
 	# Slims the list of values to consider down based on the `number`
 	# argument. As an example, a number that could exist in 6 cells
@@ -322,6 +1089,12 @@ def check_hidden_conjugate(number: int, group: cnpp.Group) -> set:
 				values_to_remove = cell.potential_values() - value_combination
 				if cell.remove_values(values_to_remove):
 					changed_cells.add(cell)
+					if explanations is not None:
+						explanations.removed(cell, values_to_remove, [
+							(other_cell, value_combination)
+							for other_cell in group
+							if other_cell not in cells_containing_value
+						])
 
 			# Returning early, because the state of "applicable_values" may no
 			# longer accurately reflect the state of the group.
@@ -331,7 +1104,8 @@ def check_hidden_conjugate(number: int, group: cnpp.Group) -> set:
 	return changed_cells
 
 
-def check_intersections(puzzle: cnpp.Puzzle, group: cnpp.Group) -> set:
+def check_intersections(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		explanations: Explanations = None) -> set:
 	"""
 	If any one number can only be placed in the intersection of 2 groups, then
 	we can remove that number from all of the cells that aren't included in that
@@ -355,19 +1129,16 @@ def check_intersections(puzzle: cnpp.Puzzle, group: cnpp.Group) -> set:
 
 	value_to_cell_map = group.potential_value_map()
 
-	# Caches the groups that intersect with the current group
-	intersecting_groups = {
-		intersecting_group
-		for cell in group
-		for intersecting_group in puzzle.get_groups(cell)
-		if intersecting_group != group
-	}
-
 	for value, cells_containing_value in value_to_cell_map.items():
+		# Any group that contains all of the cells must contain the first one,
+		# so only that cell's groups need to be checked.
+		first_cell = next(iter(cells_containing_value))
+
 		cells_to_prune = (
 			cell
 
-			for intersecting_group in intersecting_groups
+			for intersecting_group in puzzle.get_groups(first_cell)
+			if intersecting_group is not group
 			if intersecting_group.issuperset(cells_containing_value)
 
 			for cell in intersecting_group.unsolved_cells()
@@ -377,5 +1148,371 @@ def check_intersections(puzzle: cnpp.Puzzle, group: cnpp.Group) -> set:
 		for cell in cells_to_prune:
 			if cell.remove_value(value):
 				changed_cells.add(cell)
+				if explanations is not None:
+					explanations.removed(cell, [value], [
+						(other_cell, [value])
+						for other_cell in group
+						if other_cell not in cells_containing_value
+					])
 
 	return changed_cells
+
+
+def check_fishes(puzzle: cnpp.Puzzle, group: cnpp.Group,
+		explanations: Explanations = None, max_size: int = 2) -> set:
+	"""
+	Checks for fish (X-Wings, Swordfish, Jellyfish, etc) that use the specified
+	group as one of their base groups. Checks for all sizes of fish between "2"
+	and `max_size`, smallest first.
+
+	The "Fish" strategy that `process_cell_group` applies only looks for
+	X-Wings. Swordfish and Jellyfish rarely save a guess, and looking for them
+	in every group slows down the search, so they are only looked for if a
+	strategy from `fish_strategy` is registered. `next_hint` looks for every
+	size.
+	"""
+
+	# The masks are shared between sizes, because a size that changes the
+	# puzzle returns immediately.
+	value_masks = _candidate_index(puzzle).value_masks()
+
+	for number in range(2, max_size + 1):
+		changed_cells = check_fish(number, puzzle, group, value_masks, explanations)
+		if any(changed_cells):
+			return changed_cells
+
+	return set()
+
+
+def fish_strategy(number: int) -> Strategy:
+	"""
+	Returns a strategy that checks for fish with `number` base groups, which
+	can be registered with `register_strategy`, for example:
+
+		register_strategy('Swordfish', fish_strategy(3))
+		register_strategy('Jellyfish', fish_strategy(4))
+	"""
+
+	def _check_fish(puzzle: cnpp.Puzzle, group: cnpp.Group,
+			explanations: Explanations = None) -> set:
+		return check_fish(number, puzzle, group, _candidate_index(puzzle).value_masks(), explanations)
+
+	return _check_fish
+
+
+def check_fish(number: int, puzzle: cnpp.Puzzle, group: cnpp.Group,
+		value_masks: Dict[Hashable, int] = None, explanations: Explanations = None) -> set:
+	"""
+	Checks for fish that use the specified group as one of their base groups.
+	The `number` argument specifies how many base groups and how many cover
+	groups it should consider. `value_masks` can be the puzzle's current
+	`_value_masks`, if the caller already has them.
+
+	A fish is made of `number` base groups that do not share any cells, and
+	must each contain a value, and `number` cover groups that do not share any
+	cells, and that together contain every cell in the base groups that can
+	still hold the value. Each base group places the value in a different
+	cover group, so every cover group gets its value from the base groups, and
+	the value can be removed from all of the cells in the cover groups that
+	aren't also in a base group.
+
+	In a classic Sudoku, an X-Wing is a value that can only be placed in the
+	same 2 columns of 2 rows. The rows are the base groups and the columns are
+	the cover groups, but any groups can be used, so fish are also found in
+	Jigsaw and Hyper Sudokus, and across the grids of a Samurai Sudoku.
+	"""
+
+	topology = puzzle.topology()
+
+	# Only a group with a cell for each of the puzzle's symbols must contain
+	# every value.
+	num_symbols = len(topology.symbols())
+	if len(group) != num_symbols:
+		return set()
+
+	group_index = topology.group_index(cell.location() for cell in group)
+	if group_index is None:
+		return set()
+
+	if value_masks is None:
+		value_masks = _value_masks(puzzle)
+
+	group_masks = topology.group_masks()
+	group_mask = group_masks[group_index]
+	locations = topology.locations()
+
+	changed_cells = set()
+
+	for value, value_mask in value_masks.items():
+		# Values with a single cell are handled by `last_remaining_cell`.
+		cells_containing_value = group_mask & value_mask
+		if not cells_containing_value & (cells_containing_value - 1):
+			continue
+
+		fish = _find_fish(number, topology, value_mask, group_index)
+		if fish is None:
+			continue
+
+		base_groups, cover_groups = fish
+		base_mask = 0
+		for base_group in base_groups:
+			base_mask |= group_masks[base_group]
+
+		cover_mask = 0
+		for cover_group in cover_groups:
+			cover_mask |= group_masks[cover_group]
+
+		premises = [
+			(puzzle.get_cell(location), [value])
+			for location in _iter_mask_locations(base_mask & ~value_mask, locations)
+		] if explanations is not None else None
+
+		for location in _iter_mask_locations(cover_mask & value_mask & ~base_mask, locations):
+			cell = puzzle.get_cell(location)
+			if cell.remove_value(value):
+				changed_cells.add(cell)
+				if explanations is not None:
+					explanations.removed(cell, [value], premises)
+
+		# Returning early, because the value masks no longer accurately
+		# reflect the state of the puzzle.
+		if any(changed_cells):
+			return changed_cells
+
+	return changed_cells
+
+
+def _find_fish(number: int, topology: cnpp.Topology, value_mask: int,
+		first_base_group: int) -> Optional[Tuple[List[int], List[int]]]:
+	"""
+	Searches for a fish with `number` base groups and `number` cover groups,
+	whose first base group is `first_base_group`, for a value that can be
+	placed in the cells of `value_mask`. Groups are described by their index
+	in the topology, and cells by bit masks of their location indexes.
+	Returns the base groups and cover groups of the first fish that removes
+	the value from at least one cell, or `None` if there is no such fish.
+
+	The search is depth first. Cover groups are only added to cover a cell in
+	a base group that can hold the value. Each cell in a cover group that can
+	hold the value is then either added to a new base group that comes after
+	the first one in the topology, or left to be pruned. This way each fish is
+	only built once. A fish that can't be built this way splits into smaller
+	fish, which are found by the smaller sizes.
+	"""
+
+	group_masks = topology.group_masks()
+	location_groups = topology.location_groups()
+	num_symbols = len(topology.symbols())
+
+	def _search(base_groups: List[int], base_mask: int, cover_groups: List[int],
+			cover_mask: int, prune_mask: int) -> Optional[Tuple[List[int], List[int]]]:
+		uncovered = base_mask & value_mask & ~cover_mask
+		if uncovered:
+			if len(cover_groups) == number:
+				return None
+
+			location_index = (uncovered & -uncovered).bit_length() - 1
+			for cover_group in location_groups[location_index]:
+				mask = group_masks[cover_group]
+				if cover_group in base_groups or mask & cover_mask:
+					continue
+
+				fish = _search(
+					base_groups, base_mask,
+					cover_groups + [cover_group], cover_mask | mask, prune_mask,
+				)
+				if fish is not None:
+					return fish
+
+			return None
+
+		undecided = cover_mask & value_mask & ~base_mask & ~prune_mask
+
+		if len(base_groups) == number:
+			# Every remaining cell in the cover groups can be pruned.
+			if len(cover_groups) == number and (prune_mask | undecided):
+				return base_groups, cover_groups
+			return None
+
+		if not undecided:
+			return None
+
+		undecided_cell = undecided & -undecided
+
+		for base_group in location_groups[undecided_cell.bit_length() - 1]:
+			mask = group_masks[base_group]
+			if (
+				base_group <= first_base_group or
+				base_group in cover_groups or
+				mask & (base_mask | prune_mask) or
+				bin(mask).count('1') != num_symbols
+			):
+				continue
+
+			# Without room for more cover groups, the new base group must
+			# already be covered.
+			if len(cover_groups) == number and mask & value_mask & ~cover_mask:
+				continue
+
+			fish = _search(
+				base_groups + [base_group], base_mask | mask,
+				cover_groups, cover_mask, prune_mask,
+			)
+			if fish is not None:
+				return fish
+
+		return _search(
+			base_groups, base_mask,
+			cover_groups, cover_mask, prune_mask | undecided_cell,
+		)
+
+	return _search([first_base_group], group_masks[first_base_group], [], 0, 0)
+
+
+class _CandidateIndex(object):
+	"""
+	Indexes the candidates of a puzzle by the location indexes of its
+	topology, and keeps the index up to date as the cells change, so that the
+	strategies do not index the whole puzzle for each group. The index is
+	only built when a strategy first asks for it.
+	"""
+
+	__slots__ = ('_puzzle', '_value_masks', '_potential_values', '_bivalue_mask', '_cell_values', '_derived')
+
+	def __init__(self, puzzle: cnpp.Puzzle):
+		self._puzzle = puzzle
+		self._value_masks = None  # type: Optional[defaultdict[Hashable, int]]
+		self._potential_values = []  # type: List[FrozenSet[Hashable]]
+		self._bivalue_mask = 0
+
+		# Maps each cell to its location index, and to the values that it is
+		# included in the masks of.
+		self._cell_values = {}  # type: Dict[cnpp.Cell, Tuple[int, FrozenSet[Hashable]]]
+
+		self._derived = {}  # type: Dict[Hashable, object]
+
+	def derived(self, key: Hashable, build: Callable[[], object]) -> object:
+		"""
+		Returns the data that a strategy derived from the index, which is
+		built by `build` the first time that it is asked for. The data is kept
+		for as long as the index, and should read the candidates from the
+		index, so that it is up to date.
+		"""
+
+		data = self._derived.get(key)
+		if data is None:
+			data = self._derived[key] = build()
+		return data
+
+	def value_masks(self) -> Dict[Hashable, int]:
+		"""
+		Returns the puzzle's `_value_masks`.
+		"""
+		self._build()
+		return self._value_masks
+
+	def potential_values(self, index: int) -> FrozenSet[Hashable]:
+		"""
+		Returns the potential values of an unsolved cell, or an empty set if
+		the cell is solved.
+		"""
+		self._build()
+		return self._potential_values[index]
+
+	def bivalue_mask(self) -> int:
+		"""
+		Returns a mask of the cells that have exactly two potential values.
+		"""
+		self._build()
+		return self._bivalue_mask
+
+	def update(self, cells: Iterable[cnpp.Cell]):
+		"""
+		Updates the index with the current state of the cells.
+		"""
+
+		if self._value_masks is None:
+			return
+
+		for cell in cells:
+			index, old_values = self._cell_values[cell]
+			value, potential_values = cell.snapshot()
+			values = frozenset((value,)) if value else potential_values
+
+			bit = 1 << index
+			for removed_value in old_values - values:
+				self._value_masks[removed_value] &= ~bit
+			for added_value in values - old_values:
+				self._value_masks[added_value] |= bit
+
+			self._cell_values[cell] = (index, values)
+			self._potential_values[index] = potential_values
+			if len(potential_values) == 2:
+				self._bivalue_mask |= bit
+			else:
+				self._bivalue_mask &= ~bit
+
+	def _build(self):
+		if self._value_masks is not None:
+			return
+
+		self._value_masks = defaultdict(int)
+		cells = [
+			self._puzzle.get_cell(location)
+			for location in self._puzzle.topology().locations()
+		]
+		self._potential_values = [frozenset()] * len(cells)
+		for index, cell in enumerate(cells):
+			self._cell_values[cell] = (index, frozenset())
+
+		self.update(cells)
+
+
+# The indexes of the puzzles that `_solve` is processing.
+_CANDIDATE_INDEXES = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary[cnpp.Puzzle, _CandidateIndex]
+
+
+def _candidate_index(puzzle: cnpp.Puzzle) -> _CandidateIndex:
+	"""
+	Returns the index that `_solve` keeps for the puzzle, or a new index if
+	the puzzle is not being solved.
+	"""
+
+	index = _CANDIDATE_INDEXES.get(puzzle)
+	if index is None:
+		return _CandidateIndex(puzzle)
+
+	return index
+
+
+def _value_masks(puzzle: cnpp.Puzzle) -> Dict[Hashable, int]:
+	"""
+	Indexes where each value can still be placed in the puzzle. Returns a dict
+	that maps each value to a bit mask of the cells that have the value, or
+	have it in their potential values, where bit `i` is the cell at
+	`puzzle.topology().locations()[i]`.
+
+	Solved cells are included, because their values may not have been erased
+	from the rest of their groups yet.
+	"""
+
+	topology = puzzle.topology()
+	value_masks = defaultdict(int)
+
+	for index, location in enumerate(topology.locations()):
+		value, potential_values = puzzle.get_cell(location).snapshot()
+		for value in (value,) if value else potential_values:
+			value_masks[value] |= 1 << index
+
+	return value_masks
+
+
+def _iter_mask_locations(mask: int, locations: Tuple[Hashable, ...]) -> Iterable[Hashable]:
+	"""
+	Returns an iterator over the locations of the bits set in the mask.
+	"""
+
+	while mask:
+		bit = mask & -mask
+		yield locations[bit.bit_length() - 1]
+		mask ^= bit
@@ -0,0 +1,267 @@
+r"""
+
+Contains functions that verify solved puzzles in bulk, both against the rules
+of their topology and against reference solutions. Each puzzle is packed into
+a row of bytes, with one byte per cell, in the order of the topology's
+locations. Each byte is the position of the cell's value in the topology's
+symbols plus one, or 0 if the cell is unsolved.
+
+Rows are checked a batch at a time. The checks are vectorized with numpy if
+it is installed, which can be done with `pip install sudoku-solver[numpy]`.
+Without numpy, the same checks are run one row at a time. Either way, only
+the rows that fail are examined further, to describe the failure.
+
+"""
+
+import csv
+from typing import Hashable, Iterable, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+import weakref
+
+from . import cnpp
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+class Mismatch(NamedTuple):
+	"""
+	Describes a puzzle that failed verification. `reason` is one of:
+
+	- "unsolved": some of the puzzle's cells do not have a value.
+	- "invalid": a group of the puzzle contains the same value more than once.
+	- "mismatch": the puzzle is valid, but differs from its reference
+	solution.
+
+	`key` identifies the puzzle, and `locations` lists the cells that are
+	unsolved, that are in an invalid group, or that differ from the
+	reference solution.
+	"""
+
+	key: Hashable
+	reason: str
+	locations: Tuple[Hashable, ...]
+
+
+def pack_values(puzzle: cnpp.Puzzle) -> bytes:
+	"""
+	Packs the values of a puzzle's cells into a row of bytes. A cell with a
+	single potential value is packed with that value, without setting it, so
+	the puzzle is not modified.
+	"""
+
+	topology = puzzle.topology()
+	symbol_indexes = _symbol_indexes(topology)
+
+	return bytes(
+		symbol_indexes.get(puzzle.get_cell(location).peek_value(), 0)
+		for location in topology.locations()
+	)
+
+
+def pack_strings(topology: cnpp.Topology, strings: Iterable[str]) -> List[bytes]:
+	"""
+	Packs strings that list the value of each cell, in the order of the
+	topology's locations, into rows of bytes. Each symbol must be written as a
+	single character, and any other character is treated as an unsolved cell,
+	which is the format of the 1D strings used for Sudoku.
+	"""
+
+	table = bytearray(256)
+	for symbol, index in _symbol_indexes(topology).items():
+		character = str(symbol).encode('ascii')
+		assert len(character) == 1, 'Only symbols with one character can be packed from strings.'
+		table[character[0]] = index
+
+	return [
+		string.encode('ascii').translate(table)
+		for string in strings
+	]
+
+
+def verify(topology: cnpp.Topology, rows: Sequence[bytes],
+		references: Optional[Sequence[bytes]] = None,
+		keys: Optional[Sequence[Hashable]] = None,
+		batch_size: int = 10000) -> List[Mismatch]:
+	"""
+	Verifies packed puzzles. Checks that each puzzle is solved and that none
+	of its groups contain the same value more than once, and, if `references`
+	is specified, that it matches its packed reference solution. Returns a
+	`Mismatch` for each puzzle that fails, keyed by its item in `keys`, or by
+	its position in `rows` by default.
+
+	The rows are checked `batch_size` at a time, which bounds the memory that
+	is used by the vectorized checks.
+	"""
+
+	num_cells = len(topology.locations())
+	if any(len(row) != num_cells for row in rows):
+		raise ValueError(f'Every packed puzzle must contain {num_cells} cells.')
+	if references is not None and len(references) != len(rows):
+		raise ValueError('Every packed puzzle must have a reference solution.')
+
+	find_failures = _find_failures_numpy if numpy is not None else _find_failures
+	mismatches = []
+
+	for start in range(0, len(rows), batch_size):
+		batch = rows[start:start + batch_size]
+		batch_references = references[start:start + batch_size] if references is not None else None
+
+		for index, reason in find_failures(topology, batch, batch_references):
+			row_index = start + index
+			mismatches.append(Mismatch(
+				keys[row_index] if keys is not None else row_index,
+				reason,
+				_failure_locations(
+					topology, reason, rows[row_index],
+					references[row_index] if references is not None else None,
+				),
+			))
+
+	return mismatches
+
+
+def write_report(mismatches: Iterable[Mismatch], file: TextIO):
+	"""
+	Writes the mismatches to a file as CSV, with a header row. The locations
+	of each mismatch are separated by semicolons.
+	"""
+
+	writer = csv.writer(file)
+	writer.writerow(['key', 'reason', 'locations'])
+
+	for mismatch in mismatches:
+		writer.writerow([
+			mismatch.key,
+			mismatch.reason,
+			';'.join(map(str, mismatch.locations)),
+		])
+
+
+def _find_failures(topology: cnpp.Topology, rows: Sequence[bytes],
+		references: Optional[Sequence[bytes]]) -> List[Tuple[int, str]]:
+	"""
+	Returns the index and the reason of each row that fails verification,
+	checking one row at a time.
+	"""
+
+	groups = [
+		group
+		for groups_of_size in _group_indexes_by_size(topology)
+		for group in groups_of_size
+	]
+
+	failures = []
+
+	for index, row in enumerate(rows):
+		if 0 in row:
+			failures.append((index, 'unsolved'))
+		elif any(len({row[location_index] for location_index in group}) != len(group) for group in groups):
+			failures.append((index, 'invalid'))
+		elif references is not None and row != references[index]:
+			failures.append((index, 'mismatch'))
+
+	return failures
+
+
+def _find_failures_numpy(topology: cnpp.Topology, rows: Sequence[bytes],
+		references: Optional[Sequence[bytes]]) -> List[Tuple[int, str]]:
+	"""
+	Returns the index and the reason of each row that fails verification,
+	checking all of the rows at once.
+	"""
+
+	grids = numpy.frombuffer(b''.join(rows), dtype=numpy.uint8).reshape(len(rows), -1)
+
+	unsolved = (grids == 0).any(axis=1)
+
+	# A group contains a value more than once if its sorted values contain
+	# two equal neighbors. Groups are sorted in one operation per size.
+	invalid = numpy.zeros(len(rows), dtype=bool)
+	for groups_of_size in _group_indexes_by_size(topology):
+		values = numpy.sort(grids[:, numpy.array(groups_of_size)], axis=2)
+		invalid |= (values[:, :, 1:] == values[:, :, :-1]).any(axis=(1, 2))
+
+	if references is not None:
+		reference_grids = numpy.frombuffer(b''.join(references), dtype=numpy.uint8).reshape(len(rows), -1)
+		mismatched = (grids != reference_grids).any(axis=1)
+	else:
+		mismatched = numpy.zeros(len(rows), dtype=bool)
+
+	reasons = numpy.select(
+		[unsolved, invalid, mismatched],
+		[1, 2, 3],
+		default=0,
+	)
+
+	return [
+		(int(index), ('unsolved', 'invalid', 'mismatch')[reasons[index] - 1])
+		for index in numpy.flatnonzero(reasons)
+	]
+
+
+def _failure_locations(topology: cnpp.Topology, reason: str, row: bytes,
+		reference: Optional[bytes]) -> Tuple[Hashable, ...]:
+	"""
+	Returns the locations of the cells that caused a row to fail.
+	"""
+
+	locations = topology.locations()
+
+	if reason == 'unsolved':
+		location_indexes = [
+			location_index
+			for location_index, value in enumerate(row)
+			if not value
+		]
+
+	elif reason == 'invalid':
+		location_indexes = sorted({
+			location_index
+			for groups_of_size in _group_indexes_by_size(topology)
+			for group in groups_of_size
+			if len({row[location_index] for location_index in group}) != len(group)
+			for location_index in group
+		})
+
+	else:
+		location_indexes = [
+			location_index
+			for location_index, (value, reference_value) in enumerate(zip(row, reference))
+			if value != reference_value
+		]
+
+	return tuple(locations[location_index] for location_index in location_indexes)
+
+
+# The result of `_group_indexes_by_size` for each topology, which is kept for
+# as long as the topology.
+_GROUP_INDEXES_BY_SIZE = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary[cnpp.Topology, Tuple[Tuple[Tuple[int, ...], ...], ...]]
+
+
+def _group_indexes_by_size(topology: cnpp.Topology) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+	"""
+	Returns the location indexes of the topology's groups, partitioned by the
+	number of cells in the group.
+	"""
+
+	group_indexes_by_size = _GROUP_INDEXES_BY_SIZE.get(topology)
+	if group_indexes_by_size is not None:
+		return group_indexes_by_size
+
+	groups_by_size = {}
+	for group in topology.groups():
+		group_indexes = tuple(map(topology.location_index, group))
+		groups_by_size.setdefault(len(group_indexes), []).append(group_indexes)
+
+	group_indexes_by_size = tuple(tuple(groups) for groups in groups_by_size.values())
+	_GROUP_INDEXES_BY_SIZE[topology] = group_indexes_by_size
+	return group_indexes_by_size
+
+
+def _symbol_indexes(topology: cnpp.Topology) -> dict:
+	return {
+		symbol: index
+		for index, symbol in enumerate(topology.symbols(), 1)
+	}
@@ -0,0 +1,486 @@
+r"""
+
+Contains an asyncio front end for the solver. Solve requests are read as JSON
+lines from a TCP socket or from stdio, coalesced into batches, and solved by a
+pool of worker processes so that the event loop is never blocked by a solve.
+
+Each request is a JSON object on a single line:
+
+	{"id": 1, "puzzle": "004300209005009001...", "deadline": 0.5}
+
+The "puzzle" field is a classic Sudoku formatted as 81 concatenated digits,
+using "0" for empty cells. The optional "deadline" field is the number of
+seconds that the client is willing to wait for the result. Each response is
+written as a JSON object on a single line, in completion order, and echoes the
+request's "id":
+
+	{"id": 1, "state": "Solved", "solution": "814376259..."}
+	{"id": 2, "error": "deadline exceeded"}
+
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import json
+import math
+import multiprocessing
+import numbers
+import sys
+from typing import Any, List, Optional, Tuple
+
+from . import cnpp_solver, sudoku
+
+
+def solve_batch(puzzles: List[str]) -> List[Tuple[str, str]]:
+	"""
+	Solves a batch of puzzles formatted as 1D strings. Returns a list containing
+	the name of each puzzle's resulting state and its 1D formatted result. This
+	function is executed by the worker processes of the service.
+	"""
+
+	results = []
+	for puzzle in puzzles:
+		sudoku_puzzle = sudoku.SudokuPuzzle.init_from_1d_list(puzzle)
+		completed_puzzle, state = cnpp_solver.solve(sudoku_puzzle)
+		results.append((state.name, completed_puzzle.to_1d_string()))
+
+	return results
+
+
+class _Request(object):
+	"""
+	Models a single solve request while it waits for a worker process.
+	"""
+
+	def __init__(self, request_id: Any, puzzle: str, deadline: Optional[float]):
+		self.request_id = request_id
+		self.puzzle = puzzle
+		self.deadline = deadline
+		self.future = asyncio.get_running_loop().create_future()
+
+	def expired(self, now: float) -> bool:
+		return self.deadline is not None and now >= self.deadline
+
+
+class SolverService(object):
+	"""
+	Dispatches solve requests to a process pool. Requests are coalesced into
+	batches of up to `max_batch_size` puzzles, waiting at most
+	`max_batch_delay` seconds for a batch to fill up. At most `max_pending`
+	requests are queued at a time, and at most two batches per worker process
+	are in flight at a time. When either limit is reached, readers stop
+	accepting new requests until the backlog drains.
+	"""
+
+	def __init__(
+		self,
+		processes: Optional[int] = None,
+		max_batch_size: int = 32,
+		max_batch_delay: float = 0.002,
+		max_pending: int = 1024,
+		default_deadline: Optional[float] = None,
+	):
+		self._processes = processes or multiprocessing.cpu_count()
+		self._max_batch_size = max_batch_size
+		self._max_batch_delay = max_batch_delay
+		self._max_pending = max_pending
+		self._default_deadline = default_deadline
+
+		self._executor = None  # type: Optional[concurrent.futures.ProcessPoolExecutor]
+		self._queue = None  # type: Optional[asyncio.Queue]
+		self._in_flight = None  # type: Optional[asyncio.Semaphore]
+		self._batcher = None  # type: Optional[asyncio.Task]
+		self._batches = set()  # type: set[asyncio.Task]
+		self._stopped = False
+
+	async def start(self):
+		"""
+		Starts the worker processes and the task that batches requests.
+		"""
+
+		self._executor = concurrent.futures.ProcessPoolExecutor(self._processes)
+
+		# Launching the workers before any connections are accepted stops
+		# forked workers from inheriting, and holding open, client sockets.
+		await asyncio.get_running_loop().run_in_executor(self._executor, solve_batch, [])
+
+		self._queue = asyncio.Queue(maxsize=self._max_pending)
+		self._in_flight = asyncio.Semaphore(self._processes * 2)
+		self._batcher = asyncio.create_task(self._batch_requests())
+
+	async def stop(self):
+		"""
+		Stops batching requests and shuts down the worker processes. Requests
+		that have not been sent to a worker process yet are answered with a
+		"service stopped" error. Batches that are already being solved are
+		allowed to finish.
+		"""
+
+		self._stopped = True
+
+		if self._batcher:
+			self._batcher.cancel()
+			try:
+				await self._batcher
+			except asyncio.CancelledError:
+				pass
+
+		while self._queue is not None and not self._queue.empty():
+			_fail_request(self._queue.get_nowait())
+
+		if self._executor:
+			# Waiting for the workers blocks, so it is done in a thread.
+			await asyncio.get_running_loop().run_in_executor(
+				None, functools.partial(self._executor.shutdown, wait=True),
+			)
+
+	async def __aenter__(self):
+		await self.start()
+		return self
+
+	async def __aexit__(self, *exc_info):
+		await self.stop()
+
+	async def solve(self, puzzle: str, deadline: Optional[float] = None, request_id: Any = None) -> dict:
+		"""
+		Solves a single puzzle formatted as a 1D string and returns the
+		response object. `deadline` is measured in seconds from now. Waits for
+		room in the request queue if the service is saturated.
+		"""
+
+		if deadline is None:
+			deadline = self._default_deadline
+
+		error = _validate_puzzle(puzzle) or _validate_deadline(deadline)
+		if error:
+			return {"id": request_id, "error": error}
+
+		if self._stopped:
+			return {"id": request_id, "error": "service stopped"}
+
+		loop = asyncio.get_running_loop()
+		request = _Request(
+			request_id,
+			puzzle,
+			None if deadline is None else loop.time() + deadline,
+		)
+
+		await self._queue.put(request)
+
+		# The service may have been stopped while waiting for room in the
+		# queue, in which case nothing will take the request off the queue.
+		if self._stopped:
+			_fail_request(request)
+
+		try:
+			if deadline is None:
+				result = await request.future
+			else:
+				result = await asyncio.wait_for(
+					asyncio.shield(request.future),
+					timeout=max(0, request.deadline - loop.time()),
+				)
+		except asyncio.TimeoutError:
+			return {"id": request_id, "error": "deadline exceeded"}
+		except Exception as ex:
+			return {"id": request_id, "error": f"{ex.__class__.__name__}: {ex}"}
+
+		if result is None:
+			return {"id": request_id, "error": "service stopped"}
+
+		state, solution = result
+		return {"id": request_id, "state": state, "solution": solution}
+
+	async def handle_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		"""
+		Serves JSON-lines requests from a stream until the stream is closed.
+		Requests are processed concurrently and responses are written in
+		completion order.
+		"""
+
+		# Bounding the number of outstanding requests per stream stops the
+		# reader from consuming input faster than the pool can solve it.
+		outstanding = asyncio.Semaphore(self._max_pending)
+		responses = set()
+
+		async def _respond(line: bytes):
+			try:
+				try:
+					response = await self._handle_line(line)
+				except Exception as ex:
+					response = {"id": None, "error": f"{ex.__class__.__name__}: {ex}"}
+				writer.write(json.dumps(response).encode() + b"\n")
+				await writer.drain()
+			finally:
+				outstanding.release()
+
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				if not line.strip():
+					continue
+
+				await outstanding.acquire()
+				task = asyncio.create_task(_respond(line))
+				responses.add(task)
+				task.add_done_callback(responses.discard)
+
+			if responses:
+				await asyncio.gather(*responses, return_exceptions=True)
+		finally:
+			writer.close()
+
+	async def _handle_line(self, line: bytes) -> dict:
+		"""
+		Parses a single request line and solves the puzzle it contains.
+		"""
+
+		try:
+			request = json.loads(line)
+			puzzle = request["puzzle"]
+			deadline = request.get("deadline")
+			request_id = request.get("id")
+		except (ValueError, KeyError, TypeError, AttributeError) as ex:
+			return {"id": None, "error": f"malformed request: {ex}"}
+
+		error = _validate_puzzle(puzzle) or _validate_deadline(deadline)
+		if error:
+			return {"id": request_id, "error": f"malformed request: {error}"}
+
+		# Any other failure is still answered, so that the client is never left
+		# waiting for a response to the request.
+		try:
+			return await self.solve(puzzle, deadline, request_id)
+		except Exception as ex:
+			return {"id": request_id, "error": f"{ex.__class__.__name__}: {ex}"}
+
+	async def _batch_requests(self):
+		"""
+		Pulls requests from the queue, coalesces them into batches, and
+		submits the batches to the process pool.
+		"""
+
+		loop = asyncio.get_running_loop()
+		batch = []  # type: List[_Request]
+
+		try:
+			while True:
+				batch = await self._next_batch(loop)
+				if batch:
+					await self._in_flight.acquire()
+					task = asyncio.create_task(self._run_batch(batch))
+					self._batches.add(task)
+					task.add_done_callback(self._batches.discard)
+					batch = []
+		except asyncio.CancelledError:
+			# Requests that were taken off the queue, but not yet submitted,
+			# would otherwise never be answered.
+			for request in batch:
+				_fail_request(request)
+			raise
+
+	async def _next_batch(self, loop: asyncio.AbstractEventLoop) -> List[_Request]:
+		"""
+		Waits for the next batch of requests that have not expired or been
+		abandoned. The requests that were taken off the queue are failed if
+		the wait is cancelled.
+		"""
+
+		batch = []  # type: List[_Request]
+
+		try:
+			batch.append(await self._queue.get())
+			batch_deadline = loop.time() + self._max_batch_delay
+
+			while len(batch) < self._max_batch_size:
+				try:
+					batch.append(self._queue.get_nowait())
+					continue
+				except asyncio.QueueEmpty:
+					pass
+
+				remaining = batch_deadline - loop.time()
+				if remaining <= 0:
+					break
+
+				try:
+					batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+				except asyncio.TimeoutError:
+					break
+		except asyncio.CancelledError:
+			for request in batch:
+				_fail_request(request)
+			raise
+
+		# Requests that expired or were abandoned while waiting in the queue
+		# are not worth sending to a worker.
+		now = loop.time()
+		return [
+			request for request in batch
+			if not (request.expired(now) or request.future.done())
+		]
+
+	async def _run_batch(self, batch: List[_Request]):
+		"""
+		Solves a batch of requests in the process pool and resolves each
+		request's future.
+		"""
+
+		loop = asyncio.get_running_loop()
+
+		try:
+			results = await loop.run_in_executor(
+				self._executor,
+				solve_batch,
+				[request.puzzle for request in batch],
+			)
+		except Exception as ex:
+			for request in batch:
+				if not request.future.done():
+					request.future.set_exception(ex)
+		else:
+			for request, result in zip(batch, results):
+				if not request.future.done():
+					request.future.set_result(result)
+		finally:
+			self._in_flight.release()
+
+
+def _fail_request(request: _Request):
+	"""
+	Resolves a request that will never be sent to a worker process because the
+	service was stopped. Its result is `None`, rather than an exception, so
+	that requests whose deadline already passed are not reported as having
+	an unretrieved exception.
+	"""
+
+	if not request.future.done():
+		request.future.set_result(None)
+
+
+def _validate_puzzle(puzzle: Any) -> Optional[str]:
+	"""
+	Returns a description of the problem with a request's puzzle, or `None` if
+	the puzzle is well formed.
+	"""
+
+	if not isinstance(puzzle, str) or len(puzzle) != 81:
+		return "puzzle must be a string of 81 digits"
+
+	if not puzzle.isdigit() or not puzzle.isascii():
+		return "puzzle must be a string of 81 digits"
+
+	return None
+
+
+def _validate_deadline(deadline: Any) -> Optional[str]:
+	"""
+	Returns a description of the problem with a request's deadline, or `None`
+	if the deadline is either missing or a positive number of seconds.
+	"""
+
+	if deadline is None:
+		return None
+
+	if (
+		isinstance(deadline, bool) or
+		not isinstance(deadline, numbers.Real) or
+		not math.isfinite(deadline) or
+		deadline <= 0
+	):
+		return "deadline must be a positive number of seconds"
+
+	return None
+
+
+async def serve_tcp(service: SolverService, host: str, port: int):
+	"""
+	Serves JSON-lines requests over TCP until cancelled.
+	"""
+
+	server = await asyncio.start_server(service.handle_stream, host, port)
+	async with server:
+		await server.serve_forever()
+
+
+class _StdioWriter(object):
+	"""
+	Adapts stdout to the subset of the `asyncio.StreamWriter` interface that
+	`SolverService.handle_stream` uses.
+	"""
+
+	def write(self, data: bytes):
+		sys.stdout.buffer.write(data)
+		sys.stdout.buffer.flush()
+
+	async def drain(self):
+		pass
+
+	def close(self):
+		sys.stdout.buffer.flush()
+
+
+class _StdioReader(object):
+	"""
+	Adapts stdin to the subset of the `asyncio.StreamReader` interface that
+	`SolverService.handle_stream` uses. A line is only read when the service
+	asks for the next request, so stdin is not read any faster than the
+	service accepts requests, the same as a paused socket.
+	"""
+
+	async def readline(self) -> bytes:
+		# Reading in a thread works for pipes, terminals, and regular files
+		# alike, none of which may block the event loop.
+		return await asyncio.get_running_loop().run_in_executor(None, sys.stdin.buffer.readline)
+
+
+async def serve_stdio(service: SolverService):
+	"""
+	Serves JSON-lines requests from stdin, writing responses to stdout, until
+	stdin is closed.
+	"""
+
+	await service.handle_stream(_StdioReader(), _StdioWriter())
+
+
+def main(args: Optional[List[str]] = None):
+	parser = argparse.ArgumentParser(
+		prog="python -m sudoku_solver.service",
+		description="Serves JSON-lines Sudoku solve requests.",
+	)
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, help="Serves over TCP on this port instead of stdio.")
+	parser.add_argument("--processes", type=int, default=None)
+	parser.add_argument("--max-batch-size", type=int, default=32)
+	parser.add_argument("--max-batch-delay", type=float, default=0.002)
+	parser.add_argument("--max-pending", type=int, default=1024)
+	parser.add_argument("--deadline", type=float, default=None)
+	options = parser.parse_args(args)
+
+	async def _serve():
+		service = SolverService(
+			processes=options.processes,
+			max_batch_size=options.max_batch_size,
+			max_batch_delay=options.max_batch_delay,
+			max_pending=options.max_pending,
+			default_deadline=options.deadline,
+		)
+
+		async with service:
+			if options.port is None:
+				await serve_stdio(service)
+			else:
+				await serve_tcp(service, options.host, options.port)
+
+	try:
+		asyncio.run(_serve())
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
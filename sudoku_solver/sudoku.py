@@ -1,10 +1,16 @@
-from typing import Optional, List, Collection
+from typing import List, Collection, Sequence, Tuple
 from collections import defaultdict
 
 from . import cnpp
 
 
+# Shared by every unsolved cell that has not been given pencil markings.
+_ALL_VALUES = frozenset(v+1 for v in range(9))
+
+
 class SudokuCell(cnpp.Cell):
+	__slots__ = ()
+
 	def __init__(self, location: tuple, value: int = None,
  				potential_values: Collection[int] = None):
 		super().__init__(
@@ -13,12 +19,45 @@ class SudokuCell(cnpp.Cell):
 			potential_values=(
 				potential_values if potential_values else
 				[] if value else
-				[v+1 for v in range(9)]
+				_ALL_VALUES
 			),
 		)
 
 
+def _sudoku_topology() -> cnpp.Topology:
+	"""
+	Creates the topology of a classic 9x9 Sudoku, which has a group for each
+	row, column, and 3x3 box.
+	"""
+
+	locations = [
+		(row_index, col_index)
+		for row_index in range(9)
+		for col_index in range(9)
+	]
+
+	return cnpp.Topology(
+		[
+			[loc for loc in locations if loc[0] == index]
+			for index in range(9)
+		] + [
+			[loc for loc in locations if loc[1] == index]
+			for index in range(9)
+		] + [
+			[loc for loc in locations if (loc[0] // 3) * 3 + loc[1] // 3 == index]
+			for index in range(9)
+		],
+		symbols=range(1, 10),
+		name='sudoku-9x9',
+		cell_type=SudokuCell,
+	)
+
+
+SUDOKU_TOPOLOGY = cnpp.register_topology(_sudoku_topology())
+
+
 class SudokuPuzzle(cnpp.Puzzle):
+	__slots__ = ()
 
 	@classmethod
 	def init_from_2d_list(cls, grid):
@@ -65,7 +104,8 @@ class SudokuPuzzle(cnpp.Puzzle):
 			[
 				cnpp.Group(g)
 				for g in cell_groups.values()
-			]
+			],
+			topology=SUDOKU_TOPOLOGY,
 		)
 
 	@classmethod
@@ -89,3 +129,204 @@ class SudokuPuzzle(cnpp.Puzzle):
 				for index in range(9)
 			]
 		)
+
+	def to_1d_string(self) -> str:
+		r"""
+		Formats the puzzle as a string of concatenated rows, which is the same
+		format that `init_from_1d_list` accepts. Unsolved cells are written as
+		"0".
+		"""
+
+		return "".join(
+			str(self.get_cell((row_index, col_index)).value() or 0)
+			for row_index in range(9)
+			for col_index in range(9)
+		)
+
+
+def _overlapping_sudoku_topology(name: str, offsets: Sequence[Tuple[int, int]]) -> cnpp.Topology:
+	"""
+	Creates the topology of a puzzle made of overlapping 9x9 Sudokus. Each
+	offset is the location of the top-left cell of one of the Sudokus. The
+	offsets must be multiples of 3, so that Sudokus only overlap in whole 3x3
+	boxes, which are shared by the overlapping Sudokus. Each Sudoku is a
+	region of the topology.
+	"""
+
+	groups = []
+	box_origins = set()
+	regions = []
+
+	for row_offset, col_offset in offsets:
+		assert row_offset % 3 == 0 and col_offset % 3 == 0
+
+		locations = [
+			(row_offset + row_index, col_offset + col_index)
+			for row_index in range(9)
+			for col_index in range(9)
+		]
+		regions.append(locations)
+
+		groups.extend(
+			[loc for loc in locations if loc[0] == row_offset + index]
+			for index in range(9)
+		)
+		groups.extend(
+			[loc for loc in locations if loc[1] == col_offset + index]
+			for index in range(9)
+		)
+
+		for box_row in range(row_offset, row_offset + 9, 3):
+			for box_col in range(col_offset, col_offset + 9, 3):
+				if (box_row, box_col) not in box_origins:
+					box_origins.add((box_row, box_col))
+					groups.append([
+						(box_row + row_index, box_col + col_index)
+						for row_index in range(3)
+						for col_index in range(3)
+					])
+
+	return cnpp.Topology(
+		groups,
+		symbols=range(1, 10),
+		name=name,
+		cell_type=SudokuCell,
+		regions=regions,
+	)
+
+
+# The top-left cells of the 5 Sudokus of a Samurai Sudoku, ordered top-left,
+# top-right, center, bottom-left, bottom-right.
+SAMURAI_OFFSETS = ((0, 0), (0, 12), (6, 6), (12, 0), (12, 12))
+
+# The top-left cells of the 2 Sudokus of a Twin Sudoku, which share the
+# bottom-right box of the first Sudoku.
+TWIN_OFFSETS = ((0, 0), (6, 6))
+
+SAMURAI_TOPOLOGY = cnpp.register_topology(
+	_overlapping_sudoku_topology('sudoku-samurai', SAMURAI_OFFSETS)
+)
+
+TWIN_TOPOLOGY = cnpp.register_topology(
+	_overlapping_sudoku_topology('sudoku-twin', TWIN_OFFSETS)
+)
+
+
+class OverlappingSudokuPuzzle(cnpp.Puzzle):
+	r"""
+	Models a puzzle made of overlapping 9x9 Sudokus, which share the cells of
+	the 3x3 boxes where they overlap. Cells are located by their row and column
+	in the whole puzzle. Subclasses specify the layout of the Sudokus.
+	"""
+
+	__slots__ = ()
+
+	OFFSETS = ()  # type: Tuple[Tuple[int, int], ...]
+	TOPOLOGY = None  # type: cnpp.Topology
+
+	@classmethod
+	def init_from_2d_lists(cls, grids: Sequence[list]):
+		r"""
+		Initializes the puzzle from a 2D list for each Sudoku, in the same
+		order as `OFFSETS`. Each grid uses the same format as
+		`SudokuPuzzle.init_from_2d_list`. A shared cell can be left empty in
+		all but one of the grids that contain it, but must not be given
+		different values.
+		"""
+
+		assert len(grids) == len(cls.OFFSETS)
+
+		values = {}
+		for (row_offset, col_offset), grid in zip(cls.OFFSETS, grids):
+			assert len(grid) == 9
+			for row_index, row in enumerate(grid):
+				assert len(row) == 9
+				for col_index, value in enumerate(row):
+					loc = (row_offset + row_index, col_offset + col_index)
+					if not value or not int(value):
+						values.setdefault(loc, 0)
+					else:
+						# Grids can mix integers and strings, so values are
+						# compared as strings of digits.
+						value = str(int(value))
+						assert values.get(loc) in (None, 0, value), (
+							f"The overlapping Sudokus disagree about the value at {loc}."
+						)
+						values[loc] = value
+
+		cells = {}
+		for loc, value in values.items():
+			cells[loc] = (
+				# Empty cell
+				SudokuCell(loc, value=0)
+				if not value else
+
+				# Cell with a specific value
+				SudokuCell(loc, value=int(value))
+				if len(str(value)) == 1 else
+
+				# Cell with pencil markings.
+				SudokuCell(loc, potential_values=[int(v) for v in str(value)])
+			)
+
+		return cls(
+			[
+				cnpp.Group(cells[loc] for loc in group)
+				for group in cls.TOPOLOGY.groups()
+			],
+			topology=cls.TOPOLOGY,
+		)
+
+	@classmethod
+	def init_from_1d_lists(cls, data: Sequence[list]):
+		r"""
+		Initializes the puzzle from a 1D list or string of integers for each
+		Sudoku, in the same order as `OFFSETS`. Each Sudoku uses the same
+		format as `SudokuPuzzle.init_from_1d_list`.
+		"""
+
+		return cls.init_from_2d_lists([
+			[
+				[int(char) for char in sudoku[(index*9):(1+index)*9]]
+				for index in range(9)
+			]
+			for sudoku in data
+		])
+
+	def to_1d_strings(self) -> List[str]:
+		r"""
+		Formats each Sudoku as a string of concatenated rows, in the same order
+		as `OFFSETS`. Unsolved cells are written as "0".
+		"""
+
+		return [
+			"".join(
+				str(self.get_cell((row_offset + row_index, col_offset + col_index)).value() or 0)
+				for row_index in range(9)
+				for col_index in range(9)
+			)
+			for row_offset, col_offset in self.OFFSETS
+		]
+
+
+class SamuraiSudokuPuzzle(OverlappingSudokuPuzzle):
+	r"""
+	Models a Samurai Sudoku, where a center Sudoku shares each of its corner
+	boxes with one of 4 other Sudokus.
+	"""
+
+	__slots__ = ()
+
+	OFFSETS = SAMURAI_OFFSETS
+	TOPOLOGY = SAMURAI_TOPOLOGY
+
+
+class TwinSudokuPuzzle(OverlappingSudokuPuzzle):
+	r"""
+	Models a Twin Sudoku, where 2 Sudokus share a single corner box.
+	"""
+
+	__slots__ = ()
+
+	OFFSETS = TWIN_OFFSETS
+	TOPOLOGY = TWIN_TOPOLOGY
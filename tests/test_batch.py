@@ -0,0 +1,63 @@
+import multiprocessing.util
+
+import pytest
+
+from sudoku_solver import cnpp, cnpp_batch, cnpp_dataset, cnpp_solver, cnpp_verification, sudoku
+
+EASY = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+HARD = '100007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+# The hard puzzle with a wrong given, which only conflicts after guessing.
+UNSOLVABLE = '120007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+STRINGS = [HARD, EASY, UNSOLVABLE, EASY, HARD]
+
+
+def _expected():
+	return [
+		cnpp_solver.solve(sudoku.SudokuPuzzle.init_from_1d_list(string))
+		for string in STRINGS
+	]
+
+
+@pytest.mark.parametrize('processes, chunk_size', [(1, 2), (2, 1), (2, 2)])
+def test_results_are_in_the_order_of_the_puzzles(processes, chunk_size):
+	puzzles = [sudoku.SudokuPuzzle.init_from_1d_list(string) for string in STRINGS]
+
+	with cnpp_batch.solve_batch(puzzles, processes=processes, chunk_size=chunk_size) as results:
+		assert len(results) == len(STRINGS)
+		for index, (puzzle, state) in enumerate(_expected()):
+			assert results.state(index) == state
+			assert results.values(index) == cnpp_verification.pack_values(puzzle)
+
+
+def test_reads_puzzles_from_a_dataset(tmp_path):
+	topology = sudoku.SUDOKU_TOPOLOGY
+	file_name = str(tmp_path / 'puzzles.cnpd')
+	cnpp_dataset.write_dataset(file_name, topology, cnpp_verification.pack_strings(topology, STRINGS))
+
+	with cnpp_dataset.Dataset(file_name) as dataset, \
+			cnpp_batch.solve_batch(dataset, processes=2, chunk_size=2, collect_stats=True) as results:
+		assert [results.state(index) for index in range(len(results))] == [state for _, state in _expected()]
+		assert results.stats(2).backtracks > 0
+		assert results.puzzle(1, sudoku.SudokuPuzzle).state() == cnpp.PuzzleState.Solved
+
+
+def test_workers_close_their_view_of_the_results():
+	with cnpp_batch.BatchResults(sudoku.SUDOKU_TOPOLOGY, 1, False) as results:
+		cnpp_batch._initialize_worker(
+			(results.name(), sudoku.SUDOKU_TOPOLOGY, 1, False), None, cnpp.Puzzle,
+		)
+		view = cnpp_batch._worker_state.pop('results')
+		cnpp_batch._worker_state.clear()
+
+		finalizers = [
+			finalizer
+			for finalizer in list(multiprocessing.util._finalizer_registry.values())
+			if finalizer._callback == view.close
+		]
+		assert len(finalizers) == 1
+
+		finalizers[0]()
+		assert view._memory.buf is None
+		assert results.state(0) is None
@@ -0,0 +1,54 @@
+from sudoku_solver import cnpp, cnpp_branching, cnpp_solver, sudoku
+
+HARD = '100007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+
+def _puzzle_without_topology() -> cnpp.Puzzle:
+	cells = [
+		cnpp.Cell((0, 0), potential_values=['b', 'a']),
+		cnpp.Cell((0, 1), potential_values=['a', 'b', 'c']),
+		cnpp.Cell((0, 2), value='c'),
+	]
+	return cnpp.Puzzle([cnpp.Group(cells)])
+
+
+def test_default_branching_guesses_values_in_ascending_order():
+	puzzle = _puzzle_without_topology()
+	branching = cnpp_solver.DEFAULT_BRANCHING()
+	cell = branching.select_cell(puzzle)
+
+	assert cell.location() == (0, 0)
+	assert branching.order_values(puzzle, cell) == ['a', 'b']
+
+	# The order of a frozenset of strings changes with the hash seed.
+	cell = cnpp.Cell((1, 0), potential_values='ihgfedcba')
+	assert branching.order_values(puzzle, cell) == list('abcdefghi')
+
+
+def test_ordering_values_does_not_derive_a_topology():
+	puzzle = _puzzle_without_topology()
+	cell = puzzle.get_cell((0, 1))
+
+	for branching in (cnpp_branching.Branching(), cnpp_branching.LeastConstrainingValue()):
+		assert sorted(branching.order_values(puzzle, cell)) == ['a', 'b', 'c']
+
+	assert cnpp_branching.Branching().order_values(puzzle, cell) == ['a', 'b', 'c']
+
+	assert puzzle._topology is None
+
+
+def test_least_constraining_value_is_opt_in():
+	puzzle = _puzzle_without_topology()
+	cell = puzzle.get_cell((0, 1))
+
+	# 'c' is not a potential value of any of the cell's peers.
+	assert cnpp_branching.LeastConstrainingValue().order_values(puzzle, cell)[0] == 'c'
+
+
+def test_dom_wdeg_reuses_the_group_positions_across_copies():
+	branching = cnpp_branching.DomWdeg()
+	puzzle, state = cnpp_solver.solve(sudoku.SudokuPuzzle.init_from_1d_list(HARD), branching=branching)
+
+	assert state == cnpp.PuzzleState.Solved
+	assert len(branching._location_groups) == 81
+	assert any(weight > 1 for weight in branching.weights())
@@ -0,0 +1,152 @@
+import importlib
+
+import pytest
+
+from sudoku_solver import cnpp, cnpp_chains, cnpp_solver, sudoku
+
+HARD = '100007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+CHAIN_NAMES = [name for name, _ in cnpp_chains.STRATEGIES]
+
+
+@pytest.fixture
+def chains():
+	cnpp_chains.register_strategies()
+	yield
+	cnpp_chains.unregister_strategies()
+
+
+def test_chains_are_opt_in():
+	assert not set(CHAIN_NAMES) & set(cnpp_solver.strategy_names())
+
+
+def test_registering_again_replaces_the_strategies(chains):
+	names = cnpp_solver.strategy_names()
+
+	module = importlib.reload(cnpp_chains)
+	module.register_strategies()
+
+	assert cnpp_solver.strategy_names() == names
+	assert [strategy for _, strategy in cnpp_solver._STRATEGIES] == [strategy for _, strategy in module.STRATEGIES]
+
+
+def test_graph_is_shared_and_kept_up_to_date(chains):
+	graphs = set()
+
+	def probe(puzzle, group, explanations=None):
+		graph = cnpp_chains._link_graph(puzzle)
+		graphs.add(id(graph))
+
+		topology = puzzle.topology()
+		for index, location in enumerate(topology.locations()):
+			value, potential_values = puzzle.get_cell(location).snapshot()
+			assert graph.values(index) == potential_values
+			for candidate in (value,) if value else potential_values:
+				assert graph.value_mask(candidate) >> index & 1
+		return set()
+
+	cnpp_solver.register_strategy('Probe', probe)
+	try:
+		puzzle = sudoku.SudokuPuzzle.init_from_1d_list(HARD)
+		cnpp_solver.propagate(puzzle, in_place=True)
+	finally:
+		cnpp_solver.unregister_strategy('Probe')
+
+	assert len(graphs) == 1
+	assert puzzle not in cnpp_solver._CANDIDATE_INDEXES
+
+
+ALL_VALUES = 123456789
+
+
+def _pencil_marks(candidates: dict) -> sudoku.SudokuPuzzle:
+	"""
+	Creates a puzzle with no solved cells, where the cells at the locations in
+	`candidates` have those potential values, and every other cell can hold
+	any value.
+	"""
+
+	grid = [[ALL_VALUES] * 9 for _ in range(9)]
+	for (row_index, col_index), values in candidates.items():
+		grid[row_index][col_index] = int(''.join(str(value) for value in sorted(values)))
+	return sudoku.SudokuPuzzle.init_from_2d_list(grid)
+
+
+def _without(value: int, locations) -> dict:
+	return {location: set(range(1, 10)) - {value} for location in locations}
+
+
+def _row(puzzle: cnpp.Puzzle, row_index: int) -> cnpp.Group:
+	return next(
+		group
+		for group in puzzle.get_groups(puzzle.get_cell((row_index, 0)))
+		if all(cell.location()[0] == row_index for cell in group)
+	)
+
+
+def _removed(strategy, puzzle: cnpp.Puzzle, group: cnpp.Group) -> dict:
+	before = {cell.location(): cell.snapshot()[1] for cell in puzzle.iter_cells()}
+	changed_cells = strategy(puzzle, group)
+	removed = {
+		cell.location(): before[cell.location()] - cell.snapshot()[1]
+		for cell in puzzle.iter_cells()
+		if before[cell.location()] != cell.snapshot()[1]
+	}
+	assert {cell.location() for cell in changed_cells} == set(removed)
+	return removed
+
+
+def test_simple_coloring_removes_a_color_that_sees_itself():
+	# 1 is strongly linked from (0, 0) along row 0, column 4, row 4 and
+	# column 1, which colors (0, 0), (4, 4) and (1, 1) alike, but (0, 0) and
+	# (1, 1) share a box.
+	candidates = {}
+	candidates.update(_without(1, [(0, col_index) for col_index in range(9) if col_index not in (0, 4)]))
+	candidates.update(_without(1, [(row_index, 4) for row_index in range(9) if row_index not in (0, 4)]))
+	candidates.update(_without(1, [(4, col_index) for col_index in range(9) if col_index not in (1, 4)]))
+	candidates.update(_without(1, [(row_index, 1) for row_index in range(9) if row_index not in (1, 4)]))
+	puzzle = _pencil_marks(candidates)
+
+	assert _removed(cnpp_chains.check_simple_coloring, puzzle, _row(puzzle, 0)) == {
+		(0, 0): {1},
+		(1, 1): {1},
+		(4, 4): {1},
+	}
+
+
+def test_xy_wing_removes_the_value_of_both_pincers():
+	puzzle = _pencil_marks({
+		(0, 0): {1, 2},
+		(0, 4): {1, 3},
+		(4, 0): {2, 3},
+	})
+
+	assert _removed(cnpp_chains.check_xy_wing, puzzle, _row(puzzle, 0)) == {(4, 4): {3}}
+
+
+def test_xyz_wing_removes_the_value_of_all_three_cells():
+	puzzle = _pencil_marks({
+		(0, 0): {1, 2, 3},
+		(0, 5): {1, 3},
+		(1, 1): {2, 3},
+	})
+
+	assert _removed(cnpp_chains.check_xyz_wing, puzzle, _row(puzzle, 0)) == {
+		(0, 1): {3},
+		(0, 2): {3},
+	}
+
+
+def test_chains_remove_a_value_seen_by_both_ends():
+	# If (0, 0) is not 1, it is 2, so (3, 0) is 5 and (6, 0) is 1. Either
+	# way, 1 is in one of the two cells.
+	puzzle = _pencil_marks({
+		(0, 0): {1, 2},
+		(3, 0): {2, 5},
+		(6, 0): {1, 5},
+	})
+
+	assert _removed(cnpp_chains.check_chains, puzzle, _row(puzzle, 0)) == {
+		(row_index, 0): {1}
+		for row_index in (1, 2, 4, 5, 7, 8)
+	}
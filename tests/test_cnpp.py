@@ -0,0 +1,108 @@
+import copy
+import pickle
+
+from sudoku_solver import cnpp, sudoku
+
+PUZZLE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+
+
+class _TaggedPuzzle(sudoku.SudokuPuzzle):
+	__slots__ = ('tag',)
+
+
+class _AnnotatedPuzzle(sudoku.SudokuPuzzle):
+	pass
+
+
+class _NotedCell(sudoku.SudokuCell):
+	__slots__ = ('note',)
+
+
+def _snapshots(puzzle):
+	# Unsolved cells may store either 0 or None as their value.
+	return {
+		cell.location(): (cell.snapshot()[0] or None, cell.snapshot()[1])
+		for cell in puzzle.iter_cells()
+	}
+
+
+def test_pickle_round_trip():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE)
+	puzzle.get_cell((0, 0)).remove_values([1, 2])
+
+	for restored in (pickle.loads(pickle.dumps(puzzle)), copy.deepcopy(puzzle), cnpp.Puzzle.from_bytes(puzzle.to_bytes())):
+		assert _snapshots(restored) == _snapshots(puzzle)
+		assert restored.topology() is sudoku.SUDOKU_TOPOLOGY
+
+	assert type(copy.deepcopy(puzzle)) is sudoku.SudokuPuzzle
+
+
+def test_copy_keeps_puzzle_subclass_state():
+	puzzle = _TaggedPuzzle.init_from_1d_list(PUZZLE)
+	puzzle.tag = 'tagged'
+	annotated = _AnnotatedPuzzle.init_from_1d_list(PUZZLE)
+	annotated.note = 'annotated'
+
+	assert copy.deepcopy(puzzle).tag == 'tagged'
+	assert pickle.loads(pickle.dumps(puzzle)).tag == 'tagged'
+	assert copy.deepcopy(annotated).note == 'annotated'
+
+
+def test_copy_keeps_cell_subclasses():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE)
+	location = (0, 0)
+	cell = _NotedCell(location, potential_values=puzzle.get_cell(location).potential_values())
+	cell.note = 'noted'
+
+	groups = [
+		cnpp.Group(cell if other.location() == location else other for other in group)
+		for group in puzzle.iter_groups()
+	]
+	puzzle = sudoku.SudokuPuzzle(groups, topology=sudoku.SUDOKU_TOPOLOGY)
+
+	for restored in (copy.deepcopy(puzzle), pickle.loads(pickle.dumps(puzzle))):
+		restored_cell = restored.get_cell(location)
+		assert type(restored_cell) is _NotedCell
+		assert restored_cell.note == 'noted'
+		assert _snapshots(restored) == _snapshots(puzzle)
+		assert all(
+			any(other is restored_cell for other in group)
+			for group in restored.get_groups(restored_cell)
+		)
+
+
+def test_pack_does_not_set_values():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE)
+	cell = puzzle.get_cell((0, 0))
+	cell.remove_values([1, 2, 3, 5, 6, 7, 8, 9])
+	before = cell.snapshot()
+
+	sudoku.SUDOKU_TOPOLOGY.pack(puzzle)
+
+	assert cell.snapshot() == before
+	assert cell.peek_value() == 4
+	assert cell.snapshot() == before
+
+
+def test_group_cell_set():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE)
+	group = next(puzzle.iter_groups())
+
+	cells = group.cell_set()
+	assert isinstance(cells, frozenset)
+	assert len(cells) == len(group)
+	assert all(cell in cells for cell in group)
+
+
+def test_pack_rejects_unknown_symbols():
+	cells = [cnpp.Cell((0, index), potential_values=['a', 'b']) for index in range(2)]
+	puzzle = cnpp.Puzzle([cnpp.Group(cells)])
+	topology = puzzle.topology()
+	cells[0].set_value('c')
+
+	try:
+		topology.pack(puzzle)
+	except ValueError as ex:
+		assert "'c'" in str(ex) and '(0, 0)' in str(ex)
+	else:
+		assert False, 'pack accepted a symbol that is not in the topology'
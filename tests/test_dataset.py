@@ -0,0 +1,124 @@
+import pickle
+
+import pytest
+
+from sudoku_solver import cnpp, cnpp_dataset, cnpp_verification, sudoku
+
+SOLUTION = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+GIVENS = [
+	'003020600900305001001806400008102900700000008006708200002609500800203009005010300',
+	'083921657967345821251876493548132976729564138136798245372689514814253769695417380',
+]
+SOLUTIONS = [SOLUTION, SOLUTION]
+
+
+def _topology() -> cnpp.Topology:
+	return sudoku.SudokuPuzzle.init_from_1d_list(SOLUTION).topology()
+
+
+@pytest.mark.parametrize('nibbles', [False, True])
+def test_records_round_trip(tmp_path, nibbles):
+	topology = _topology()
+	givens = cnpp_verification.pack_strings(topology, GIVENS)
+	solutions = cnpp_verification.pack_strings(topology, SOLUTIONS)
+	file_name = str(tmp_path / 'puzzles.cnpd')
+
+	assert cnpp_dataset.write_dataset(file_name, topology, givens, solutions, nibbles=nibbles) == 2
+
+	with cnpp_dataset.Dataset(file_name) as dataset:
+		assert len(dataset) == 2
+		assert dataset.topology() is topology
+		assert dataset.has_solutions()
+		assert list(dataset.iter_givens()) == list(givens)
+		assert list(dataset.iter_solutions(1)) == list(solutions[1:])
+
+		with pytest.raises(IndexError):
+			dataset.givens(2)
+
+
+def test_records_without_solutions(tmp_path):
+	topology = _topology()
+	file_name = str(tmp_path / 'puzzles.cnpd')
+	cnpp_dataset.write_dataset(file_name, topology, cnpp_verification.pack_strings(topology, GIVENS), nibbles=True)
+
+	with cnpp_dataset.Dataset(file_name) as dataset:
+		assert not dataset.has_solutions()
+		with pytest.raises(ValueError):
+			dataset.solution(0)
+
+
+def test_convert_csv(tmp_path):
+	csv_file_name = tmp_path / 'puzzles.csv'
+	csv_file_name.write_text(
+		'quizzes,solutions\n' +
+		''.join(f'{givens},{solution}\n' for givens, solution in zip(GIVENS, SOLUTIONS))
+	)
+	file_name = str(tmp_path / 'puzzles.cnpd')
+
+	assert cnpp_dataset.convert_csv(str(csv_file_name), file_name, _topology()) == 2
+
+	with cnpp_dataset.Dataset(file_name) as dataset:
+		puzzle = dataset.puzzle(0, sudoku.SudokuPuzzle)
+		assert isinstance(puzzle, sudoku.SudokuPuzzle)
+		assert puzzle.to_1d_string() == GIVENS[0]
+		assert dataset.solution(1) == cnpp_verification.pack_strings(dataset.topology(), [SOLUTION])[0]
+
+
+def test_pickles_as_the_file_name(tmp_path):
+	topology = _topology()
+	file_name = str(tmp_path / 'puzzles.cnpd')
+	cnpp_dataset.write_dataset(file_name, topology, cnpp_verification.pack_strings(topology, GIVENS))
+
+	with cnpp_dataset.Dataset(file_name) as dataset, pickle.loads(pickle.dumps(dataset)) as copied:
+		assert copied is not dataset
+		assert list(copied.iter_givens()) == list(dataset.iter_givens())
+
+
+def test_rejects_invalid_records(tmp_path):
+	topology = _topology()
+	givens = cnpp_verification.pack_strings(topology, GIVENS)
+	file_name = str(tmp_path / 'puzzles.cnpd')
+
+	with pytest.raises(ValueError):
+		cnpp_dataset.write_dataset(file_name, topology, [givens[0][:-1]])
+	with pytest.raises(ValueError):
+		cnpp_dataset.write_dataset(file_name, topology, givens, givens[:1])
+	with pytest.raises(ValueError):
+		cnpp_dataset.write_dataset(file_name, topology, givens[:1], givens)
+
+
+def test_rejects_truncated_files(tmp_path):
+	topology = _topology()
+	file_name = tmp_path / 'puzzles.cnpd'
+	cnpp_dataset.write_dataset(str(file_name), topology, cnpp_verification.pack_strings(topology, GIVENS))
+	file_name.write_bytes(file_name.read_bytes()[:-1])
+
+	with pytest.raises(ValueError):
+		cnpp_dataset.Dataset(str(file_name))
+
+
+def test_failed_writes_keep_the_previous_file(tmp_path):
+	topology = _topology()
+	givens = cnpp_verification.pack_strings(topology, GIVENS)
+	file_name = str(tmp_path / 'puzzles.cnpd')
+	cnpp_dataset.write_dataset(file_name, topology, givens)
+
+	def _records():
+		yield givens[0]
+		raise RuntimeError('interrupted')
+
+	with pytest.raises(RuntimeError):
+		cnpp_dataset.write_dataset(file_name, topology, _records())
+
+	assert [path.name for path in tmp_path.iterdir()] == ['puzzles.cnpd']
+	with cnpp_dataset.Dataset(file_name) as dataset:
+		assert list(dataset.iter_givens()) == list(givens)
+
+
+def test_failed_writes_do_not_create_a_file(tmp_path):
+	file_name = tmp_path / 'puzzles.cnpd'
+
+	with pytest.raises(ValueError):
+		cnpp_dataset.write_dataset(str(file_name), _topology(), [b'\0'])
+
+	assert not list(tmp_path.iterdir())
@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+
+import pytest
+
+from sudoku_solver import cnpp, cnpp_parallel, cnpp_solver, sudoku
+
+HARD = '100007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+# The hard puzzle with a wrong given, which only conflicts after guessing.
+UNSOLVABLE = '120007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+
+def _solve(string: str, **kwargs):
+	return cnpp_parallel.solve(sudoku.SudokuPuzzle.init_from_1d_list(string), **kwargs)
+
+
+def _values(puzzle: cnpp.Puzzle) -> list:
+	return [puzzle.get_cell(location).value() for location in puzzle.topology().locations()]
+
+
+def test_solves_like_the_serial_solver():
+	serial_puzzle, serial_state = cnpp_solver.solve(sudoku.SudokuPuzzle.init_from_1d_list(HARD))
+	puzzle, puzzle_state = _solve(HARD, processes=2)
+
+	assert puzzle_state == serial_state == cnpp.PuzzleState.Solved
+	assert _values(puzzle) == _values(serial_puzzle)
+
+
+@pytest.mark.parametrize('processes, tasks_per_process', [(1, 1), (2, 4)])
+def test_returns_a_conflicting_puzzle(processes, tasks_per_process):
+	puzzle, puzzle_state = _solve(UNSOLVABLE, processes=processes, tasks_per_process=tasks_per_process)
+
+	# `Puzzle.state` stops at the first group with unsolved cells, so it can
+	# miss a duplicate value in a later group.
+	assert puzzle_state == cnpp.PuzzleState.Conflict
+	assert cnpp_solver._contains_conflict(puzzle.iter_cells(), puzzle.iter_groups())
+
+
+def _crash(*args):
+	os._exit(1)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='Workers must inherit the patched module.')
+def test_falls_back_when_a_worker_dies(monkeypatch):
+	monkeypatch.setattr(cnpp_parallel, '_worker', _crash)
+	puzzle, puzzle_state = _solve(HARD, processes=2, tasks_per_process=1)
+
+	assert puzzle_state == cnpp.PuzzleState.Solved
+	assert puzzle.state() == cnpp.PuzzleState.Solved
@@ -0,0 +1,179 @@
+import asyncio
+import io
+import json
+import socket
+import sys
+import types
+
+from sudoku_solver import service
+
+PUZZLE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+SOLUTION = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+
+class _Writer(object):
+	def __init__(self):
+		self.lines = []
+
+	def write(self, data: bytes):
+		self.lines.extend(json.loads(line) for line in data.splitlines())
+
+	async def drain(self):
+		pass
+
+	def close(self):
+		pass
+
+
+async def _serve(lines, **kwargs):
+	reader = asyncio.StreamReader()
+	for line in lines:
+		reader.feed_data(json.dumps(line).encode() + b'\n' if not isinstance(line, bytes) else line)
+	reader.feed_eof()
+
+	writer = _Writer()
+	async with service.SolverService(processes=1, **kwargs) as solver_service:
+		await solver_service.handle_stream(reader, writer)
+
+	return {response['id']: response for response in writer.lines}
+
+
+def test_solves_requests():
+	responses = asyncio.run(_serve([{'id': 1, 'puzzle': PUZZLE}]))
+	assert responses[1] == {'id': 1, 'state': 'Solved', 'solution': SOLUTION}
+
+
+def test_rejects_invalid_deadlines():
+	responses = asyncio.run(_serve([
+		{'id': 1, 'puzzle': PUZZLE, 'deadline': '1'},
+		{'id': 2, 'puzzle': PUZZLE, 'deadline': True},
+		{'id': 3, 'puzzle': PUZZLE, 'deadline': -1},
+		{'id': 4, 'puzzle': PUZZLE, 'deadline': 30},
+	]))
+
+	for request_id in (1, 2, 3):
+		assert 'deadline' in responses[request_id]['error']
+	assert responses[4]['state'] == 'Solved'
+
+
+def test_rejects_malformed_requests():
+	responses = asyncio.run(_serve([
+		b'not json\n',
+		{'id': 2, 'puzzle': PUZZLE[:80]},
+	]))
+
+	assert 'malformed request' in responses[None]['error']
+	assert 'puzzle' in responses[2]['error']
+
+
+def test_stop_answers_pending_requests():
+	async def _run():
+		# A long batch delay holds the requests in the batcher until the
+		# service is stopped.
+		solver_service = service.SolverService(processes=1, max_batch_delay=60)
+		await solver_service.start()
+		requests = [
+			asyncio.create_task(solver_service.solve(PUZZLE, request_id=request_id))
+			for request_id in range(3)
+		]
+		await asyncio.sleep(0.1)
+		await solver_service.stop()
+		return await asyncio.gather(*requests)
+
+	responses = asyncio.run(_run())
+	assert responses == [
+		{'id': request_id, 'error': 'service stopped'}
+		for request_id in range(3)
+	]
+
+
+def test_deadline_exceeded():
+	async def _run():
+		# A long batch delay holds the request in the batcher past its
+		# deadline.
+		async with service.SolverService(processes=1, max_batch_delay=60) as solver_service:
+			return await solver_service.solve(PUZZLE, deadline=0.05, request_id=1)
+
+	assert asyncio.run(_run()) == {'id': 1, 'error': 'deadline exceeded'}
+
+
+def _free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(('127.0.0.1', 0))
+		return sock.getsockname()[1]
+
+
+def test_serves_tcp():
+	async def _run():
+		port = _free_port()
+
+		async with service.SolverService(processes=1) as solver_service:
+			server = asyncio.create_task(service.serve_tcp(solver_service, '127.0.0.1', port))
+			try:
+				for _ in range(100):
+					try:
+						reader, writer = await asyncio.open_connection('127.0.0.1', port)
+						break
+					except OSError:
+						await asyncio.sleep(0.05)
+
+				for request_id in (1, 2):
+					writer.write(json.dumps({'id': request_id, 'puzzle': PUZZLE}).encode() + b'\n')
+				writer.write_eof()
+
+				responses = [json.loads(line) async for line in reader]
+				writer.close()
+				return responses
+			finally:
+				server.cancel()
+				await asyncio.gather(server, return_exceptions=True)
+
+	responses = asyncio.run(_run())
+	assert sorted(responses, key=lambda response: response['id']) == [
+		{'id': request_id, 'state': 'Solved', 'solution': SOLUTION}
+		for request_id in (1, 2)
+	]
+
+
+class _Stdin(object):
+	def __init__(self, lines):
+		self._input = io.BytesIO(b''.join(json.dumps(line).encode() + b'\n' for line in lines))
+		self.reads = 0
+
+	def readline(self) -> bytes:
+		self.reads += 1
+		return self._input.readline()
+
+
+class _Stdout(object):
+	def __init__(self, stdin: _Stdin):
+		self._stdin = stdin
+		self.lines = []
+		self.reads = []
+
+	def write(self, data: bytes):
+		self.lines.extend(json.loads(line) for line in data.splitlines())
+		self.reads.append(self._stdin.reads)
+
+	def flush(self):
+		pass
+
+
+def test_stdio_only_reads_the_requests_it_accepts(monkeypatch):
+	stdin = _Stdin([{'id': request_id, 'puzzle': PUZZLE} for request_id in range(5)])
+	stdout = _Stdout(stdin)
+
+	async def _run():
+		async with service.SolverService(processes=1, max_pending=1) as solver_service:
+			# The worker processes are started with the real stdio.
+			monkeypatch.setattr(sys, 'stdin', types.SimpleNamespace(buffer=stdin))
+			monkeypatch.setattr(sys, 'stdout', types.SimpleNamespace(buffer=stdout))
+			await service.serve_stdio(solver_service)
+
+	asyncio.run(_run())
+
+	assert [response['id'] for response in stdout.lines] == list(range(5))
+
+	# With one outstanding request, only the next line is read ahead of each
+	# response.
+	assert stdout.reads == [responses + 2 for responses in range(5)]
@@ -0,0 +1,100 @@
+import random
+
+from sudoku_solver import cnpp, cnpp_session, cnpp_solver, sudoku
+
+# A puzzle with many solutions, so that placing values changes the potential
+# values of other cells.
+AMBIGUOUS = '100000000000100000000000100010000000000010000000000010001000000000001000000000001'
+
+
+def _puzzle(edits=()) -> cnpp.Puzzle:
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(AMBIGUOUS)
+	for location, value in edits:
+		puzzle.get_cell(location).set_value(value)
+	return puzzle
+
+
+def _snapshots(puzzle: cnpp.Puzzle) -> dict:
+	return {
+		cell.location(): (cell.value(), frozenset(cell.iter_potential_values()))
+		for cell in puzzle.iter_cells()
+	}
+
+
+def test_erase_restores_the_puzzle():
+	session = cnpp_session.SolverSession(_puzzle())
+	before = _snapshots(session.puzzle())
+
+	assert session.place((0, 1), 2) == cnpp.PuzzleState.Unsolved
+	assert _snapshots(session.puzzle()) != before
+
+	assert session.erase((0, 1)) == cnpp.PuzzleState.Unsolved
+	assert _snapshots(session.puzzle()) == before
+
+
+def test_erasing_an_earlier_edit_keeps_the_later_ones():
+	session = cnpp_session.SolverSession(_puzzle())
+	session.place((0, 1), 2)
+	session.place((4, 0), 3)
+	session.place((8, 0), 9)
+	session.erase((0, 1))
+
+	assert session.edits() == [((4, 0), 3), ((8, 0), 9)]
+
+	expected = cnpp_solver.propagate(_puzzle(session.edits())).puzzle
+	assert _snapshots(session.puzzle()) == _snapshots(expected)
+
+
+def test_erasing_a_conflicting_edit():
+	session = cnpp_session.SolverSession(_puzzle())
+	session.place((0, 1), 2)
+
+	# The value was ruled out by the edit above.
+	assert session.place((0, 2), 2) == cnpp.PuzzleState.Conflict
+	assert session.place((4, 0), 3) == cnpp.PuzzleState.Conflict
+
+	assert session.erase((0, 2)) == cnpp.PuzzleState.Unsolved
+
+	expected = cnpp_solver.propagate(_puzzle(session.edits())).puzzle
+	assert _snapshots(session.puzzle()) == _snapshots(expected)
+
+
+def test_replacing_a_value():
+	session = cnpp_session.SolverSession(_puzzle())
+	session.place((0, 1), 2)
+	session.place((0, 1), 3)
+
+	assert session.edits() == [((0, 1), 3)]
+
+	expected = cnpp_solver.propagate(_puzzle(session.edits())).puzzle
+	assert _snapshots(session.puzzle()) == _snapshots(expected)
+
+
+def test_erasing_matches_a_fresh_propagation():
+	rng = random.Random(0)
+	solution, _ = cnpp_solver.solve(_puzzle())
+
+	for _ in range(15):
+		session = cnpp_session.SolverSession(_puzzle())
+
+		for _ in range(20):
+			edits = session.edits()
+			if edits and rng.random() < 0.4:
+				state = session.erase(rng.choice(edits)[0])
+
+				expected = cnpp_solver.propagate(_puzzle(session.edits()))
+				assert state == expected.state
+				if state != cnpp.PuzzleState.Conflict:
+					assert _snapshots(session.puzzle()) == _snapshots(expected.puzzle)
+
+			else:
+				locations = [cell.location() for cell in session.puzzle().iter_unsolved_cells()]
+				if not locations:
+					break
+
+				location = rng.choice(locations)
+				potential_values = sorted(session.potential_values(location))
+				if potential_values and rng.random() < 0.2:
+					session.place(location, rng.choice(potential_values))
+				else:
+					session.place(location, solution.get_cell(location).value())
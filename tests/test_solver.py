@@ -0,0 +1,231 @@
+import pytest
+
+from sudoku_solver import cnpp, cnpp_branching, cnpp_solver, sudoku
+
+EASY = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+HARD = '100007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+# The hard puzzle with a wrong given, which only conflicts after guessing.
+UNSOLVABLE = '120007090030020008009600500005300900010080002600004000300000010040000007007000300'
+
+# Erasing pencil markings alone cannot solve this puzzle, but it does not
+# need a guess.
+NEEDS_HIDDEN_SINGLES = '083000050907305821250000090000002906009504100000008205072609004814000769090007080'
+
+
+def _snapshots(puzzle: cnpp.Puzzle) -> dict:
+	return {
+		cell.location(): (cell.peek_value(), cell.snapshot()[1] if not cell.peek_value() else frozenset())
+		for cell in puzzle.iter_cells()
+	}
+
+
+def _replay(puzzle: cnpp.Puzzle, events: list) -> cnpp.Puzzle:
+	for event in events:
+		for location, values in event.removed.items():
+			assert puzzle.get_cell(location).remove_values(values)
+		for location, value in event.placed.items():
+			puzzle.get_cell(location).set_value(value)
+	return puzzle
+
+
+def test_trace_describes_every_deduction():
+	events = []
+	result = cnpp_solver.propagate(sudoku.SudokuPuzzle.init_from_1d_list(HARD), trace=events.append)
+
+	assert events and all(event.kind == 'deduction' for event in events)
+	assert all(event.removed or event.placed for event in events)
+
+	replayed = _replay(sudoku.SudokuPuzzle.init_from_1d_list(HARD), events)
+	assert _snapshots(replayed) == _snapshots(result.puzzle)
+
+
+def test_trace_does_not_change_the_result():
+	events = []
+	traced_puzzle, traced_state = cnpp_solver.solve(sudoku.SudokuPuzzle.init_from_1d_list(HARD), trace=events.append)
+	puzzle, puzzle_state = cnpp_solver.solve(sudoku.SudokuPuzzle.init_from_1d_list(HARD))
+
+	assert traced_state == puzzle_state == cnpp.PuzzleState.Solved
+	assert _snapshots(traced_puzzle) == _snapshots(puzzle)
+	assert {event.kind for event in events} >= {'deduction', 'guess'}
+
+
+def test_next_hint_skips_erasing_pencil_markings():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(EASY)
+	hint = cnpp_solver.next_hint(puzzle)
+
+	assert hint.kind == 'deduction'
+	assert hint.placed or hint.strategy != 'Erase Pencil Markings'
+	assert _snapshots(puzzle) == _snapshots(sudoku.SudokuPuzzle.init_from_1d_list(EASY))
+
+
+def test_next_hint_ignores_conflicting_givens():
+	assert cnpp_solver.next_hint(sudoku.SudokuPuzzle.init_from_1d_list('11' + '0' * 79)) is None
+
+
+def test_hints_solve_the_puzzle():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(EASY)
+	solution, _ = cnpp_solver.solve(puzzle)
+
+	hint = cnpp_solver.next_hint(puzzle)
+	while hint is not None:
+		assert hint.removed or hint.placed
+		for location, values in hint.removed.items():
+			puzzle.get_cell(location).remove_values(values)
+		for location, value in hint.placed.items():
+			puzzle.get_cell(location).set_value(value)
+		hint = cnpp_solver.next_hint(puzzle)
+
+	assert puzzle.state() == cnpp.PuzzleState.Solved
+	assert _snapshots(puzzle) == _snapshots(solution)
+
+
+class _GuessFirst(cnpp_branching.Branching):
+	def __init__(self, location):
+		self._location = location
+
+	def select_cell(self, puzzle, cells=None):
+		if self._location is not None:
+			cell, self._location = puzzle.get_cell(self._location), None
+			return cell
+		return super().select_cell(puzzle, cells)
+
+
+def test_backjumps_over_unrelated_guesses():
+	# The first guess is in the empty Sudoku, far from the one that conflicts.
+	puzzle = sudoku.TwinSudokuPuzzle.init_from_1d_lists(['0' * 81, UNSOLVABLE])
+	events = []
+	_, state = cnpp_solver.solve(puzzle, trace=events.append, branching=_GuessFirst((0, 0)))
+
+	assert state == cnpp.PuzzleState.Conflict
+
+	searched = [(event.kind, event.placed) for event in events if event.kind != 'deduction']
+	assert searched[0] == ('guess', {(0, 0): 1})
+	assert searched[-1] == ('backjump', {(0, 0): 1})
+	assert ('guess', {(0, 0): 2}) not in searched
+
+
+def _masks(value_masks: dict) -> dict:
+	return {value: mask for value, mask in value_masks.items() if mask}
+
+
+def test_candidate_index_follows_the_changes():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(HARD)
+	index = cnpp_solver._CandidateIndex(puzzle)
+	assert _masks(index.value_masks()) == _masks(cnpp_solver._value_masks(puzzle))
+
+	for group in puzzle.iter_groups():
+		index.update(cnpp_solver.process_cell_group(puzzle, group))
+		assert _masks(index.value_masks()) == _masks(cnpp_solver._value_masks(puzzle))
+
+
+def test_candidate_index_is_only_kept_while_solving():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(HARD)
+	cnpp_solver.propagate(puzzle, in_place=True)
+
+	assert puzzle not in cnpp_solver._CANDIDATE_INDEXES
+
+
+def test_propagate_does_not_guess():
+	events = []
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(HARD)
+	result = cnpp_solver.propagate(puzzle, trace=events.append)
+
+	assert result.state == cnpp.PuzzleState.Unsolved and result.needs_guess
+	assert result.puzzle is not puzzle
+	assert puzzle.to_1d_string() == HARD
+	assert {event.kind for event in events} == {'deduction'}
+
+	assert cnpp_solver.propagate(sudoku.SudokuPuzzle.init_from_1d_list(EASY)).state == cnpp.PuzzleState.Solved
+
+
+def test_propagate_only_applies_the_selected_strategies():
+	strategies = ['Erase Pencil Markings']
+	events = []
+	result = cnpp_solver.propagate(sudoku.SudokuPuzzle.init_from_1d_list(NEEDS_HIDDEN_SINGLES), strategies, trace=events.append)
+
+	# The other strategies solve this puzzle, so `solve` would not guess.
+	assert result.needs_guess
+	assert {event.strategy for event in events} == set(strategies)
+	assert not cnpp_solver.propagate(sudoku.SudokuPuzzle.init_from_1d_list(NEEDS_HIDDEN_SINGLES)).needs_guess
+
+	with pytest.raises(KeyError):
+		cnpp_solver.propagate(sudoku.SudokuPuzzle.init_from_1d_list(EASY), ['Guessing'])
+
+
+def test_propagate_finds_conflicting_givens():
+	result = cnpp_solver.propagate(sudoku.SudokuPuzzle.init_from_1d_list('11' + '0' * 79))
+
+	assert result.state == cnpp.PuzzleState.Conflict
+	assert not result.needs_guess
+
+
+def _pencil_marks(without_value: dict) -> sudoku.SudokuPuzzle:
+	"""
+	Creates a puzzle with no solved cells, where the cells at the locations in
+	`without_value` can hold any value but the one given, and every other cell
+	can hold any value.
+	"""
+
+	grid = [[123456789] * 9 for _ in range(9)]
+	for (row_index, col_index), value in without_value.items():
+		grid[row_index][col_index] = int(''.join(str(other) for other in range(1, 10) if other != value))
+	return sudoku.SudokuPuzzle.init_from_2d_list(grid)
+
+
+def _fish_puzzle(rows: dict) -> sudoku.SudokuPuzzle:
+	# 1 can only be placed in the given columns of each row.
+	return _pencil_marks({
+		(row_index, col_index): 1
+		for row_index, col_indexes in rows.items()
+		for col_index in range(9)
+		if col_index not in col_indexes
+	})
+
+
+def _row(puzzle: cnpp.Puzzle, row_index: int) -> cnpp.Group:
+	return next(
+		group
+		for group in puzzle.get_groups(puzzle.get_cell((row_index, 0)))
+		if all(cell.location()[0] == row_index for cell in group)
+	)
+
+
+def _pruned(changed_cells: set, value: int) -> set:
+	assert all(value not in cell.potential_values() for cell in changed_cells)
+	return {cell.location() for cell in changed_cells}
+
+
+def test_check_fish_finds_an_x_wing():
+	puzzle = _fish_puzzle({0: (0, 4), 4: (0, 4)})
+	changed_cells = cnpp_solver.check_fishes(puzzle, _row(puzzle, 0))
+
+	assert _pruned(changed_cells, 1) == {
+		(row_index, col_index)
+		for row_index in range(9)
+		for col_index in (0, 4)
+		if row_index not in (0, 4)
+	}
+
+
+def test_check_fish_finds_a_swordfish():
+	rows = {0: (0, 3), 3: (3, 6), 6: (0, 6)}
+	swordfish = {
+		(row_index, col_index)
+		for row_index in range(9)
+		for col_index in (0, 3, 6)
+		if row_index not in rows
+	}
+
+	puzzle = _fish_puzzle(rows)
+	assert not cnpp_solver.check_fishes(puzzle, _row(puzzle, 0))
+	assert _pruned(cnpp_solver.check_fishes(puzzle, _row(puzzle, 0), max_size=3), 1) == swordfish
+
+	puzzle = _fish_puzzle(rows)
+	cnpp_solver.register_strategy('Swordfish', cnpp_solver.fish_strategy(3))
+	try:
+		changed_cells = cnpp_solver.process_cell_group(puzzle, _row(puzzle, 0), strategies=['Fish', 'Swordfish'])
+	finally:
+		cnpp_solver.unregister_strategy('Swordfish')
+
+	assert _pruned(changed_cells, 1) == swordfish
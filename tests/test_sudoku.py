@@ -0,0 +1,65 @@
+import pytest
+
+from sudoku_solver import cnpp, cnpp_branching, cnpp_solver, sudoku
+
+PUZZLE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+
+
+def _grid(string: str) -> list:
+	return [[int(char) for char in string[(index*9):(1+index)*9]] for index in range(9)]
+
+
+def _solution() -> list:
+	empty = sudoku.TwinSudokuPuzzle.init_from_1d_lists(['0' * 81] * 2)
+	puzzle, state = cnpp_solver.solve(empty)
+	assert state == cnpp.PuzzleState.Solved
+	return puzzle.to_1d_strings()
+
+
+def test_overlapping_grids_can_mix_integers_and_strings():
+	first, second = _solution()
+	grids = [_grid(first), [[str(value) for value in row] for row in _grid(second)]]
+
+	puzzle = sudoku.TwinSudokuPuzzle.init_from_2d_lists(grids)
+
+	assert puzzle.to_1d_strings() == [first, second]
+
+
+def test_overlapping_grids_must_agree():
+	first, second = _solution()
+	grids = [_grid(first), _grid(second)]
+
+	# The first Sudoku's bottom right box is shared with the second Sudoku.
+	grids[1][0][0] = grids[1][0][0] % 9 + 1
+
+	with pytest.raises(AssertionError):
+		sudoku.TwinSudokuPuzzle.init_from_2d_lists(grids)
+
+
+def test_samurai_with_empty_sudokus():
+	solution = cnpp_solver.solve(sudoku.SamuraiSudokuPuzzle.init_from_1d_lists(['0' * 81] * 5))[0].to_1d_strings()
+	strings = ['0' * 81, '0' * 81, solution[2][:45] + '0' * 36, '0' * 81, solution[4]]
+
+	puzzle, state = cnpp_solver.solve(sudoku.SamuraiSudokuPuzzle.init_from_1d_lists(strings))
+
+	assert state == cnpp.PuzzleState.Solved
+	assert puzzle.state() == cnpp.PuzzleState.Solved
+	assert puzzle.to_1d_strings()[4] == solution[4]
+
+
+def test_region_cells():
+	puzzle = sudoku.SamuraiSudokuPuzzle.init_from_1d_lists(['0' * 81] * 5)
+
+	for index, region in enumerate(puzzle.regions()):
+		assert all(puzzle.region_of(group) == index for group in region)
+		assert set(puzzle.region_cells(index)) == {cell for group in region for cell in group}
+		assert len(puzzle.region_cells(index)) == 81
+
+
+def test_select_cell_from_cells():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(PUZZLE)
+	cells = list(puzzle.iter_groups())[-1]
+
+	cell = cnpp_branching.Branching().select_cell(puzzle, cells)
+
+	assert cell in cells and not cell.value()
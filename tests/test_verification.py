@@ -0,0 +1,70 @@
+import gc
+import io
+
+import pytest
+
+from sudoku_solver import cnpp, cnpp_verification, sudoku
+
+SOLUTION = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def find_failures(request, monkeypatch):
+	if request.param == 'python':
+		monkeypatch.setattr(cnpp_verification, 'numpy', None)
+	elif cnpp_verification.numpy is None:
+		pytest.skip('numpy is not installed.')
+
+
+def _topology() -> cnpp.Topology:
+	return sudoku.SudokuPuzzle.init_from_1d_list(SOLUTION).topology()
+
+
+def test_pack_values_does_not_modify_the_puzzle():
+	puzzle = sudoku.SudokuPuzzle.init_from_1d_list(SOLUTION)
+	cell = puzzle.get_cell((0, 0))
+	cell.restore((0, frozenset([4])))
+
+	row = cnpp_verification.pack_values(puzzle)
+
+	assert row == cnpp_verification.pack_strings(_topology(), [SOLUTION])[0]
+	assert cell.snapshot() == (0, frozenset([4]))
+
+
+def test_verify(find_failures):
+	unsolved = '0' + SOLUTION[1:]
+	invalid = SOLUTION[1] + SOLUTION[1:]
+	swapped = SOLUTION[1] + SOLUTION[0] + SOLUTION[2:]
+	topology = _topology()
+
+	rows = cnpp_verification.pack_strings(topology, [SOLUTION, unsolved, invalid, SOLUTION])
+	references = cnpp_verification.pack_strings(topology, [SOLUTION, SOLUTION, SOLUTION, swapped])
+
+	mismatches = cnpp_verification.verify(topology, rows, references, keys='abcd', batch_size=3)
+
+	assert [(mismatch.key, mismatch.reason) for mismatch in mismatches] == [
+		('b', 'unsolved'), ('c', 'invalid'), ('d', 'mismatch'),
+	]
+	assert mismatches[0].locations == ((0, 0),)
+	assert (0, 0) in mismatches[1].locations
+	assert mismatches[2].locations == ((0, 0), (0, 1))
+
+
+def test_write_report():
+	file = io.StringIO()
+	cnpp_verification.write_report([cnpp_verification.Mismatch('a', 'mismatch', ((0, 0), (0, 1)))], file)
+
+	assert file.getvalue().splitlines() == ['key,reason,locations', 'a,mismatch,"(0, 0);(0, 1)"']
+
+
+def test_group_indexes_are_not_kept_after_the_topology():
+	topology = cnpp.Topology([[(0, 0), (0, 1)], [(0, 1), (0, 2)]], [1, 2])
+	num_topologies = len(cnpp_verification._GROUP_INDEXES_BY_SIZE)
+
+	assert cnpp_verification._group_indexes_by_size(topology) == (((0, 1), (1, 2)),)
+	assert len(cnpp_verification._GROUP_INDEXES_BY_SIZE) == num_topologies + 1
+
+	del topology
+	gc.collect()
+
+	assert len(cnpp_verification._GROUP_INDEXES_BY_SIZE) == num_topologies